@@ -1,14 +1,62 @@
 # backtester/__init__.py
 
+import importlib
+
 from backtester.core.broker import Broker
 from backtester.core.engine import BacktestEngine
 
-def run_backtest(strategy_class, data, initial_cash=100_000, commission=0.001, return_broker=False, **strategy_kwargs):
+def run_backtest(strategy_class, data, initial_cash=100_000, commission=0.001, return_broker=False, mode='event',
+                 profile=False, store_curve=True, curve_step=1, cache=None, **strategy_kwargs):
+    if mode not in ('event', 'vectorized'):
+        raise ValueError(f"Invalid mode '{mode}'. Must be 'event' or 'vectorized'")
+
+    # cache=True (or a ResultCache) returns stored results of an identical earlier run, see result_cache.py.
+    # Profiled runs are never cached, their point is to time the run.
+    if profile or cache is None or cache is False:
+        cache = None
+    else:
+        from backtester.core.result_cache import resolve_cache
+        cache = resolve_cache(cache)
+    if cache is not None:
+        key = cache.key(strategy_class, data, initial_cash=initial_cash, commission=commission, mode=mode,
+                        store_curve=store_curve, curve_step=curve_step, strategy_kwargs=strategy_kwargs)
+        stored = cache.get(key)
+        if stored is not None and (stored['broker'] is not None or not return_broker):
+            if return_broker:
+                return stored['results'], stored['broker']
+            return stored['results']
+
     broker = Broker(initial_cash=initial_cash, commission=commission)
-    engine = BacktestEngine(strategy_class, data, broker, **strategy_kwargs)
-    engine.run()
+    engine = BacktestEngine(strategy_class, data, broker, profile=profile, store_curve=store_curve,
+                            curve_step=curve_step, **strategy_kwargs)
+    if mode == 'vectorized':
+        engine.run_vectorized()
+    else:
+        engine.run()
     results = engine.get_results()
+    if cache is not None:
+        cache.put(key, {'results': results, 'broker': broker if return_broker else None})
 
     if return_broker:
         return results, broker
-    return results
\ No newline at end of file
+    return results
+
+
+# Everything else is imported on first use, so 'import backtester' doesn't load pandas (see __main__.py)
+_LAZY = {
+    'run_sweep': 'backtester.sweep',
+    'walk_forward': 'backtester.walk_forward',
+    'monte_carlo': 'backtester.robustness',
+    'ResultCache': 'backtester.core.result_cache',
+    'DataHandler': 'backtester.core.data_handler',
+    'FanOutEngine': 'backtester.core.fanout',
+}
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module 'backtester' has no attribute '{name}'")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
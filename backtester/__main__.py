@@ -0,0 +1,197 @@
+# backtester/__main__.py
+# Author: Krittin Hirunchupong
+
+'''
+__main__.py
+    Runs one backtest from the command line and writes its metrics (and optionally curves and trades) as JSON:
+        python -m backtester sma_crossover --csv prices.csv -p short_window=10 -p long_window=50 -o result.json
+        python -m backtester mean_reversion --store prices_store --start 2023-01-01 -p window=30
+        python -m backtester mypackage.strategies:MyStrategy --csv prices.csv --store prices_store
+        python -m backtester sma_crossover --store prices_store --checkpoint sma.ckpt   # Daily: only the new bars run
+
+    Startup is kept short for batch jobs: 'import backtester' only loads NumPy and the engine, and pandas,
+    yfinance, matplotlib, ... are imported only by the code paths that use them (the strategy module and the data
+    loader are imported after the arguments are parsed). The JSON has the time spent importing, loading and
+    running, and 'python -m backtester.benchmarks --import-time' measures the cold import times.
+'''
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from backtester.utils.performance import compute_num_trades
+
+STRATEGIES = {
+    'sma_crossover': 'backtester.strategies.sma_crossover:SmaCrossover',
+    'mean_reversion': 'backtester.strategies.mean_reversion:MeanReversion',
+    'test_strategy': 'backtester.strategies.test_strategy:TestStrategy',
+}
+
+
+def load_strategy(name: str):
+    """A name from STRATEGIES or 'package.module:ClassName'."""
+    target = STRATEGIES.get(name, name)
+    if ':' not in target:
+        raise ValueError(f"Unknown strategy '{name}'. Use one of {list(STRATEGIES)} or 'module:ClassName'")
+    module_name, class_name = target.split(':', 1)
+    module = importlib.import_module(module_name)
+    try:
+        return getattr(module, class_name)
+    except AttributeError:
+        raise ValueError(f"Module '{module_name}' has no strategy '{class_name}'") from None
+
+
+def parse_params(pairs) -> dict:
+    """['window=20', 'threshold=0.02', 'name=abc'] -> {'window': 20, 'threshold': 0.02, 'name': 'abc'}"""
+    params = {}
+    for pair in pairs or []:
+        key, sep, value = pair.partition('=')
+        if not sep or not key:
+            raise ValueError(f"Invalid parameter '{pair}', expected key=value")
+        try:
+            params[key] = json.loads(value)
+        except json.JSONDecodeError:
+            params[key] = value
+    return params
+
+
+def load_data(args, handler):
+    if args.store and not args.csv:
+        return handler.from_store(args.store, start=args.start, end=args.end)
+    if args.store:
+        # The CSV is converted into the store once and the store is used from then on
+        return handler.from_csv(args.csv, datetime_col=args.datetime_col, store_dir=args.store,
+                                start=args.start, end=args.end)
+    df = handler.from_csv(args.csv, datetime_col=args.datetime_col)
+    if args.start is not None or args.end is not None:
+        lo = 0 if args.start is None else df.index.searchsorted(args.start)
+        hi = len(df) if args.end is None else df.index.searchsorted(args.end)
+        df = df.iloc[lo:hi]
+    return df
+
+
+def run_checkpointed(args, strategy_class, params, data) -> dict:
+    """Continues the run saved in args.checkpoint on data (or starts it when there is none) and saves it again."""
+    from backtester.core.broker import Broker
+    from backtester.core.engine import BacktestEngine
+
+    if args.mode != 'event' or args.cache:
+        raise ValueError("--checkpoint needs --mode event and no --cache")
+    if os.path.exists(args.checkpoint):
+        engine = BacktestEngine.resume(args.checkpoint, data)
+        if type(engine.strategy) is not strategy_class:
+            raise ValueError(f"The checkpoint '{args.checkpoint}' is a run of {type(engine.strategy).__name__}")
+    else:
+        engine = BacktestEngine(strategy_class, data, Broker(initial_cash=args.cash, commission=args.commission),
+                                store_curve=args.curves, curve_step=args.curve_step, **params)
+    engine.run(checkpoint_path=args.checkpoint)
+    return engine.get_results()
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def build_report(args, strategy_class, params, data, results, timing) -> dict:
+    report = {
+        'strategy': f"{strategy_class.__module__}.{strategy_class.__qualname__}",
+        'params': params,
+        'bars': len(data),
+        'initial_cash': args.cash,
+        'commission': args.commission,
+        'mode': args.mode,
+        'final_equity': results['final_equity'],
+        'num_trades': compute_num_trades(results['trade_log']),
+        'metrics': results['metrics'],
+        'timing': timing,
+    }
+    if args.curves:
+        report['timestamps'] = [ts.isoformat() if hasattr(ts, 'isoformat') else ts for ts in results['timestamps']]
+        report['equity_curve'] = results['equity_curve']
+        report['pnl_curve'] = results['pnl_curve']
+    if args.trades:
+        report['trades'] = list(results['trade_log'])
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m backtester',
+                                     description='Run a backtest and write the results as JSON')
+    parser.add_argument('strategy', help=f"One of {list(STRATEGIES)} or 'module:ClassName'")
+    parser.add_argument('--csv', metavar='PATH', help='CSV price history')
+    parser.add_argument('--store', metavar='DIR',
+                        help='Columnar store (converted from --csv once when both are given)')
+    parser.add_argument('--datetime-col', default='Date', help='Timestamp column of the CSV')
+    parser.add_argument('--start', help='First timestamp (inclusive)')
+    parser.add_argument('--end', help='Last timestamp (exclusive)')
+    parser.add_argument('-p', '--param', action='append', metavar='KEY=VALUE',
+                        help='Strategy parameter, the value is parsed as JSON (repeatable)')
+    parser.add_argument('--cash', type=float, default=100_000)
+    parser.add_argument('--commission', type=float, default=0.001)
+    parser.add_argument('--mode', choices=['event', 'vectorized'], default='event')
+    parser.add_argument('--curve-step', type=int, default=1, help='Store every N-th bar of the curves')
+    parser.add_argument('--curves', action='store_true',
+                        help='Keep the equity/PnL curves and include them in the output (metrics never need them)')
+    parser.add_argument('--trades', action='store_true', help='Include the trade log in the output')
+    parser.add_argument('--cache', nargs='?', const=True, metavar='DIR', help='Use the result cache (in DIR)')
+    parser.add_argument('--checkpoint', metavar='PATH',
+                        help='Continue the run saved in PATH (only bars after it are run) and save it there again')
+    parser.add_argument('-o', '--output', metavar='PATH', help='JSON file to write (default: stdout)')
+    args = parser.parse_args(argv)
+    if not args.csv and not args.store:
+        parser.error('one of --csv or --store is required')
+
+    try:
+        params = parse_params(args.param)
+        start = time.perf_counter()
+        strategy_class = load_strategy(args.strategy)
+        from backtester import run_backtest
+        from backtester.core.data_handler import DataHandler  # Loads pandas
+        imported = time.perf_counter()
+        data = load_data(args, DataHandler())
+        loaded = time.perf_counter()
+
+        cache = args.cache
+        if isinstance(cache, str):
+            from backtester.core.result_cache import ResultCache
+            cache = ResultCache(cache)
+        if args.checkpoint:
+            results = run_checkpointed(args, strategy_class, params, data)
+        else:
+            results = run_backtest(strategy_class, data, initial_cash=args.cash, commission=args.commission,
+                                   mode=args.mode, curve_step=args.curve_step, store_curve=args.curves,
+                                   cache=cache, **params)
+        finished = time.perf_counter()
+    except (ValueError, ImportError, OSError) as error:
+        # Bad arguments or data. An AttributeError is a bug in the strategy and keeps its traceback
+        print(f"error: {error}", file=sys.stderr)
+        return 2
+
+    timing = {
+        'import_seconds': imported - start,
+        'load_seconds': loaded - imported,
+        'run_seconds': finished - loaded,
+    }
+    report = build_report(args, strategy_class, params, data, results, timing)
+    text = json.dumps(report, indent=2, default=_json_default)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
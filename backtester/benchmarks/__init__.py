@@ -0,0 +1,10 @@
+# backtester/benchmarks/__init__.py
+
+from backtester.benchmarks.synthetic import gbm_ohlcv, regime_switching_ohlcv
+from backtester.benchmarks.suite import (
+    BENCHMARKS,
+    run_benchmarks,
+    save_baseline,
+    load_baseline,
+    compare_to_baseline
+)
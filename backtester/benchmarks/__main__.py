@@ -0,0 +1,71 @@
+# backtester/benchmarks/__main__.py
+# Author: Krittin Hirunchupong
+
+'''
+__main__.py
+    Runs the benchmark suite from the command line, offline:
+        python -m backtester.benchmarks --sizes 10000 100000 --save baseline.json
+        python -m backtester.benchmarks --sizes 10000 100000 --compare baseline.json
+        python -m backtester.benchmarks --import-time --max-import-seconds 0.3
+    Exits with status 1 when a benchmark regressed against the baseline (or an import took too long).
+'''
+
+import argparse
+import sys
+
+from backtester.benchmarks.suite import (
+    BENCHMARKS,
+    IMPORT_TARGETS,
+    compare_to_baseline,
+    format_row,
+    import_time,
+    run_benchmarks,
+    save_baseline
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m backtester.benchmarks', description='Backtester benchmarks')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000], help='Numbers of bars')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help='Benchmarks to run (default: all)')
+    parser.add_argument('--data', choices=['gbm', 'regime'], default='gbm', help='Synthetic data generator')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per benchmark, the best one is kept')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the peak memory pass')
+    parser.add_argument('--save', metavar='PATH', help='Save the results as a baseline')
+    parser.add_argument('--compare', metavar='PATH', help='Compare the results to a saved baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed bars/sec drop (0.25 = 25%%)')
+    parser.add_argument('--memory-tolerance', type=float, default=0.25, help='Allowed peak memory growth')
+    parser.add_argument('--import-time', action='store_true',
+                        help=f'Only measure the cold import time of {list(IMPORT_TARGETS)}')
+    parser.add_argument('--max-import-seconds', type=float, help='Fail when an import takes longer than this')
+    args = parser.parse_args(argv)
+
+    if args.import_time:
+        too_slow = 0
+        for module in IMPORT_TARGETS:
+            seconds = import_time(module, repeat=args.repeat)
+            slow = args.max_import_seconds is not None and seconds > args.max_import_seconds
+            too_slow += slow
+            print(f"import {module:<40} {seconds * 1000:8.1f} ms" + ('  TOO SLOW' if slow else ''))
+        return 1 if too_slow else 0
+
+    rows = run_benchmarks(sizes=args.sizes, names=args.only, data=args.data, seed=args.seed, repeat=args.repeat,
+                          measure_memory=not args.no_memory, verbose=args.compare is None)
+
+    regressions = []
+    if args.compare:
+        compare_to_baseline(rows, args.compare, tolerance=args.tolerance, memory_tolerance=args.memory_tolerance)
+        for row in rows:
+            print(format_row(row))
+        regressions = [row for row in rows if row.get('regression')]
+        print(f"\n{len(regressions)} regression(s) against {args.compare}")
+
+    if args.save:
+        save_baseline(rows, args.save)
+        print(f"Baseline saved to {args.save}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,264 @@
+# backtester/benchmarks/suite.py
+# Author: Krittin Hirunchupong
+
+'''
+suite.py
+    This module holds the benchmarks and runs them on synthetic data (see synthetic.py), fully offline.
+    Every benchmark reports its best time over a few repeats, bars/sec and the peak memory allocated during the
+    run (measured in a separate pass with tracemalloc, so it doesn't slow down the timed runs).
+
+    Results can be saved as a baseline (JSON) and later runs compared against it: a benchmark is flagged as a
+    regression when its bars/sec drops, or its peak memory grows, by more than the tolerance.
+
+    Example:
+        rows = run_benchmarks(sizes=[10_000, 100_000])
+        save_baseline(rows, 'baseline.json')
+        ...
+        flagged = compare_to_baseline(run_benchmarks(sizes=[10_000, 100_000]), 'baseline.json')
+'''
+
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from backtester import run_backtest
+from backtester.benchmarks.synthetic import GENERATORS
+from backtester.core.strategy import Strategy
+from backtester.indicators.cache import set_indicator_cache
+from backtester.strategies.mean_reversion import MeanReversion
+from backtester.strategies.sma_crossover import SmaCrossover
+from backtester.strategies.test_strategy import TestStrategy
+from backtester.utils import performance
+
+MEMORY_NOISE_BYTES = 1_000_000  # Peak memory changes smaller than this are never flagged
+IMPORT_TARGETS = ('backtester', 'backtester.strategies.sma_crossover', 'backtester.__main__')
+
+
+class ManyLots(Strategy):
+    '''Broker stress test: buys one lot every bar and keeps up to 'max_open' lots open, closing the oldest.'''
+    max_lookback = 1
+
+    def __init__(self, data, broker, max_open=500):
+        super().__init__(data, broker)
+        self.max_open = max_open
+        self.lots = []
+
+    def on_data(self, timestamp=None):
+        price = self.get_price()
+        self.lots.append(self.broker.execute_order(qty=1, side='buy', price=price, timestamp=timestamp))
+        if len(self.lots) > self.max_open:
+            self.broker.close_trade(self.lots.pop(0), price=price, timestamp=timestamp)
+        if self.is_last_bar():
+            self.close_all_trades(timestamp=timestamp)
+
+
+def _backtest(strategy_class, mode='event', **params):
+    def setup(df):
+        return lambda: run_backtest(strategy_class, df, mode=mode, **params)
+    return setup
+
+
+def _performance(df):
+    results = run_backtest(SmaCrossover, df, mode='vectorized', short_window=10, long_window=50)
+    equity_curve = np.asarray(results['equity_curve'])
+    trade_log = results['trade_log']
+
+    def run():
+        performance.compute_sharpe_ratio(equity_curve)
+        performance.compute_max_drawdown(equity_curve)
+        performance.compute_total_return(equity_curve)
+        performance.compute_win_rate(trade_log)
+    return run
+
+
+def _plot(plot):
+    def setup(df):
+        import io
+        from backtester.utils import visualization
+
+        results = run_backtest(SmaCrossover, df, mode='vectorized', short_window=10, long_window=50)
+        buy_hold = df['Close'].to_numpy() / df['Close'].iloc[0] * 100_000
+
+        def run():
+            # Rendered to an in-memory PNG, so the drawing itself is measured and no display is needed
+            if plot == 'equity':
+                visualization.plot_equity_curve(results['timestamps'], results['equity_curve'], buy_hold,
+                                                save_path=io.BytesIO())
+            else:
+                visualization.plot_candles_with_trades(df, results['trade_log'], results['timestamps'],
+                                                       save_path=io.BytesIO())
+        return run
+    return setup
+
+
+'''
+BENCHMARKS
+    name -> (setup, max_bars). setup(df) prepares everything that is not measured and returns the callable to time.
+    Sizes above max_bars are skipped.
+'''
+BENCHMARKS = {
+    'sma_crossover': (_backtest(SmaCrossover, short_window=10, long_window=50), None),
+    'sma_crossover_vectorized': (_backtest(SmaCrossover, mode='vectorized', short_window=10, long_window=50), None),
+    'mean_reversion': (_backtest(MeanReversion, window=20, threshold=0.02), None),
+    'mean_reversion_vectorized': (_backtest(MeanReversion, mode='vectorized', window=20, threshold=0.02), None),
+    'test_strategy': (_backtest(TestStrategy), None),
+    'broker_many_lots': (_backtest(ManyLots, max_open=500), None),
+    'performance_metrics': (_performance, None),
+    'plot_equity_curve': (_plot('equity'), None),
+    'plot_candles_with_trades': (_plot('candles'), None),
+}
+
+
+def _peak_memory(run) -> int:
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    run()
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    if not was_tracing:
+        tracemalloc.stop()
+    return int(peak)
+
+
+def run_benchmarks(sizes=(10_000, 100_000), names=None, data='gbm', seed=0, repeat=3,
+                   measure_memory=True, verbose=False) -> list:
+    """
+    Runs the benchmarks 'names' (default: all of BENCHMARKS) on 'data' ('gbm' or 'regime') data of every size.
+    Returns one dict per (benchmark, size): name, data, bars, seconds (best of 'repeat'), bars_per_sec,
+    peak_memory_bytes (None when measure_memory=False).
+    The shared IndicatorCache is turned off while they run, so repeated runs recompute their indicators.
+    """
+    names = list(BENCHMARKS) if names is None else list(names)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks {unknown}. Must be in: {list(BENCHMARKS)}")
+    if data not in GENERATORS:
+        raise ValueError(f"Invalid data '{data}'. Must be one of: {list(GENERATORS)}")
+
+    previous = set_indicator_cache(None)
+    try:
+        return _run_benchmarks(sizes, names, data, seed, repeat, measure_memory, verbose)
+    finally:
+        set_indicator_cache(previous)
+
+
+def _run_benchmarks(sizes, names, data, seed, repeat, measure_memory, verbose):
+    rows = []
+    for size in sizes:
+        df = GENERATORS[data](size, seed=seed)
+        for name in names:
+            setup, max_bars = BENCHMARKS[name]
+            if max_bars is not None and size > max_bars:
+                continue
+            run = setup(df)
+            times = []
+            for _ in range(max(1, repeat)):
+                start = time.perf_counter()
+                run()
+                times.append(time.perf_counter() - start)
+            seconds = min(times)
+            row = {
+                'name': name,
+                'data': data,
+                'bars': size,
+                'seconds': seconds,
+                'bars_per_sec': size / seconds if seconds else float('inf'),
+                'peak_memory_bytes': _peak_memory(run) if measure_memory else None,
+            }
+            rows.append(row)
+            if verbose:
+                print(format_row(row))
+    return rows
+
+
+def format_row(row) -> str:
+    memory = row.get('peak_memory_bytes')
+    memory = f"{memory / 1e6:10.1f} MB" if memory is not None else ' ' * 13
+    text = f"{row['name']:<28} {row['bars']:>10,} bars {row['seconds']:9.4f} s {row['bars_per_sec']:14,.0f} bars/s {memory}"
+    if row.get('regression'):
+        text += '  REGRESSION: ' + row['reason']
+    return text
+
+
+def save_baseline(rows, path: str):
+    """Saves benchmark rows (with the Python/NumPy versions they ran on) as a JSON baseline."""
+    baseline = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'results': rows,
+    }
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2)
+
+
+def load_baseline(path: str) -> list:
+    with open(path) as f:
+        return json.load(f)['results']
+
+
+def compare_to_baseline(rows, baseline, tolerance: float = 0.25, memory_tolerance: float = 0.25) -> list:
+    """
+    Compares benchmark rows to a baseline (a path or a list of rows). Adds to every row that has a baseline:
+    baseline_bars_per_sec, speed_change (relative, negative is slower), memory_change and regression/reason.
+    A regression is bars/sec more than 'tolerance' below the baseline or peak memory more than
+    'memory_tolerance' above it. Returns the rows.
+    """
+    if isinstance(baseline, str):
+        baseline = load_baseline(baseline)
+    reference = {(row['name'], row['data'], row['bars']): row for row in baseline}
+
+    for row in rows:
+        base = reference.get((row['name'], row['data'], row['bars']))
+        if base is None:
+            continue
+        reasons = []
+        row['baseline_bars_per_sec'] = base['bars_per_sec']
+        row['speed_change'] = row['bars_per_sec'] / base['bars_per_sec'] - 1 if base['bars_per_sec'] else 0.0
+        if row['speed_change'] < -tolerance:
+            reasons.append(f"{-row['speed_change']:.0%} slower")
+
+        memory, base_memory = row.get('peak_memory_bytes'), base.get('peak_memory_bytes')
+        if memory is not None and base_memory:
+            row['memory_change'] = memory / base_memory - 1
+            if row['memory_change'] > memory_tolerance and memory - base_memory > MEMORY_NOISE_BYTES:
+                reasons.append(f"{row['memory_change']:.0%} more memory")
+        row['regression'] = bool(reasons)
+        row['reason'] = ', '.join(reasons)
+    return rows
+
+
+def _top_level_imports(code: str) -> dict:
+    # name -> cumulative microseconds of the top-level imports of a fresh interpreter running 'code'
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                               capture_output=True, text=True, check=True)
+    imports = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name[1:].startswith(' '):  # Nested imports are included in their parent's cumulative time
+            imports[name.strip()] = int(cumulative)
+    return imports
+
+
+def import_time(module: str, repeat: int = 5) -> float:
+    """
+    Cold import time of 'module' in seconds (best of 'repeat' fresh interpreters), from python -X importtime.
+    Covers everything the import statement loads, including the parent packages, but not the modules the
+    interpreter imports at startup.
+    """
+    startup = set(_top_level_imports('pass'))
+    best = None
+    for _ in range(max(1, repeat)):
+        imports = _top_level_imports(f'import {module}')
+        seconds = sum(us for name, us in imports.items() if name not in startup) / 1e6
+        best = seconds if best is None else min(best, seconds)
+    return best
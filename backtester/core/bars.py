@@ -0,0 +1,98 @@
+# backtester/core/bars.py
+# Author: Krittin Hirunchupong
+
+'''
+bars.py
+    This module holds the price history as one contiguous NumPy array per column (Open, High, Low, Close, Volume, ...).
+    The engine converts the DataFrame once before the run and hands the arrays to the strategy, so reading the
+    current bar or a lookback window is a plain array index/slice instead of building pandas rows on every bar.
+    Panel is the multi-asset version: many symbols aligned on one index, one (bars, symbols) array per column.
+'''
+
+import numpy as np
+
+
+class Bars:
+    def __init__(self, index, columns: dict):
+        self.index = index
+        self.columns = {}
+        self.indicator_cache = {}  # Whole-column indicator arrays, shared by every strategy run on these bars
+        for name, values in columns.items():
+            values = np.asarray(values)
+            if values.dtype.kind != 'f':
+                values = values.astype(float)  # float32/float64 are kept as is (e.g. memory mapped stores)
+            if len(values) != len(index):
+                raise ValueError(f"Column '{name}' has {len(values)} rows, expected {len(index)}")
+            self.columns[name] = values if values.flags.c_contiguous else np.ascontiguousarray(values)
+
+    @classmethod
+    def from_dataframe(cls, df, columns=None):
+        """
+        Builds the column arrays from a DataFrame. Float64 columns are used as is (no copy),
+        other numeric columns are converted once. Non numeric columns are skipped.
+        """
+        if columns is None:
+            columns = df.select_dtypes(include='number').columns  # Also skips pandas' string/categorical dtypes
+        return cls(df.index, {col: df[col].to_numpy(dtype=float) for col in columns})
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.columns[column]
+
+    def __contains__(self, column: str) -> bool:
+        return column in self.columns
+
+    def keys(self):
+        return self.columns.keys()
+
+    def to_dataframe(self):
+        import pandas as pd
+        return pd.DataFrame(self.columns, index=self.index)
+
+
+class Panel(Bars):
+    '''
+    Bars of many symbols aligned on one timestamp index. Every column is a 2D array of shape (bars, symbols),
+    so panel['Close'][i] is the vector of every symbol's Close at bar i (a contiguous row, no copy)
+    and a lookback slice is a (window, symbols) block for cross-sectional ranking.
+    '''
+    def __init__(self, index, columns: dict, symbols):
+        super().__init__(index, columns)
+        self.symbols = list(symbols)
+        self.symbol_index = {symbol: j for j, symbol in enumerate(self.symbols)}
+
+    @classmethod
+    def from_frames(cls, frames: dict, columns=('Open', 'High', 'Low', 'Close', 'Volume')):
+        """
+        Aligns one DataFrame per symbol on the union of their indexes.
+        Prices are forward filled after a symbol's first bar (NaN before it), Volume is 0 on missing bars.
+        """
+        symbols = list(frames)
+        index = frames[symbols[0]].index if symbols else None
+        for symbol in symbols[1:]:
+            index = index.union(frames[symbol].index)
+        columns = [col for col in columns if any(col in frames[symbol].columns for symbol in symbols)]
+
+        positions = [index.get_indexer(frames[symbol].index) for symbol in symbols]
+        arrays = {}
+        for col in columns:
+            values = np.full((len(index), len(symbols)), np.nan)
+            for j, symbol in enumerate(symbols):
+                if col in frames[symbol].columns:
+                    values[positions[j], j] = frames[symbol][col].to_numpy(dtype=float)
+            arrays[col] = np.nan_to_num(values) if col == 'Volume' else forward_fill(values)
+        return cls(index, arrays, symbols)
+
+    def symbol(self, symbol) -> Bars:
+        """Bars of a single symbol (copied out of the panel into contiguous arrays)."""
+        j = self.symbol_index[symbol]
+        return Bars(self.index, {col: values[:, j] for col, values in self.columns.items()})
+
+
+def forward_fill(values: np.ndarray) -> np.ndarray:
+    """Forward fills NaNs down each column of a 2D array."""
+    rows = np.where(np.isnan(values), 0, np.arange(len(values))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return values[rows, np.arange(values.shape[1])]
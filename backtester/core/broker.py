@@ -5,11 +5,22 @@
 broker.py
     This module acts like broker where trades from strategies can be executed.
     The user could simply call execute_order() to open a buy/sell trade and call close_order() to close a buy/sell trade
+    Net position, signed cost basis and realized PnL are kept up to date on every order, so equity and unrealized PnL
+    are O(1) no matter how many trades are open.
+    The trade log is a columnar TradeLog (see trade_log.py).
+
+    Resting orders (see orders.py): set_stop_loss(), set_take_profit() and set_trailing_stop() attach an exit to an
+    open trade (also available as execute_order(..., stop_loss=, take_profit=, trailing_stop=)), and
+    place_limit_order() opens a trade once the price reaches a limit. The engine calls process_orders() on every bar
+    before the strategy's on_data(). With intrabar=True, orders trigger on the bar's High/Low instead of its Close.
 '''
 
+from backtester.core.orders import OrderBook
+from backtester.core.trade_log import TradeLog
+
 
 class Broker:
-    def __init__(self, initial_cash=100_000, commission=0.001):
+    def __init__(self, initial_cash=100_000, commission=0.001, intrabar=False):
         self.initial_cash = initial_cash
         self.cash = initial_cash
         self.commission = commission
@@ -17,12 +28,22 @@ class Broker:
 
         self.next_trade_id = 1
         self.open_trades = {}    
-        self.trade_log = []
+        self.trade_log = TradeLog()
+
+        # Running totals over the open trades
+        self.net_position = 0    # Signed quantity (buy = +qty, sell = -qty)
+        self.cost_basis = 0.0    # Signed entry notional (sum of direction * qty * entry price)
+        self.realized_pnl = 0.0  # PnL of all closed trades (before commission)
+
+        self.intrabar = intrabar            # Trigger resting orders on the bar's High/Low
+        self.order_book = OrderBook()
+        self.orders = self.order_book.orders  # Resting orders by order id
 
     def update_price(self, price: float):
         self.current_price = price
 
-    def execute_order(self, qty=1, side='buy', price=None, timestamp=None):
+    def execute_order(self, qty=1, side='buy', price=None, timestamp=None, stop_loss=None, take_profit=None,
+                      trailing_stop=None):
         price = price or self.current_price
         cost = qty * price
         fee = cost * self.commission
@@ -46,8 +67,19 @@ class Broker:
             'status': 'open'
         }
 
+        direction = 1 if side == 'buy' else -1
+        self.net_position += direction * qty
+        self.cost_basis += direction * qty * price
+
         self.open_trades[trade_id] = trade
-        self.trade_log.append({**trade})  # Record opening trade
+        self.trade_log.append_open(trade_id, side, qty, price, timestamp)  # Record opening trade
+
+        if stop_loss is not None:
+            self.set_stop_loss(trade_id, stop_loss, timestamp=timestamp)
+        if take_profit is not None:
+            self.set_take_profit(trade_id, take_profit, timestamp=timestamp)
+        if trailing_stop is not None:
+            self.set_trailing_stop(trade_id, trailing_stop, timestamp=timestamp)
 
         return trade_id  # Return the ID for external tracking
 
@@ -74,43 +106,100 @@ class Broker:
 
         pnl = (price - entry_price) * qty * direction
 
-        closed_trade = {
-            'trade_id': trade_id,
-            'entry_price': entry_price,
-            'exit_price': price,
-            'qty': qty,
-            'entry_side': side,
-            'exit_side': exit_side,
-            'timestamp': timestamp,
-            'pnl': pnl,
-            'status': 'closed'
-        }
-
-        self.trade_log.append(closed_trade)
+        self.trade_log.append_close(trade_id, side, qty, entry_price, price, pnl, timestamp)
         del self.open_trades[trade_id]
+        if self.orders:
+            self.order_book.cancel_trade(trade_id)  # Its stops/take-profits go with it
+
+        self.realized_pnl += pnl
+        if self.open_trades:
+            self.net_position -= direction * qty
+            self.cost_basis -= direction * qty * entry_price
+        else:
+            # Reset exactly once flat so the running sums can't drift over a long run
+            self.net_position = 0
+            self.cost_basis = 0.0
 
     def close_all_trades(self, price=None, timestamp=None):
         for trade_id in list(self.open_trades.keys()):
             self.close_trade(trade_id, price=price, timestamp=timestamp)
 
-    def get_open_position_summary(self):
-        unrealized_pnl = 0
-        net_position = 0
-        for trade in self.open_trades.values():
-            direction = 1 if trade['side'] == 'buy' else -1
-            entry = trade['price']
-            qty = trade['qty']
-            net_position += direction * qty
-            unrealized_pnl += (self.current_price - entry) * qty * direction
+    def _exit_order(self, order_type, trade_id, price=None, trail=None, best=None, timestamp=None):
+        if trade_id not in self.open_trades:
+            raise ValueError(f"No open trade with ID {trade_id}")
+        trade = self.open_trades[trade_id]
+        exit_side = 'sell' if trade['side'] == 'buy' else 'buy'
+        best = trade['price'] if best is None else best
+        return self.order_book.add(order_type, exit_side, trade['qty'], price=price, trade_id=trade_id,
+                                   trail=trail, best=best, timestamp=timestamp)
+
+    def set_stop_loss(self, trade_id, stop_price, timestamp=None):
+        """Closes the trade once the price reaches stop_price against it. Returns the order id."""
+        return self._exit_order('stop_loss', trade_id, price=stop_price, timestamp=timestamp)
+
+    def set_take_profit(self, trade_id, target_price, timestamp=None):
+        """Closes the trade once the price reaches target_price in its favour. Returns the order id."""
+        return self._exit_order('take_profit', trade_id, price=target_price, timestamp=timestamp)
+
+    def set_trailing_stop(self, trade_id, trail, best=None, timestamp=None):
+        """
+        Closes the trade once the price moves 'trail' (a fraction, 0.05 = 5%) against the best price since entry.
+        The best price starts at 'best' (default: the entry price). Returns the order id.
+        """
+        if not 0 < trail < 1:
+            raise ValueError("trail must be a fraction between 0 and 1")
+        return self._exit_order('trailing_stop', trade_id, trail=trail, best=best, timestamp=timestamp)
+
+    def place_limit_order(self, qty=1, side='buy', limit_price=None, timestamp=None):
+        """Opens a trade once the price reaches limit_price (at or below it to buy, at or above it to sell)."""
+        if limit_price is None:
+            raise ValueError("place_limit_order() needs a limit_price")
+        return self.order_book.add('limit', side, qty, price=limit_price, timestamp=timestamp)
 
+    def cancel_order(self, order_id):
+        if self.order_book.cancel(order_id) is None:
+            raise ValueError(f"No resting order with ID {order_id}")
+
+    def get_order_price(self, order_id) -> float:
+        """Current trigger price of a resting order (trailing stops move with the price)."""
+        return self.order_book.stop_price(order_id)
+
+    def process_orders(self, price, high=None, low=None, open_price=None, timestamp=None) -> int:
+        """
+        Fills the resting orders that trigger on this bar and returns how many were filled.
+        high/low/open_price are only used with intrabar=True.
+        """
+        if not self.intrabar:
+            high = low = open_price = None
+        filled = 0
+        for order_id, fill_price in self.order_book.trigger(price, high=high, low=low, open_price=open_price):
+            order = self.order_book.cancel(order_id)
+            if order is None:
+                continue  # Cancelled by an order filled before it on this bar (e.g. the stop of the same trade)
+            if order['trade_id'] is not None:
+                if order['trade_id'] not in self.open_trades:
+                    continue
+                self.close_trade(order['trade_id'], price=fill_price, timestamp=timestamp)
+            else:
+                self.execute_order(qty=order['qty'], side=order['side'], price=fill_price, timestamp=timestamp)
+            filled += 1
+        return filled
+
+    def get_unrealized_pnl(self):
+        if not self.open_trades:
+            return 0.0
+        # sum((price - entry) * qty * direction) over the open trades == net_position * price - cost_basis
+        return self.net_position * self.current_price - self.cost_basis
+
+    def get_open_position_summary(self):
         return {
-            'net_position': net_position,
-            'unrealized_pnl': unrealized_pnl,
+            'net_position': self.net_position,
+            'unrealized_pnl': self.get_unrealized_pnl(),
             'open_trades': len(self.open_trades)
         }
 
     def get_equity(self):
-        return self.cash + self.get_open_position_summary()['unrealized_pnl']
+        return self.cash + self.get_unrealized_pnl()
 
     def get_trade_log(self):
         return self.trade_log
@@ -139,13 +228,14 @@ class Broker:
         Returns a formatted string of all closed trades,
         with 'Closed trades:' heading and indented trade lines including PnL.
         """
-        closed_trades = [t for t in self.trade_log if t.get('status') == 'closed']
+        closed_rows = self.trade_log.closed_rows()
 
-        if not closed_trades:
+        if not len(closed_rows):
             return "Closed trades:\n\tNone"
 
         lines = ["Closed trades:"]
-        for trade in closed_trades:
+        for i in closed_rows:
+            trade = self.trade_log.row(i)
             line = (
                 f"\tTrade ID {trade['trade_id']}: "
                 f"{trade['entry_side'].upper()} {trade['qty']} @ {trade['entry_price']} → "
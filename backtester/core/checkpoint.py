@@ -0,0 +1,80 @@
+# backtester/core/checkpoint.py
+# Author: Krittin Hirunchupong
+
+'''
+checkpoint.py
+    This module saves the state of a BacktestEngine run to disk so it can be continued later, either on the same
+    data (a long run that was killed) or on the same data with new bars appended (the daily update), at the cost of
+    the new bars only instead of the whole history:
+
+        engine.run(checkpoint_path='sma.ckpt')                  # Full run, saves the state at the end
+        ...
+        engine = BacktestEngine.resume('sma.ckpt', df)          # df: the same history plus the new bars
+        engine.run(checkpoint_path='sma.ckpt')                  # Runs only the new bars, saves again
+
+    run(checkpoint_path=..., checkpoint_every=N) also saves every N bars during the run.
+
+    A checkpoint holds the strategy (its attributes and streaming indicators, without the data), the broker (cash,
+    open trades, resting orders, trade log), the RunningMetrics and the curves stored so far, all in one pickle.
+    Results after resuming are identical to a full rerun on the longer data. The strategy's state must live in its
+    attributes, and must not depend on bars it hasn't seen yet (arrays precomputed from the whole data in __init__
+    are not recomputed on resume).
+
+    The data given to resume() must start with the bars of the checkpoint: the timestamp and Close of the last bar
+    run are checked (not the whole history, which would cost as much as rerunning it).
+'''
+
+import os
+import pickle
+
+import numpy as np
+
+CHECKPOINT_FORMAT = 1
+
+
+def save_checkpoint(engine, path: str, bars_done: int, stored: int):
+    """Saves the state of 'engine' after its first bars_done bars, stored = number of curve values written."""
+    bars = engine.bars
+    state = {
+        'format': CHECKPOINT_FORMAT,
+        'bars_done': bars_done,
+        'last_timestamp': bars.index[bars_done - 1] if bars_done else None,
+        'last_close': np.array(bars['Close'][bars_done - 1]) if bars_done else None,  # A vector for a Panel
+        'strategy': engine.strategy,
+        'broker': engine.broker,
+        'metrics': engine.metrics,
+        'equity_curve': engine.equity_curve[:stored].copy(),
+        'pnl_curve': engine.pnl_curve[:stored].copy(),
+        'store_curve': engine.store_curve,
+        'curve_step': engine.curve_step,
+        'curve_dtype': engine.curve_dtype.name,
+    }
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)  # A run killed while saving keeps the previous checkpoint
+
+
+def load_checkpoint(path: str) -> dict:
+    with open(path, 'rb') as f:
+        state = pickle.load(f)
+    if not isinstance(state, dict) or state.get('format') != CHECKPOINT_FORMAT:
+        raise ValueError(f"'{path}' is not a checkpoint of this version of the backtester")
+    return state
+
+
+def check_continuation(state: dict, bars):
+    """Raises ValueError unless bars starts with the bars the checkpoint was run on."""
+    bars_done = state['bars_done']
+    if len(bars) < bars_done:
+        raise ValueError(f"The checkpoint has run {bars_done} bars, the data only has {len(bars)}")
+    if not bars_done:
+        return
+    timestamp = bars.index[bars_done - 1]
+    close = bars['Close'][bars_done - 1]
+    if timestamp != state['last_timestamp'] or not np.array_equal(close, state['last_close'], equal_nan=True):
+        raise ValueError(f"The data doesn't continue the checkpoint: bar {bars_done - 1} is "
+                         f"({timestamp}, {close}), the checkpoint ended on "
+                         f"({state['last_timestamp']}, {state['last_close']})")
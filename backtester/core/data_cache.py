@@ -0,0 +1,150 @@
+# backtester/core/data_cache.py
+# Author: Krittin Hirunchupong
+
+'''
+data_cache.py
+    This module keeps a local on-disk copy of downloaded market data so repeated research runs don't hit Yahoo again.
+    There is one file per ticker and interval (Parquet when pyarrow/fastparquet is installed, pickle otherwise) and a
+    small JSON file that remembers which date ranges have already been fetched.
+    Only the missing date ranges are fetched and merged in, and in offline mode the network is never touched.
+
+    Layout:
+        <cache_dir>/<interval>/<ticker>.parquet   (or .pkl)
+        <cache_dir>/<interval>/<ticker>.json      fetched ranges, e.g. [["2023-01-01", "2023-06-01"]]
+'''
+
+import importlib.util
+import json
+import os
+
+import pandas as pd
+
+HAS_PARQUET = any(importlib.util.find_spec(name) is not None for name in ('pyarrow', 'fastparquet'))
+
+
+def _naive(ts):
+    ts = pd.Timestamp(ts)
+    return ts.tz_convert(None) if ts.tz is not None else ts
+
+
+def _merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def missing_ranges(covered, start, end):
+    """Returns the parts of [start, end) that are not inside any of the covered [start, end) ranges."""
+    missing = []
+    cursor = start
+    for covered_start, covered_end in _merge_ranges(covered):
+        if covered_end <= cursor:
+            continue
+        if covered_start >= end:
+            break
+        if covered_start > cursor:
+            missing.append((cursor, covered_start))
+        cursor = max(cursor, covered_end)
+    if cursor < end:
+        missing.append((cursor, end))
+    return missing
+
+
+class MarketDataCache:
+    def __init__(self, cache_dir: str, fetcher=None, offline: bool = False):
+        """
+        fetcher is called as fetcher(ticker, start, end, interval) with start/end as pd.Timestamp and returns a
+        DataFrame with a datetime index, in the same shape as DataHandler.from_yahoo().
+        It can be any local stand-in for the real data source.
+        """
+        self.cache_dir = cache_dir
+        self.fetcher = fetcher
+        self.offline = offline
+        self.extension = '.parquet' if HAS_PARQUET else '.pkl'
+
+    def _path(self, ticker, interval, extension):
+        safe_ticker = ticker.replace('/', '_').replace(os.sep, '_')
+        return os.path.join(self.cache_dir, interval, safe_ticker + extension)
+
+    def _read_ranges(self, ticker, interval):
+        path = self._path(ticker, interval, '.json')
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return [[pd.Timestamp(start), pd.Timestamp(end)] for start, end in json.load(f)]
+
+    def _write_ranges(self, ticker, interval, ranges):
+        with open(self._path(ticker, interval, '.json'), 'w') as f:
+            json.dump([[start.isoformat(), end.isoformat()] for start, end in _merge_ranges(ranges)], f)
+
+    def _read(self, ticker, interval, columns=None):
+        path = self._path(ticker, interval, self.extension)
+        if not os.path.exists(path):
+            return None
+        if self.extension == '.parquet':
+            return pd.read_parquet(path, columns=columns)
+        df = pd.read_pickle(path)
+        return df[columns] if columns is not None else df
+
+    def _write(self, ticker, interval, df):
+        os.makedirs(os.path.join(self.cache_dir, interval), exist_ok=True)
+        path = self._path(ticker, interval, self.extension)
+        tmp_path = path + '.tmp'
+        if self.extension == '.parquet':
+            df.to_parquet(tmp_path)
+        else:
+            df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)  # Never leave a half written file behind
+
+    def is_cached(self, ticker, start, end, interval='1d') -> bool:
+        return not missing_ranges(self._read_ranges(ticker, interval), _naive(start), _naive(end))
+
+    def get(self, ticker: str, start: str, end: str, interval: str = '1d', columns=None) -> pd.DataFrame:
+        """
+        Returns the bars of 'ticker' in [start, end), fetching and storing only the ranges that are not cached yet.
+        columns limits the columns that are read from disk.
+        """
+        start, end = _naive(start), _naive(end)
+        ranges = self._read_ranges(ticker, interval)
+        to_fetch = missing_ranges(ranges, start, end)
+
+        if to_fetch and self.offline:
+            if not ranges:
+                raise ValueError(f"No cached data for {ticker} ({interval}) and the cache is offline")
+            to_fetch = []
+
+        if to_fetch:
+            if self.fetcher is None:
+                raise ValueError("MarketDataCache needs a fetcher to download missing data")
+
+            frames = []
+            now = pd.Timestamp.now(tz='UTC').tz_localize(None)  # Naive UTC, like the bars
+            for fetch_start, fetch_end in to_fetch:
+                df = self.fetcher(ticker, fetch_start, fetch_end, interval)
+                if df is not None and not df.empty:
+                    frames.append(df)
+                # A range without any bars (a holiday, before the listing) is fetched too, so it isn't asked again.
+                # The most recent bars may still change, so ranges are only marked as fetched up to now
+                if fetch_start < now:
+                    ranges.append([fetch_start, min(fetch_end, now)])
+
+            if frames:
+                cached = self._read(ticker, interval)
+                merged = pd.concat(frames if cached is None else [cached] + frames)
+                merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+                self._write(ticker, interval, merged)
+            os.makedirs(os.path.join(self.cache_dir, interval), exist_ok=True)
+            self._write_ranges(ticker, interval, ranges)
+
+        df = self._read(ticker, interval, columns=columns)
+        if df is None:
+            return pd.DataFrame()
+
+        lower, upper = start, end
+        if getattr(df.index, 'tz', None) is not None:
+            lower, upper = lower.tz_localize(df.index.tz), upper.tz_localize(df.index.tz)
+        return df.iloc[df.index.searchsorted(lower):df.index.searchsorted(upper)]
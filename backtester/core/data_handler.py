@@ -12,15 +12,52 @@ PLEASE NOTE: Yahoo has limits...
     - For Daily, Weekly, and Monthly it is around 20 years
 '''
 
+import os
+import random
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
-import yfinance as yf
+
+from backtester.core.bars import Bars, Panel
+from backtester.core.data_cache import MarketDataCache
+from backtester.core.resample import resample_bars, resample_ohlcv
+from backtester.core.sources import download_yahoo
+from backtester.core.store import ColumnStore, convert_csv_to_store, is_store_current
+
+VALID_INTERVALS = ['1m', '2m', '5m', '15m', '30m', '60m', '90m', 
+                   '1h', '1d', '5d', '1wk', '1mo', '3mo']
 
 
 class DataHandler:
-    def __init__(self):
-        pass
+    '''
+    cache_dir turns on the local market data cache for from_yahoo() (defaults to the BACKTESTER_CACHE_DIR
+    environment variable, no cache if neither is set). With offline=True only cached data is used.
+    fetcher replaces the Yahoo download, it is called as fetcher(ticker, start, end, interval).
+    Any source from sources.py (CsvDirectorySource, HttpSource, ...) can be used as the fetcher.
+    '''
+    def __init__(self, cache_dir: str = None, offline: bool = False, fetcher=None):
+        cache_dir = cache_dir or os.environ.get('BACKTESTER_CACHE_DIR')
+        self.fetcher = fetcher or download_yahoo
+        self.cache = MarketDataCache(cache_dir, fetcher=self.fetcher, offline=offline) if cache_dir else None
+        if offline and self.cache is None:
+            raise ValueError("offline=True needs a cache_dir")
+
+    '''
+    from_csv()
+    Without store_dir the CSV is parsed into a DataFrame like before.
+    With store_dir the CSV is converted once into a binary columnar store (again only if the CSV, datetime_col or
+    dtype changed), and the store is opened with from_store(), so later calls skip parsing and return memory
+    mapped Bars.
+    '''
+    def from_csv(self, file_path: str, datetime_col: str = 'Date', store_dir: str = None, columns=None,
+                 start=None, end=None, dtype: str = 'float64'):
+        if store_dir is not None:
+            if not is_store_current(store_dir, file_path, datetime_col=datetime_col, dtype=dtype):
+                convert_csv_to_store(file_path, store_dir, datetime_col=datetime_col, dtype=dtype)
+            return self.from_store(store_dir, columns=columns, start=start, end=end)
 
-    def from_csv(self, file_path: str, datetime_col: str = 'Date') -> pd.DataFrame:
         df = pd.read_csv(file_path, parse_dates=[datetime_col])
         df.set_index(datetime_col, inplace=True)
         df = df.sort_index()
@@ -28,21 +65,79 @@ class DataHandler:
         df.columns = [col.replace('Adjclose', 'AdjClose') for col in df.columns]
         return df
 
-    def from_yahoo(self, ticker: str, start: str, end: str, interval: str = '1d') -> pd.DataFrame:
-        valid_intervals = ['1m', '2m', '5m', '15m', '30m', '60m', '90m', 
-                           '1h', '1d', '5d', '1wk', '1mo', '3mo']
+    '''
+    from_store()
+    Opens a store written by convert_csv_to_store() and returns Bars of the requested columns and date range
+    [start, end). The engine runs on Bars directly.
+    '''
+    def from_store(self, store_dir: str, columns=None, start=None, end=None) -> Bars:
+        return ColumnStore(store_dir).load(columns=columns, start=start, end=end)
 
-        if interval not in valid_intervals:
-            raise ValueError(f"Invalid interval '{interval}'. Must be one of: {valid_intervals}")
+    def from_yahoo(self, ticker: str, start: str, end: str, interval: str = '1d', columns=None) -> pd.DataFrame:
+        if interval not in VALID_INTERVALS:
+            raise ValueError(f"Invalid interval '{interval}'. Must be one of: {VALID_INTERVALS}")
 
-        df = yf.download(ticker, start=start, end=end, interval=interval, auto_adjust=False)
-        df.dropna(inplace=True)
+        if self.cache is not None:
+            return self.cache.get(ticker, start, end, interval=interval, columns=columns)
 
-        # Flatten MultiIndex if needed
-        if isinstance(df.columns, pd.MultiIndex):
-            df.columns = [col[0].replace(' ', '') for col in df.columns]
+        df = self.fetcher(ticker, start, end, interval)
+        return df[columns] if columns is not None else df
 
-        df.columns = [col.title().replace('Adjclose', 'AdjClose') for col in df.columns]
-        df.index.name = 'Datetime'
+    '''
+    resample()
+    Builds coarser bars ('5m', '15m', '1h', '1d', ...) out of finer ones, e.g. from_yahoo() 1m bars into 1h bars.
+    Works on a DataFrame or on Bars (returns the same type). Buckets are labelled by their start time.
+    '''
+    def resample(self, data, rule: str):
+        if isinstance(data, Bars):
+            return resample_bars(data, rule)
+        return resample_ohlcv(data, rule)
 
-        return df
+    '''
+    load_many()
+    Fetches many tickers concurrently, max_workers at a time (from_yahoo() for each, so through the fetcher and the
+    cache), and aligns them into one Panel (see Panel.from_frames()). A failed fetch is retried up to 'retries' times
+    with exponential backoff (backoff, 2 * backoff, ... seconds, jittered) unless the fetcher's is_retryable() says
+    it is pointless. ValueErrors (bad arguments, unparsable data) are never retried.
+    A ticker that still fails, or has no bars, is left out of the panel and reported: as (panel, errors) with
+    errors = {ticker: message} when return_errors=True, otherwise as a warning. ValueError if every ticker failed.
+    The fetcher is called from several threads at once.
+    '''
+    def load_many(self, tickers, start, end, interval: str = '1d', columns=('Open', 'High', 'Low', 'Close', 'Volume'),
+                  max_workers: int = 8, retries: int = 3, backoff: float = 0.5, return_errors: bool = False):
+        tickers = list(dict.fromkeys(tickers))  # Drops duplicates, keeps the order
+        if not tickers:
+            raise ValueError("load_many() needs at least one ticker")
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+
+        def load(ticker):
+            for attempt in range(retries + 1):
+                try:
+                    df = self.from_yahoo(ticker, start, end, interval=interval)
+                except Exception as error:
+                    is_retryable = getattr(self.fetcher, 'is_retryable', None)
+                    if (attempt == retries or isinstance(error, ValueError)
+                            or (is_retryable is not None and not is_retryable(error))):
+                        return None, f"{type(error).__name__}: {error} (attempt {attempt + 1} of {retries + 1})"
+                    time.sleep(backoff * 2 ** attempt * random.uniform(0.5, 1.0))
+                    continue
+                if df is None or df.empty:
+                    return None, "no data"
+                return df, None
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(tickers))) as pool:
+            loaded = list(pool.map(load, tickers))
+
+        frames = {ticker: df for ticker, (df, _) in zip(tickers, loaded) if df is not None}
+        errors = {ticker: error for ticker, (_, error) in zip(tickers, loaded) if error is not None}
+        if not frames:
+            raise ValueError("No ticker could be loaded: " + "; ".join(f"{t}: {e}" for t, e in errors.items()))
+
+        panel = Panel.from_frames(frames, columns=columns)
+        if return_errors:
+            return panel, errors
+        if errors:
+            warnings.warn(f"load_many() skipped {len(errors)} ticker(s): "
+                          + "; ".join(f"{t}: {e}" for t, e in errors.items()))
+        return panel
@@ -5,50 +5,349 @@
 engine.py
     This module constructs an engine in order to execute the backtest.
     Can be executed by just calling run() after initializing an engine object. 
+    Strategies that implement generate_signals() can also be executed in one pass with run_vectorized().
+    Passing a Panel (many symbols aligned on one index) with a PortfolioBroker runs a multi-asset backtest:
+    every bar pushes the vector of all symbols' prices to the broker.
+    BacktestEngine(..., profile=True) times every phase of the run (see profiler.py).
+    The broker's resting stop/limit orders are processed on every bar before the strategy's on_data().
+    run(checkpoint_path=...) saves the state of the run, BacktestEngine.resume() continues it on appended bars
+    (see checkpoint.py).
 '''
 
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from backtester.core.bars import Bars, Panel
+from backtester.core.checkpoint import check_continuation, load_checkpoint, save_checkpoint
+from backtester.core.profiler import Profiler
+from backtester.core.vectorized import simulate_positions
+from backtester.utils.performance import RunningMetrics
+
 
 class BacktestEngine:
     """
     The main loop that runs a strategy on historical data.
     """
 
-    def __init__(self, strategy_class, data, broker, **strategy_kwargs):
+    def __init__(self, strategy_class, data, broker, profile=False, store_curve=True, curve_step=1, metrics=None,
+                 curve_dtype='float64', bars=None, **strategy_kwargs):
+        '''
+        profile=True (or a Profiler, for cProfile/tracemalloc capture) turns on the instrumentation,
+        see backtester.core.profiler. The report is in get_results()['profile'].
+
+        Performance metrics are computed while the run goes (see RunningMetrics) and returned in
+        get_results()['metrics'], so the curves are not needed for them. store_curve=False skips storing the
+        equity/PnL curves and curve_step=N only stores every N-th bar (and the last one), for very long runs.
+        metrics can be a RunningMetrics to choose its freq or rolling window.
+
+        The curves are NumPy arrays preallocated before the run (curve_dtype='float32' halves their memory),
+        and timestamps is the matching slice of the data's index.
+
+        bars is data already converted to Bars, for engines that share one conversion (see FanOutEngine).
+        '''
+        self._setup(data, broker, profile, store_curve, curve_step, metrics, curve_dtype, bars)
+        self.strategy = strategy_class(data, broker, **strategy_kwargs)
+        self.strategy.set_bars(self.bars)
+
+    def _setup(self, data, broker, profile, store_curve, curve_step, metrics, curve_dtype, bars):
         self.data = data
         self.broker = broker
-        self.strategy = strategy_class(data, broker, **strategy_kwargs)
+        if bars is None:
+            bars = data if isinstance(data, Bars) else Bars.from_dataframe(data)
+        self.bars = bars  # Converted once, shared with the strategy
 
-        self.equity_curve = []  # Portfolio value over time
-        self.pnl_curve = []     # PnL (unrealized) over time
-        self.timestamps = []    # Timestamps for plotting
+        if curve_dtype not in ('float64', 'float32'):
+            raise ValueError(f"Invalid curve_dtype '{curve_dtype}'. Must be 'float64' or 'float32'")
+        self.curve_dtype = np.dtype(curve_dtype)
+        self.equity_curve = np.empty(0, dtype=self.curve_dtype)  # Portfolio value over time
+        self.pnl_curve = np.empty(0, dtype=self.curve_dtype)     # PnL (unrealized) over time
+        self.timestamps = self.bars.index[:0]                    # Timestamps for plotting
         self.start_index = None
         self.end_index = None
+        self.profiler = (profile if isinstance(profile, Profiler) else Profiler()) if profile else None
 
+        self.store_curve = store_curve
+        self.curve_step = max(1, int(curve_step))
+        self.metrics = metrics if metrics is not None else RunningMetrics()
+        if self.metrics.trade_log is None:
+            self.metrics.trade_log = broker.trade_log
 
-    def run(self):
-        for i in range(len(self.data)):
+        self.start_bar = 0            # First bar run() processes, past the checkpoint's bars when resumed
+        self._resumed_curves = None   # (equity curve, pnl curve) of the checkpoint
+
+    @classmethod
+    def resume(cls, checkpoint_path, data, profile=False, bars=None):
+        '''
+        Engine that continues the run saved in checkpoint_path (see checkpoint.py) on data, which must start with
+        the checkpoint's bars and may have new bars appended. run() then only runs the new bars, and the results
+        are the same as a full run on data. The curve settings are the checkpoint's.
+        '''
+        state = load_checkpoint(checkpoint_path)
+        engine = cls.__new__(cls)
+        engine._setup(data, state['broker'], profile, state['store_curve'], state['curve_step'], state['metrics'],
+                      state['curve_dtype'], bars)
+        check_continuation(state, engine.bars)
+
+        engine.strategy = state['strategy']
+        engine.strategy.data = data
+        engine.strategy.set_bars(engine.bars)  # Rebinds its indicators and timeframes to the new bars
+        engine.start_bar = state['bars_done']
+        engine._resumed_curves = (state['equity_curve'], state['pnl_curve'])
+        return engine
+
+
+    def run(self, checkpoint_path=None, checkpoint_every=None):
+        '''
+        checkpoint_path saves the state of the run there, so that BacktestEngine.resume() can continue it later on
+        appended bars (see checkpoint.py), and checkpoint_every=N also saves it every N bars during the run.
+        The final checkpoint is taken right before the last bar: strategies may act on is_last_bar() (e.g. close
+        their trades), which a longer run doesn't do, so resume() runs that bar again as an ordinary bar.
+        '''
+        if checkpoint_every is not None and (checkpoint_path is None or checkpoint_every < 1):
+            raise ValueError("checkpoint_every needs a checkpoint_path and must be at least 1")
+
+        n = len(self.bars)
+        step, equity_curve, pnl_curve = self._allocate_curves()
+        k = self._restore_curves(step)
+        start = self.start_bar
+        # The loop runs in segments between checkpoints, so the bar loop itself has no extra check
+        stops = []
+        if checkpoint_every:
+            stops = list(range((start // checkpoint_every + 1) * checkpoint_every, n - 1, checkpoint_every))
+        if checkpoint_path is not None and n > start:
+            stops.append(n - 1)
+
+        profiler = self.profiler
+        if profiler is not None:
+            stages = dict.fromkeys(('indicators', 'broker', 'on_data', 'loop', 'checkpoint'), 0.0)
+            trades_before = len(self.broker.trade_log)
+            profiler.start()
+        first_bar = start
+        for stop in stops + [n]:
+            if profiler is None:
+                k = self._run_bars(start, stop, k, step, equity_curve, pnl_curve)
+            else:
+                with self._timed_stages(stages):
+                    k = self._run_bars(start, stop, k, step, equity_curve, pnl_curve)
+            start = stop
+            if stop < n:
+                t0 = time.perf_counter()
+                save_checkpoint(self, checkpoint_path, stop, k)
+                if profiler is not None:
+                    stages['checkpoint'] += time.perf_counter() - t0
+        if profiler is not None:
+            profiler.stop(bars=n - first_bar, trades=len(self.broker.trade_log) - trades_before)
+        self._finish_curves(k)
+
+        if profiler is not None:
+            # Bookkeeping is the rest of the loop: the curves, the running metrics and the loop itself
+            loop = stages.pop('loop')
+            checkpoint = stages.pop('checkpoint')
+            stages['bookkeeping'] = max(0.0, loop - sum(stages.values()))
+            for stage, seconds in stages.items():
+                profiler.add(stage, seconds)
+            if checkpoint:
+                profiler.add('checkpoint', checkpoint)
+            self._record_memory()
+
+    def _run_bars(self, start, stop, k, step, equity_curve, pnl_curve):
+        # Runs bars [start, stop), k is the number of curve values stored so far, returns the new one
+        close = self.bars['Close']
+        last = len(self.bars) - 1
+        update_metrics = self.metrics.update
+        # Iterating the index boxes the timestamps in chunks, much cheaper than index[i] on every bar
+        for i, timestamp in enumerate(self.bars.index[start:stop], start):
             self.strategy.set_index(i)
+            self.strategy.update_indicators(i)
 
-            price = self.data.iloc[i]['Close']
-            timestamp = self.data.index[i]
+            price = close[i]
 
             self.broker.update_price(price)
+            if self.broker.orders:
+                self._process_orders(i, price, timestamp)
             self.strategy.on_data(timestamp=timestamp)
 
-            if self.start_index is None:
-                self.start_index = i
-            self.end_index = i
+            unrealized_pnl = self.broker.get_unrealized_pnl()
+            equity = self.broker.cash + unrealized_pnl
+            update_metrics(equity, bool(self.broker.open_trades))
+            if step and (step == 1 or i % step == 0 or i == last):
+                equity_curve[k] = equity
+                pnl_curve[k] = unrealized_pnl
+                k += 1
+        return k
+
+    def _allocate_curves(self):
+        # Preallocates the curves for every stored bar, returns (step, equity_curve, pnl_curve)
+        n = len(self.bars)
+        step = self.curve_step if self.store_curve else 0
+        size = len(self._curve_positions(n, step))
+        self.equity_curve = np.empty(size, dtype=self.curve_dtype)
+        self.pnl_curve = np.empty(size, dtype=self.curve_dtype)
+        self.start_index = 0 if n else None
+        self.end_index = None
+        return step, self.equity_curve, self.pnl_curve
+
+    def _restore_curves(self, step):
+        # Copies the checkpoint's curves into the allocated ones, returns the number of values copied
+        if self._resumed_curves is None:
+            return 0
+        equity_curve, pnl_curve = self._resumed_curves
+        stored = len(equity_curve) if step else 0  # Checkpoints are taken before the last bar, all on the grid
+        self.equity_curve[:stored] = equity_curve[:stored]
+        self.pnl_curve[:stored] = pnl_curve[:stored]
+        return stored
+
+    @staticmethod
+    def _curve_positions(n, step):
+        if not step or not n:
+            return np.empty(0, dtype=np.intp)
+        positions = np.arange(0, n, step)
+        return positions if positions[-1] == n - 1 else np.append(positions, n - 1)
+
+    def _finish_curves(self, stored):
+        # Settles the bookkeeping once after the loop (stored = number of curve values written)
+        n = len(self.bars)
+        self.end_index = n - 1 if n else None
+        step = self.curve_step if self.store_curve else 0
+        self.equity_curve = self.equity_curve[:stored]
+        self.pnl_curve = self.pnl_curve[:stored]
+        if step == 1:
+            self.timestamps = self.bars.index[:stored]  # The index itself, nothing is copied
+        else:
+            self.timestamps = self.bars.index[self._curve_positions(n, step)[:stored]]
+
+
+    def _process_orders(self, i, price, timestamp):
+        # Resting stop/limit orders fill before the strategy sees the bar
+        bars = self.bars
+        if self.broker.intrabar and 'High' in bars and 'Low' in bars:
+            open_price = bars['Open'][i] if 'Open' in bars else None
+            self.broker.process_orders(price, high=bars['High'][i], low=bars['Low'][i], open_price=open_price,
+                                       timestamp=timestamp)
+        else:
+            self.broker.process_orders(price, timestamp=timestamp)
+
+    @contextmanager
+    def _timed_stages(self, stages):
+        # Profiled runs time the stages of the same _run_bars() loop: the strategy's and broker's stage methods are
+        # shadowed by timed wrappers for the segment, so unprofiled runs pay nothing. Calls made inside a timed
+        # stage (e.g. on_data() asking the broker for its PnL) count for the outer stage only.
+        clock = time.perf_counter
+        depth = [0]
+
+        def timed(method, stage):
+            def wrapper(*args, **kwargs):
+                if depth[0]:
+                    return method(*args, **kwargs)
+                depth[0] += 1
+                t0 = clock()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    stages[stage] += clock() - t0
+                    depth[0] -= 1
+            return wrapper
+
+        targets = [(self.strategy, 'update_indicators', 'indicators'), (self.strategy, 'on_data', 'on_data'),
+                   (self.broker, 'update_price', 'broker'), (self.broker, 'get_unrealized_pnl', 'broker'),
+                   (self, '_process_orders', 'broker')]
+        for owner, name, stage in targets:
+            setattr(owner, name, timed(getattr(owner, name), stage))
+        t0 = clock()
+        try:
+            yield
+        finally:
+            for owner, name, _ in targets:
+                delattr(owner, name)  # Back to the class's method, the wrappers never reach a checkpoint
+            stages['loop'] += clock() - t0
+
+    def _record_memory(self):
+        self.profiler.record_memory(timestamps=self.timestamps, equity_curve=self.equity_curve,
+                                    pnl_curve=self.pnl_curve, trade_log=self.broker.trade_log)
+
+
+    def run_vectorized(self):
+        """
+        Runs the strategy from the target positions returned by strategy.generate_signals(data).
+        Fills happen at the Close of the bar, exactly like the event loop, and the broker is left in the same
+        state (cash, open trades, trade log) so get_results() and the broker can be used the same way after.
+        """
+        if isinstance(self.bars, Panel):
+            raise ValueError("run_vectorized() is not supported for multi-asset Panel data, use run()")
+        if self.start_bar:
+            raise ValueError("run_vectorized() can't continue a checkpoint, use run()")
+        if self.broker.open_trades or self.broker.orders:
+            raise ValueError("run_vectorized() needs a broker without open trades or resting orders")
+
+        profiler = self.profiler
+        if profiler is not None:
+            trades_before = len(self.broker.trade_log)
+            profiler.start()
+            t0 = time.perf_counter()
+
+        signals = self.strategy.generate_signals(self.bars)
+        positions, exits = signals if isinstance(signals, tuple) else (signals, None)
+        if profiler is not None:
+            t1 = time.perf_counter()
+            profiler.add('signals', t1 - t0)
+
+        close = self.bars['Close']
+        sim = simulate_positions(close, positions, exits=exits, timestamps=self.bars.index,
+                                 initial_cash=self.broker.cash, commission=self.broker.commission,
+                                 first_trade_id=self.broker.next_trade_id, close_at_end=self.strategy.close_at_end)
+
+        self.broker.cash = sim['cash'][-1] if len(close) else self.broker.cash
+        self.broker.trade_log.extend(sim['trade_log'])
+        self.broker.next_trade_id = sim['next_trade_id']
+        for trade_id, side, qty, price, timestamp in sim['open_lots']:
+            self.broker.open_trades[trade_id] = {
+                'trade_id': trade_id,
+                'side': side,
+                'qty': qty,
+                'price': price,
+                'timestamp': timestamp,
+                'status': 'open'
+            }
+            direction = 1 if side == 'buy' else -1
+            self.broker.net_position += direction * qty
+            self.broker.cost_basis += direction * qty * price
+        self.broker.realized_pnl += float(sim['trade_log'].closed_pnl.sum())
+        if len(close):
+            self.broker.update_price(close[-1])
+
+        self.metrics.update_many(sim['equity_curve'], sim['net_position'] != 0)
+        step, equity_curve, pnl_curve = self._allocate_curves()
+        keep = self._curve_positions(len(close), step)
+        equity_curve[:] = sim['equity_curve'][keep]
+        pnl_curve[:] = sim['pnl_curve'][keep]
+        self._finish_curves(len(keep))
 
-            self.timestamps.append(timestamp)
-            self.equity_curve.append(self.broker.get_equity())
-            self.pnl_curve.append(self.broker.get_open_position_summary()['unrealized_pnl'])
+        if profiler is not None:
+            profiler.add('simulate', time.perf_counter() - t1)
+            profiler.stop(bars=len(close), trades=len(self.broker.trade_log) - trades_before)
+            self._record_memory()
 
 
-    def get_results(self):
-        return {
+    def get_results(self, as_series=False):
+        '''
+        The curves are NumPy arrays and timestamps the matching index. as_series=True returns the curves as
+        pandas Series on the timestamps instead, sharing the arrays' memory.
+        '''
+        equity_curve, pnl_curve = self.equity_curve, self.pnl_curve
+        if as_series:
+            import pandas as pd
+            equity_curve = pd.Series(equity_curve, index=self.timestamps, name='equity', copy=False)
+            pnl_curve = pd.Series(pnl_curve, index=self.timestamps, name='pnl', copy=False)
+        results = {
             'timestamps': self.timestamps,
-            'equity_curve': self.equity_curve,
-            'pnl_curve': self.pnl_curve,
-            'final_equity': self.equity_curve[-1] if self.equity_curve else self.broker.cash,
-            'trade_log': self.broker.get_trade_log()
+            'equity_curve': equity_curve,
+            'pnl_curve': pnl_curve,
+            'final_equity': self.metrics.last_equity if self.metrics.last_equity is not None else self.broker.cash,
+            'trade_log': self.broker.get_trade_log(),
+            'metrics': self.metrics.report()
         }
+        if self.profiler is not None:
+            results['profile'] = self.profiler.report()
+        return results
@@ -0,0 +1,145 @@
+# backtester/core/fanout.py
+# Author: Krittin Hirunchupong
+
+'''
+fanout.py
+    This module runs many strategy instances (different strategies, or one strategy with many parameter sets) on the
+    same data in a single pass over the bars. Every instance has its own broker and its own results, but the work
+    that doesn't depend on the instance is done once:
+        - the data is converted to Bars once and shared
+        - every bar's timestamp and Close are read once per bar, not once per instance
+        - streaming indicators are shared: the instances are built inside an IndicatorPool, so every instance that
+          asks for e.g. SMA('Close', 50) gets the same SMA, updated once per bar
+        - whole-column indicator_array() results are shared through the Bars' indicator cache
+        - performance metrics are updated in vectorized blocks of bars rather than bar by bar
+    Each instance ends up with the same trades and curves as its own BacktestEngine.run() (the metrics can differ
+    in the last floating point digits, they are summed in a different order).
+
+    Example:
+        engine = FanOutEngine.from_grid(SmaCrossover, df, {'short_window': [5, 10, 20], 'long_window': [50, 100]})
+        engine.run()
+        for params, results in zip(engine.params, engine.get_results()):
+            ...
+'''
+
+import numpy as np
+
+from backtester.core.bars import Bars
+from backtester.core.broker import Broker
+from backtester.core.engine import BacktestEngine
+from backtester.indicators.base import IndicatorPool
+
+METRICS_BLOCK = 4096  # Bars buffered before the instances' metrics are updated
+
+
+class FanOutEngine:
+    def __init__(self, data, instances, initial_cash=100_000, commission=0.001, broker_factory=None,
+                 store_curve=True, curve_step=1, curve_dtype='float64'):
+        '''
+        instances is a list of (strategy_class, kwargs) pairs. Every instance gets its own broker from
+        broker_factory() (default: Broker(initial_cash, commission)).
+        store_curve, curve_step and curve_dtype apply to every instance (see BacktestEngine).
+        '''
+        instances = list(instances)
+        if not instances:
+            raise ValueError("FanOutEngine needs at least one (strategy_class, kwargs) instance")
+        if broker_factory is None:
+            def broker_factory():
+                return Broker(initial_cash=initial_cash, commission=commission)
+
+        self.data = data
+        self.bars = data if isinstance(data, Bars) else Bars.from_dataframe(data)
+        self.pool = IndicatorPool()
+        self.params = [dict(kwargs) for _, kwargs in instances]
+        self.engines = []
+        with self.pool:
+            for strategy_class, kwargs in instances:
+                self.engines.append(BacktestEngine(strategy_class, data, broker_factory(), store_curve=store_curve,
+                                                   curve_step=curve_step, curve_dtype=curve_dtype, bars=self.bars,
+                                                   **kwargs))
+        self.pool.bind(self.bars)
+
+    @classmethod
+    def from_grid(cls, strategy_class, data, param_grid, **kwargs):
+        """One instance of strategy_class per parameter set of param_grid (a dict of lists or a list of dicts)."""
+        from backtester.sweep import iter_param_grid
+        return cls(data, [(strategy_class, params) for params in iter_param_grid(param_grid)], **kwargs)
+
+    def __len__(self):
+        return len(self.engines)
+
+    @property
+    def strategies(self):
+        return [engine.strategy for engine in self.engines]
+
+    @property
+    def brokers(self):
+        return [engine.broker for engine in self.engines]
+
+    def run(self):
+        bars = self.bars
+        close = bars['Close']
+        last = len(bars) - 1
+        update_shared = self.pool.update_at
+
+        # Equity and exposure are buffered per instance and fed to its RunningMetrics one block of bars at a time
+        # (update_many() is vectorized), instead of one update() call per instance per bar
+        equities = [[] for _ in self.engines]
+        exposures = [[] for _ in self.engines]
+        slots = []
+        step = 0
+        for engine, equity_buffer, exposure_buffer in zip(self.engines, equities, exposures):
+            step, equity_curve, pnl_curve = engine._allocate_curves()
+            slots.append((engine.strategy, engine.broker, engine, equity_buffer.append, exposure_buffer.append,
+                          equity_curve, pnl_curve))
+
+        k = 0
+        for i, timestamp in enumerate(bars.index):
+            update_shared(i)
+            price = close[i]
+            store = step and (step == 1 or i % step == 0 or i == last)
+
+            for strategy, broker, engine, add_equity, add_exposure, equity_curve, pnl_curve in slots:
+                strategy.set_index(i)
+                if strategy.indicators:
+                    strategy.update_indicators(i)  # Indicators added outside the pool
+
+                broker.update_price(price)
+                if broker.orders:
+                    engine._process_orders(i, price, timestamp)
+                strategy.on_data(timestamp=timestamp)
+
+                unrealized_pnl = broker.get_unrealized_pnl()
+                equity = broker.cash + unrealized_pnl
+                add_equity(equity)
+                add_exposure(bool(broker.open_trades))
+                if store:
+                    equity_curve[k] = equity
+                    pnl_curve[k] = unrealized_pnl
+            if store:
+                k += 1
+            if len(equities[0]) == METRICS_BLOCK:
+                self._update_metrics(equities, exposures)
+
+        self._update_metrics(equities, exposures)
+        for engine in self.engines:
+            engine._finish_curves(k)
+
+    def _update_metrics(self, equities, exposures):
+        for engine, equity_buffer, exposure_buffer in zip(self.engines, equities, exposures):
+            engine.metrics.update_many(equity_buffer, np.array(exposure_buffer, dtype=bool))
+            equity_buffer.clear()
+            exposure_buffer.clear()
+
+    def get_results(self, as_series=False) -> list:
+        """One BacktestEngine.get_results() dict per instance, in the order of the instances."""
+        return [engine.get_results(as_series=as_series) for engine in self.engines]
+
+    def summary(self):
+        """DataFrame with one row per instance: the strategy, its parameters and its metrics."""
+        import pandas as pd
+
+        rows = []
+        for engine, params in zip(self.engines, self.params):
+            rows.append({'strategy': type(engine.strategy).__name__, **params, **engine.metrics.report()})
+        return pd.DataFrame(rows)
@@ -0,0 +1,240 @@
+# backtester/core/orders.py
+# Author: Krittin Hirunchupong
+
+'''
+orders.py
+    This module keeps the Broker's resting orders: stop-loss, take-profit and trailing-stop orders attached to an
+    open trade, and limit orders that open a new trade. Orders are kept ordered by their trigger price, so on every
+    bar only the orders that actually trigger are visited, however many are resting.
+
+        Fire when the price falls to the level (sell stops, buy limits, buy take-profits):
+            a max-heap on the level, only the top is checked
+        Fire when the price rises to the level (buy stops, sell limits, sell take-profits):
+            a min-heap on the level
+        Trailing stops:
+            one ladder per (direction, trail) of buckets sorted by the best price seen. A new high (or low for
+            shorts) merges every bucket it passes into one, so moving all the stops of a trend costs about one
+            bucket, not one update per order. Only the bucket closest to the price is checked for a trigger.
+
+    Cancelled orders stay in the heaps and are dropped when they reach the top (lazy deletion).
+
+    Fills:
+        On the close (default), every order is checked against the bar's Close and fills at the Close.
+        With intrabar=True, orders trigger on the bar's High/Low and fill at their level, or at the Open when
+        the bar gapped through the level. Trailing stops are then checked before the bar's High/Low moves them.
+        When a stop and a take-profit/limit both trigger on the same bar, the stop is filled first (worst case).
+'''
+
+import heapq
+from bisect import bisect_left
+
+STOP_TYPES = ('stop_loss', 'trailing_stop')
+
+
+class TrailingLadder:
+    '''
+    Trailing stops with the same direction (1 protects a long, -1 a short) and trail.
+    Buckets are [key, order_ids] sorted by key = direction * best price, so the stops the price moves are at the
+    front and the stop closest to triggering is at the back.
+    '''
+    def __init__(self, direction: int, trail: float):
+        self.direction = direction
+        self.trail = trail
+        self.keys = []
+        self.buckets = []
+        self.bucket_of = {}  # order_id -> its bucket
+
+    def __len__(self):
+        return len(self.bucket_of)
+
+    def add(self, order_id: int, best: float):
+        key = self.direction * best
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            bucket = self.buckets[i]
+            bucket[1].append(order_id)
+        else:
+            bucket = [key, [order_id]]
+            self.keys.insert(i, key)
+            self.buckets.insert(i, bucket)
+        self.bucket_of[order_id] = bucket
+
+    def remove(self, order_id: int):
+        self.bucket_of.pop(order_id, None)  # Left in its bucket, skipped when the bucket fires
+
+    def best(self, order_id: int) -> float:
+        return self.direction * self.bucket_of[order_id][0]
+
+    def level(self, best: float) -> float:
+        return best * (1 - self.direction * self.trail)
+
+    def move(self, price: float):
+        """Moves the best price of every stop that 'price' improves on to 'price'."""
+        key = self.direction * price
+        i = bisect_left(self.keys, key)
+        if i == 0:
+            return
+        if i < len(self.keys) and self.keys[i] == key:
+            i += 1  # A bucket already at this price takes the others
+
+        # Merge the smaller buckets into the largest one, so an order is rarely moved twice
+        moved = self.buckets[:i]
+        target = max(moved, key=lambda bucket: len(bucket[1]))
+        for bucket in moved:
+            if bucket is target:
+                continue
+            live = [order_id for order_id in bucket[1] if self.bucket_of.get(order_id) is bucket]
+            target[1].extend(live)
+            for order_id in live:
+                self.bucket_of[order_id] = target
+        target[0] = key
+        del self.keys[:i], self.buckets[:i]
+        self.keys.insert(0, key)
+        self.buckets.insert(0, target)
+
+    def pop_triggered(self, low: float, high: float):
+        """Yields (order_id, level) of the stops that trigger on a bar that traded between low and high."""
+        while self.buckets:
+            best = self.direction * self.keys[-1]
+            level = self.level(best)
+            if (low > level) if self.direction > 0 else (high < level):
+                return
+            self.keys.pop()
+            bucket = self.buckets.pop()
+            for order_id in bucket[1]:
+                if self.bucket_of.get(order_id) is bucket:
+                    del self.bucket_of[order_id]
+                    yield order_id, level
+
+
+class OrderBook:
+    def __init__(self):
+        self.orders = {}        # order_id -> order dict, resting orders only
+        self.next_order_id = 1
+        self._falling = []      # (-level, order_id), fire when the price falls to the level
+        self._rising = []       # (level, order_id), fire when the price rises to the level
+        self._ladders = {}      # (direction, trail) -> TrailingLadder
+        self._by_trade = {}     # trade_id -> order_ids attached to it
+
+    def __len__(self):
+        return len(self.orders)
+
+    def add(self, order_type: str, side: str, qty, price=None, trade_id=None, trail=None, best=None,
+            timestamp=None) -> int:
+        """
+        Adds a resting order. side is the side of the fill ('sell' to protect a long).
+        price is the trigger level, trail and best are for trailing stops (best is where the trail starts).
+        """
+        if side not in ('buy', 'sell'):
+            raise ValueError("Invalid order side")
+        order_id = self.next_order_id
+        self.next_order_id += 1
+        self.orders[order_id] = {
+            'order_id': order_id,
+            'type': order_type,
+            'side': side,
+            'qty': qty,
+            'price': price,
+            'trail': trail,
+            'trade_id': trade_id,
+            'timestamp': timestamp
+        }
+        if trade_id is not None:
+            self._by_trade.setdefault(trade_id, set()).add(order_id)
+
+        if order_type == 'trailing_stop':
+            direction = 1 if side == 'sell' else -1
+            ladder = self._ladders.get((direction, trail))
+            if ladder is None:
+                ladder = self._ladders[(direction, trail)] = TrailingLadder(direction, trail)
+            ladder.add(order_id, best)
+        else:
+            # A sell stop or a buy limit/take-profit waits for the price to fall, the others for it to rise
+            falls = (side == 'sell') == (order_type == 'stop_loss')
+            if falls:
+                heapq.heappush(self._falling, (-price, order_id))
+            else:
+                heapq.heappush(self._rising, (price, order_id))
+            if len(self._falling) + len(self._rising) > 2 * len(self.orders) + 64:
+                self._compact()
+        return order_id
+
+    def _compact(self):
+        # Drops the cancelled entries once they outnumber the resting orders
+        self._falling = [entry for entry in self._falling if entry[1] in self.orders]
+        self._rising = [entry for entry in self._rising if entry[1] in self.orders]
+        heapq.heapify(self._falling)
+        heapq.heapify(self._rising)
+
+    def cancel(self, order_id: int):
+        """Removes a resting order and returns it (None if it is not resting anymore)."""
+        order = self.orders.pop(order_id, None)
+        if order is None:
+            return None
+        if order['trade_id'] is not None:
+            siblings = self._by_trade.get(order['trade_id'])
+            if siblings is not None:
+                siblings.discard(order_id)
+                if not siblings:
+                    del self._by_trade[order['trade_id']]
+        if order['type'] == 'trailing_stop':
+            direction = 1 if order['side'] == 'sell' else -1
+            self._ladders[(direction, order['trail'])].remove(order_id)
+        return order
+
+    def cancel_trade(self, trade_id: int):
+        """Cancels every order attached to trade_id (called when the trade is closed)."""
+        for order_id in self._by_trade.pop(trade_id, ()):
+            order = self.orders.pop(order_id, None)
+            if order is not None and order['type'] == 'trailing_stop':
+                direction = 1 if order['side'] == 'sell' else -1
+                self._ladders[(direction, order['trail'])].remove(order_id)
+
+    def stop_price(self, order_id: int) -> float:
+        """Current trigger level of an order (moves with the price for trailing stops)."""
+        order = self.orders[order_id]
+        if order['type'] != 'trailing_stop':
+            return order['price']
+        ladder = self._ladders[(1 if order['side'] == 'sell' else -1, order['trail'])]
+        return ladder.level(ladder.best(order_id))
+
+    def trigger(self, close: float, high: float = None, low: float = None, open_price: float = None) -> list:
+        """
+        Returns the orders that trigger on this bar as (order_id, fill price), stops first.
+        Without high/low everything is checked and filled on the close.
+        """
+        intrabar = high is not None and low is not None
+        if not intrabar:
+            high = low = close
+            for ladder in self._ladders.values():
+                ladder.move(close)
+
+        def fill(level, falls):
+            if not intrabar:
+                return close
+            if open_price is None:
+                return level
+            return min(level, open_price) if falls else max(level, open_price)
+
+        triggered = []
+        falling, rising, orders = self._falling, self._rising, self.orders
+        while falling and -falling[0][0] >= low:
+            level, order_id = heapq.heappop(falling)
+            if order_id in orders:
+                triggered.append((order_id, fill(-level, True)))
+        while rising and rising[0][0] <= high:
+            level, order_id = heapq.heappop(rising)
+            if order_id in orders:
+                triggered.append((order_id, fill(level, False)))
+        for ladder in self._ladders.values():
+            for order_id, level in ladder.pop_triggered(low, high):
+                if order_id in orders:
+                    triggered.append((order_id, fill(level, ladder.direction > 0)))
+
+        if intrabar:
+            for ladder in self._ladders.values():
+                ladder.move(high if ladder.direction > 0 else low)
+
+        if len(triggered) > 1:
+            triggered.sort(key=lambda fill: (orders[fill[0]]['type'] not in STOP_TYPES, fill[0]))
+        return triggered
@@ -0,0 +1,156 @@
+# backtester/core/portfolio.py
+# Author: Krittin Hirunchupong
+
+'''
+portfolio.py
+    This module is the multi-asset broker. It shares one cash balance across a universe of symbols and keeps the
+    position, average entry price and cost basis of every symbol in NumPy arrays, so marking to market and
+    rebalancing the whole universe are array operations instead of Python loops over symbols.
+
+    Each symbol holds one net position (no separate lots). Increasing it is logged as an 'open' row and reducing it
+    as a 'closed' row priced against the average entry price, with the symbol name in the trade log.
+    Equity follows Broker: cash + unrealized PnL.
+
+    Used with a Panel (see bars.py):
+        panel = Panel.from_frames({'AAPL': aapl_df, 'MSFT': msft_df})
+        broker = PortfolioBroker(panel.symbols, initial_cash=100_000)
+        engine = BacktestEngine(MomentumRotation, panel, broker, lookback=20, top_k=1)
+'''
+
+import numpy as np
+
+from backtester.core.broker import Broker
+
+
+class PortfolioBroker(Broker):
+    def __init__(self, symbols, initial_cash=100_000, commission=0.001):
+        super().__init__(initial_cash=initial_cash, commission=commission)
+        self.symbols = list(symbols)
+        self.symbol_index = {symbol: j for j, symbol in enumerate(self.symbols)}
+        self.trade_log.symbols = self.symbols
+
+        n = len(self.symbols)
+        self.prices = np.zeros(n)          # Last known price of every symbol
+        self.positions = np.zeros(n)       # Signed quantity per symbol
+        self.avg_price = np.zeros(n)       # Average entry price of the current position
+        self.cost_basis = np.zeros(n)      # positions * avg_price
+        self.trade_ids = np.zeros(n, dtype=np.int64)  # Trade id of each symbol's current position, 0 if flat
+        self.net_position = self.positions
+
+    def _symbols_to_idx(self, symbols):
+        if isinstance(symbols, (str, int, np.integer)):
+            symbols = [symbols]
+        return np.array([self.symbol_index[s] if isinstance(s, str) else int(s) for s in symbols], dtype=np.intp)
+
+    def update_price(self, prices):
+        """Takes the vector of prices of every symbol for the current bar. NaNs keep the last known price."""
+        prices = np.asarray(prices, dtype=float)
+        self.current_price = prices
+        np.copyto(self.prices, prices, where=~np.isnan(prices))
+
+    def _fill(self, idx, delta, prices, timestamp):
+        # Moves the positions of the symbols 'idx' by 'delta' at 'prices', everything as arrays
+        keep = delta != 0
+        idx, delta, prices = idx[keep], delta[keep], prices[keep]
+        if not len(idx):
+            return
+
+        position = self.positions[idx]
+        avg_price = self.avg_price[idx]
+        notional = delta * prices
+        self.cash -= notional.sum() + np.abs(notional).sum() * self.commission
+
+        direction = np.sign(position)
+        closing = np.where(direction * np.sign(delta) < 0, np.minimum(np.abs(delta), np.abs(position)), 0.0)
+        opening = np.abs(delta) - closing
+        realized = closing * (prices - avg_price) * direction
+        self.realized_pnl += realized.sum()
+
+        new_position = position + delta
+        fresh = (opening > 0) & (closing == np.abs(position))   # Opened from flat or flipped sides
+        added = (opening > 0) & ~fresh
+        new_avg = np.where(fresh, prices, avg_price)
+        weighted = np.abs(position) * avg_price + opening * prices
+        np.divide(weighted, np.abs(new_position), out=new_avg, where=added)
+        new_avg = np.where(new_position == 0, 0.0, new_avg)
+
+        self.positions[idx] = new_position
+        self.avg_price[idx] = new_avg
+        self.cost_basis[idx] = new_position * new_avg
+
+        # Log only the symbols that traded
+        for k in range(len(idx)):
+            j = idx[k]
+            if closing[k] > 0:
+                side = 'buy' if direction[k] > 0 else 'sell'
+                self.trade_log.append_close(int(self.trade_ids[j]), side, closing[k], avg_price[k], prices[k],
+                                            realized[k], timestamp, symbol=j)
+                self.open_trades.pop(int(self.trade_ids[j]), None)
+                if new_position[k] == 0:
+                    self.trade_ids[j] = 0
+            if opening[k] > 0:
+                side = 'buy' if delta[k] > 0 else 'sell'
+                if fresh[k]:
+                    self.trade_ids[j] = self.next_trade_id
+                    self.next_trade_id += 1
+                self.trade_log.append_open(int(self.trade_ids[j]), side, opening[k], prices[k], timestamp, symbol=j)
+            if new_position[k] != 0:
+                trade_id = int(self.trade_ids[j])
+                self.open_trades[trade_id] = {
+                    'trade_id': trade_id,
+                    'symbol': self.symbols[j],
+                    'side': 'buy' if new_position[k] > 0 else 'sell',
+                    'qty': abs(new_position[k]),
+                    'price': new_avg[k],
+                    'timestamp': timestamp,
+                    'status': 'open'
+                }
+
+    def order_target_positions(self, targets, prices=None, timestamp=None):
+        """
+        Rebalances every symbol to the signed target quantities in 'targets' (one per symbol) in one step.
+        prices defaults to the current prices.
+        """
+        targets = np.asarray(targets, dtype=float)
+        prices = self.prices if prices is None else np.asarray(prices, dtype=float)
+        idx = np.arange(len(self.symbols))
+        self._fill(idx, targets - self.positions, prices, timestamp)
+
+    def execute_order(self, qty=1, side='buy', price=None, timestamp=None, symbol=None):
+        if symbol is None:
+            raise ValueError("PortfolioBroker.execute_order() needs a symbol")
+        if side not in ('buy', 'sell'):
+            raise ValueError("Invalid order side")
+        idx = self._symbols_to_idx(symbol)
+        price = self.prices[idx] if price is None else np.broadcast_to(np.asarray(price, dtype=float), idx.shape)
+        delta = np.full(len(idx), qty if side == 'buy' else -qty, dtype=float)
+        self._fill(idx, delta, price, timestamp)
+        return int(self.trade_ids[idx[0]])
+
+    def close_trade(self, trade_id, price=None, timestamp=None):
+        if trade_id not in self.open_trades:
+            raise ValueError(f"No open trade with ID {trade_id}")
+        j = self.symbol_index[self.open_trades[trade_id]['symbol']]
+        self.close_symbols([j], price=price, timestamp=timestamp)
+
+    def close_symbols(self, symbols, price=None, timestamp=None):
+        idx = self._symbols_to_idx(symbols)
+        price = self.prices[idx] if price is None else np.broadcast_to(np.asarray(price, dtype=float), idx.shape)
+        self._fill(idx, -self.positions[idx], price, timestamp)
+
+    def close_all_trades(self, price=None, timestamp=None):
+        prices = self.prices if price is None else np.asarray(price, dtype=float)
+        self.order_target_positions(np.zeros(len(self.symbols)), prices=prices, timestamp=timestamp)
+
+    def _exit_order(self, *args, **kwargs):
+        raise ValueError("Resting orders are not supported by PortfolioBroker")
+
+    def place_limit_order(self, *args, **kwargs):
+        raise ValueError("Resting orders are not supported by PortfolioBroker")
+
+    def get_unrealized_pnl(self):
+        return float(self.positions @ self.prices - self.cost_basis.sum())
+
+    def get_position_values(self) -> np.ndarray:
+        """Market value of every symbol's position."""
+        return self.positions * self.prices
@@ -0,0 +1,147 @@
+# backtester/core/profiler.py
+# Author: Krittin Hirunchupong
+
+'''
+profiler.py
+    This module is the opt-in instrumentation of BacktestEngine. It tells where the time of a run goes:
+    cumulative time per phase of the bar loop, bars/sec and trades/sec, and the memory held by the equity/PnL curves
+    and the trade log. cProfile (function level hot spots) and tracemalloc (peak Python allocations) can be
+    captured as well.
+
+    The engine only uses it when asked to: a profiled run goes through the same bar loop as a normal one, with the
+    stage methods of the strategy and the broker wrapped in timers for the run, so a normal run pays nothing.
+
+    Example:
+        engine = BacktestEngine(SmaCrossover, df, broker, profile=True)
+        engine.run()
+        engine.get_results()['profile']            # dict
+        engine.profiler.to_json('profile.json')
+
+    Phases of BacktestEngine.run():
+        indicators   update_indicators()
+        broker       broker.update_price(), the resting orders and the mark to market after on_data()
+        on_data      strategy.on_data(), including the orders it sends to the broker
+        bookkeeping  the rest of the loop: set_index(), reading the bar, the running metrics and the curves
+        checkpoint   saving checkpoints (only with run(checkpoint_path=...))
+    Phases of run_vectorized(): signals (generate_signals()) and simulate (simulate_positions() and broker sync).
+'''
+
+import cProfile
+import io
+import json
+import pstats
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+
+def nbytes(values) -> int:
+    """Approximate memory held by an array or a list of Python objects (the list plus its items)."""
+    if values is None:
+        return 0
+    if hasattr(values, 'nbytes'):
+        return int(values.nbytes)
+    size = sys.getsizeof(values)
+    if len(values):
+        size += len(values) * sys.getsizeof(values[0])
+    return size
+
+
+class Profiler:
+    def __init__(self, cprofile: bool = False, tracemalloc: bool = False, top: int = 20):
+        """
+        cprofile=True records a cProfile of the run (top 'top' functions by cumulative time in the report).
+        tracemalloc=True records the peak memory allocated by Python during the run. Both slow the run down.
+        """
+        self.use_cprofile = cprofile
+        self.use_tracemalloc = tracemalloc
+        self.top = top
+
+        self.phases = {}
+        self.wall_time = 0.0
+        self.bars = 0
+        self.trades = 0
+        self.memory = {}
+        self._profile = None
+        self._started = None
+        self._owns_tracemalloc = False
+        self.tracemalloc_peak = None
+
+    def add(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def start(self):
+        if self.use_tracemalloc:
+            self._owns_tracemalloc = not tracemalloc.is_tracing()
+            if self._owns_tracemalloc:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        if self.use_cprofile:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        self._started = time.perf_counter()
+
+    def stop(self, bars: int, trades: int):
+        self.wall_time += time.perf_counter() - self._started
+        if self._profile is not None:
+            self._profile.disable()
+        if self.use_tracemalloc:
+            self.tracemalloc_peak = tracemalloc.get_traced_memory()[1]
+            if self._owns_tracemalloc:
+                tracemalloc.stop()
+        self.bars += bars
+        self.trades += trades
+
+    def record_memory(self, **arrays):
+        """Memory of the result buffers at the end of the run (they only grow, so this is their peak)."""
+        self.memory = {name: nbytes(values) for name, values in arrays.items()}
+
+    def cprofile_stats(self) -> list:
+        if self._profile is None:
+            return []
+        stats = pstats.Stats(self._profile, stream=io.StringIO())
+        rows = []
+        for (filename, line, function), (_, calls, tottime, cumtime, _) in stats.stats.items():
+            rows.append({'function': f"{filename}:{line}({function})", 'calls': calls,
+                         'tottime': tottime, 'cumtime': cumtime})
+        rows.sort(key=lambda row: row['cumtime'], reverse=True)
+        return rows[:self.top]
+
+    def report(self) -> dict:
+        wall_time = self.wall_time
+        timed = sum(self.phases.values())
+        phases = {phase: {'seconds': seconds, 'share': seconds / wall_time if wall_time else 0.0}
+                  for phase, seconds in self.phases.items()}
+        # Whatever the phase timers don't cover (loop overhead, the timers themselves)
+        phases['other'] = {'seconds': max(0.0, wall_time - timed),
+                           'share': max(0.0, wall_time - timed) / wall_time if wall_time else 0.0}
+        report = {
+            'wall_time': wall_time,
+            'bars': self.bars,
+            'trades': self.trades,
+            'bars_per_sec': self.bars / wall_time if wall_time else 0.0,
+            'trades_per_sec': self.trades / wall_time if wall_time else 0.0,
+            'phases': phases,
+            'memory_bytes': dict(self.memory, total=sum(self.memory.values())),
+        }
+        if self.use_tracemalloc:
+            report['tracemalloc_peak_bytes'] = self.tracemalloc_peak
+        if self.use_cprofile:
+            report['cprofile'] = self.cprofile_stats()
+        return report
+
+    def to_json(self, path: str = None) -> str:
+        """Returns the report as JSON and writes it to 'path' if given."""
+        text = json.dumps(self.report(), indent=2, default=_json_default)
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(text)
+        return text
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
@@ -0,0 +1,137 @@
+# backtester/core/resample.py
+# Author: Krittin Hirunchupong
+
+'''
+resample.py
+    This module builds coarser OHLCV bars (5m, 15m, 1h, 1d, ...) out of finer ones, e.g. 1h bars from the 1m bars
+    Yahoo gives for the last 7 days. Bars are grouped by flooring their timestamps to the bucket size and every
+    bucket is reduced in one NumPy call per column (first Open, max High, min Low, last Close, summed Volume),
+    so there is no Python loop over the bars.
+
+    Timeframe is what a strategy uses to look at a higher timeframe while it runs on the base bars
+    (see Strategy.add_timeframe()). It is computed once before the run, together with an index map that gives,
+    for every base bar, how many higher timeframe bars are fully closed at that point, so the strategy never sees a
+    bar that is still forming and every lookup is O(1).
+'''
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from backtester.core.bars import Bars, Panel
+
+RULE_UNITS = {'s': 'sec', 'm': 'min', 'min': 'min', 'h': 'h', 'd': 'D'}
+FIRST_COLUMNS = ('Open',)
+MAX_COLUMNS = ('High',)
+MIN_COLUMNS = ('Low',)
+SUM_COLUMNS = ('Volume',)
+
+
+def parse_rule(rule) -> pd.Timedelta:
+    """'5m', '15m', '1h', '4h', '1d' (or anything pd.Timedelta understands) as a Timedelta."""
+    if isinstance(rule, pd.Timedelta):
+        return rule
+    match = re.fullmatch(r'(\d+)\s*([a-zA-Z]+)', str(rule).strip())
+    if match and match.group(2).lower() in RULE_UNITS:
+        rule = match.group(1) + RULE_UNITS[match.group(2).lower()]
+    step = pd.Timedelta(rule)
+    if step <= pd.Timedelta(0):
+        raise ValueError(f"Invalid resampling rule '{rule}'")
+    return step
+
+
+def _wall_clock_ns(index) -> np.ndarray:
+    # Buckets follow the local clock (a daily bar is a local day), so time zones are dropped before flooring
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.as_unit('ns').asi8
+
+
+def bucket_starts(index, rule):
+    """
+    Returns (starts, labels): the position of the first bar of every bucket and the bucket's start timestamp.
+    The index must be sorted.
+    """
+    step = parse_rule(rule).value
+    ns = _wall_clock_ns(index)
+    buckets = ns // step
+    if len(buckets):
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1)).astype(np.intp)
+    else:
+        starts = np.empty(0, dtype=np.intp)
+    labels = pd.DatetimeIndex((buckets[starts] * step).view('datetime64[ns]'), name=getattr(index, 'name', None))
+    tz = getattr(index, 'tz', None)
+    if tz is not None:
+        labels = labels.tz_localize(tz, ambiguous='NaT', nonexistent='shift_forward')
+    return starts, labels
+
+
+def reduce_buckets(col, values, starts):
+    """Reduces 'values' over the buckets starting at 'starts' the way column 'col' is aggregated."""
+    if col in FIRST_COLUMNS:
+        return values[starts]
+    if col in MAX_COLUMNS:
+        return np.maximum.reduceat(values, starts, axis=0)
+    if col in MIN_COLUMNS:
+        return np.minimum.reduceat(values, starts, axis=0)
+    if col in SUM_COLUMNS:
+        return np.add.reduceat(values, starts, axis=0)
+    ends = np.append(starts[1:], len(values)) - 1
+    return values[ends]  # Close, AdjClose and anything else: last value of the bucket
+
+
+def resample_bars(bars: Bars, rule) -> Bars:
+    """Resamples Bars (or a Panel, symbol by symbol) to 'rule'. Buckets without bars are skipped."""
+    starts, labels = bucket_starts(bars.index, rule)
+    columns = {col: reduce_buckets(col, values, starts) if len(values) else values for col, values in bars.columns.items()}
+    if isinstance(bars, Panel):
+        return Panel(labels, columns, bars.symbols)
+    return Bars(labels, columns)
+
+
+def resample_ohlcv(df: pd.DataFrame, rule) -> pd.DataFrame:
+    """Resamples an OHLCV DataFrame to 'rule', labelled by the start of each bucket."""
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index()
+    bars = Bars.from_dataframe(df)
+    return resample_bars(bars, rule).to_dataframe()
+
+
+class Timeframe:
+    '''
+    A higher timeframe of some base bars.
+        bars          the resampled Bars
+        closed_count  for every base bar i, the number of resampled bars that are complete once bar i has closed
+
+    A bucket is complete at the base bar whose end (timestamp + base_step) reaches the end of the bucket.
+    If the data has a gap at the end of a bucket, it is complete at the first bar of the next bucket instead.
+    base_step defaults to the smallest spacing of the base index.
+    '''
+    def __init__(self, base: Bars, rule, base_step=None):
+        self.rule = rule
+        step = parse_rule(rule).value
+        self.bars = resample_bars(base, rule)
+
+        n = len(base)
+        ns = _wall_clock_ns(base.index)
+        if base_step is None:
+            diffs = np.diff(ns)
+            diffs = diffs[diffs > 0]
+            base_step = int(diffs.min()) if len(diffs) else step
+        else:
+            base_step = parse_rule(base_step).value
+
+        starts, _ = bucket_starts(base.index, rule)
+        last = np.append(starts[1:], n) - 1
+        bucket_end = (ns[starts] // step + 1) * step
+        closed_at = np.where(ns[last] + base_step >= bucket_end, last, last + 1)
+        self.closed_count = np.cumsum(np.bincount(closed_at, minlength=n + 1)[:n])
+
+    def __len__(self):
+        return len(self.bars)
+
+    def count_at(self, idx: int) -> int:
+        """Number of complete higher timeframe bars at base bar idx."""
+        return int(self.closed_count[idx])
@@ -0,0 +1,230 @@
+# backtester/core/result_cache.py
+# Author: Krittin Hirunchupong
+
+'''
+result_cache.py
+    This module memoizes backtest results on disk, keyed by the content of everything that decides them, so an
+    identical run_backtest() call (same strategy code, kwargs, data, cash, commission, ...) returns the stored
+    results instead of running again. Opt in with run_backtest(..., cache=True) or cache=ResultCache(...).
+
+    The key is a hash of:
+        - the source of the strategy class and its base classes
+        - the source of the backtester package itself (hashed once per process), so engine changes invalidate it
+        - the data's content (data_fingerprint())
+        - initial_cash, commission, mode, the curve settings and the strategy kwargs
+
+    The data is hashed in full on every call (blake2b over the raw column buffers, about a millisecond per MB),
+    never remembered per object, so data modified in place never gets the results of its old values.
+
+    Entries are pickled results (the TradeLog is trimmed to its filled rows), one file each. The cache is kept
+    under max_bytes by deleting the least recently used entries (every hit refreshes the file's mtime).
+
+    Layout (cache_dir defaults to ~/.cache/backtester/results, or $BACKTESTER_RESULT_CACHE_DIR):
+        <cache_dir>/<key[:2]>/<key>.pkl
+    Only files of this layout are counted, evicted and cleared, anything else in cache_dir is left alone.
+'''
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import re
+
+import numpy as np
+import pandas as pd
+
+from backtester.core.bars import Bars
+
+CACHE_FORMAT = 1
+# Not BACKTESTER_CACHE_DIR: that one holds the market data cache (see DataHandler), whose files must never be
+# counted or evicted as results
+DEFAULT_CACHE_DIR = os.environ.get('BACKTESTER_RESULT_CACHE_DIR',
+                                   os.path.join(os.path.expanduser('~'), '.cache', 'backtester', 'results'))
+_ENTRY_NAME = re.compile(r'[0-9a-f]{40}\.pkl')
+
+
+def _columns(data):
+    if isinstance(data, Bars):
+        return list(data.columns.items())
+    return [(col, data[col].to_numpy()) for col in data.columns]
+
+
+def _index_values(index):
+    if isinstance(index, pd.DatetimeIndex):
+        return index.asi8  # In the index's own unit (part of its dtype), not converted
+    if isinstance(index, np.ndarray) and index.dtype.kind in 'iufM':
+        return index
+    return pd.util.hash_pandas_object(pd.Index(index), index=False).to_numpy()
+
+
+def _update(hasher, values):
+    if values.dtype.kind == 'O':
+        values = pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy()
+    hasher.update(str(values.dtype).encode())
+    hasher.update(np.ascontiguousarray(values))  # Hashed through the buffer protocol, no serialization
+
+
+def data_fingerprint(data) -> str:
+    """Content hash of a DataFrame or Bars: index, column names, dtypes and every value."""
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(type(data).__name__.encode())
+    _update(hasher, _index_values(data.index))
+    hasher.update(str(getattr(data.index, 'dtype', None)).encode())  # Unit and time zone
+    for name, values in _columns(data):
+        hasher.update(repr(name).encode())
+        _update(hasher, values)
+    return hasher.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def strategy_fingerprint(strategy_class) -> str:
+    """Hash of the source of strategy_class and its base classes (just their names when there is no source)."""
+    hasher = hashlib.blake2b(digest_size=16)
+    for cls in strategy_class.__mro__:
+        if cls is object:
+            continue
+        hasher.update(f"{cls.__module__}.{cls.__qualname__}".encode())
+        try:
+            hasher.update(inspect.getsource(cls).encode())
+        except (OSError, TypeError):
+            pass
+    return hasher.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def code_fingerprint() -> str:
+    """Hash of every source file of the backtester package."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    hasher = hashlib.blake2b(digest_size=16)
+    for directory, subdirs, files in sorted(os.walk(root)):
+        subdirs.sort()
+        for name in sorted(files):
+            if name.endswith('.py'):
+                hasher.update(name.encode())
+                with open(os.path.join(directory, name), 'rb') as f:
+                    hasher.update(f.read())
+    return hasher.hexdigest()
+
+
+def _json_default(value):
+    if isinstance(value, np.ndarray):
+        hasher = hashlib.blake2b(digest_size=16)
+        _update(hasher, value)
+        return f"ndarray:{value.shape}:{hasher.hexdigest()}"
+    if isinstance(value, (pd.DataFrame, Bars)):
+        return f"data:{data_fingerprint(value)}"
+    if isinstance(value, type):
+        return f"class:{value.__module__}.{value.__qualname__}:{strategy_fingerprint(value)}"
+    return repr(value)
+
+
+class ResultCache:
+    def __init__(self, cache_dir: str = None, max_bytes: int = 1_000_000_000):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, strategy_class, data, **settings) -> str:
+        """Cache key of running strategy_class on data with 'settings' (cash, commission, strategy kwargs, ...)."""
+        payload = json.dumps({
+            'format': CACHE_FORMAT,
+            'code': code_fingerprint(),
+            'strategy': f"{strategy_class.__module__}.{strategy_class.__qualname__}",
+            'strategy_source': strategy_fingerprint(strategy_class),
+            'data': data_fingerprint(data),
+            'settings': settings,
+        }, sort_keys=True, default=_json_default)
+        return hashlib.blake2b(payload.encode(), digest_size=20).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + '.pkl')
+
+    def __contains__(self, key) -> bool:
+        return os.path.exists(self._path(key))
+
+    def get(self, key, default=None):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return default
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            self._remove(path)  # Written by an incompatible version, or corrupted
+            self.misses += 1
+            return default
+        try:
+            os.utime(path)  # Most recently used
+        except OSError:
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)  # Never leave a half written entry behind
+        self._evict()
+
+    def _entries(self):
+        # (mtime, size, path) of every entry, only files of the <key[:2]>/<key>.pkl layout
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for prefix in os.listdir(self.cache_dir):
+            directory = os.path.join(self.cache_dir, prefix)
+            if len(prefix) != 2 or not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if not name.startswith(prefix) or not _ENTRY_NAME.fullmatch(name):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue  # Evicted by another process
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def size_bytes(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def __len__(self):
+        return len(self._entries())
+
+    def clear(self):
+        for _, _, path in self._entries():
+            self._remove(path)
+
+
+def resolve_cache(cache):
+    """run_backtest()'s cache argument: None/False (off), True (ResultCache in DEFAULT_CACHE_DIR) or a ResultCache."""
+    if cache is None or cache is False:
+        return None
+    if cache is True:
+        return ResultCache()
+    if isinstance(cache, ResultCache):
+        return cache
+    raise ValueError("cache must be True, False/None or a ResultCache")
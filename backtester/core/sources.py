@@ -0,0 +1,162 @@
+# backtester/core/sources.py
+# Author: Krittin Hirunchupong
+
+'''
+sources.py
+    This module holds the market data sources that DataHandler (and MarketDataCache) fetch bars from.
+    A source is called as source(ticker, start, end, interval) and returns a DataFrame with a datetime index and
+    OHLCV columns, so a plain function works too. The classes here all follow that interface:
+
+        YahooSource          downloads from Yahoo Finance (yfinance is imported on the first download)
+        CsvDirectorySource   one CSV file per ticker in a directory
+        HttpSource           CSV bars served over HTTP, e.g. by a local stand-in for a data vendor
+
+    is_retryable(error) tells DataHandler.load_many() whether a failed fetch is worth retrying (a missing file or a
+    404 is not, a timeout is).
+
+    Example:
+        handler = DataHandler(fetcher=CsvDirectorySource('data/daily'))
+        panel = handler.load_many(['AAPL', 'MSFT', 'GOOG'], '2020-01-01', '2024-01-01')
+'''
+
+import io
+import os
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import pandas as pd
+
+from backtester.core.store import normalize_columns
+
+
+def download_yahoo(ticker: str, start, end, interval: str = '1d') -> pd.DataFrame:
+    import yfinance as yf  # Slow to import, only loaded when something is downloaded
+
+    df = yf.download(ticker, start=start, end=end, interval=interval, auto_adjust=False)
+    df.dropna(inplace=True)
+
+    # Flatten MultiIndex if needed
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = [col[0].replace(' ', '') for col in df.columns]
+
+    df.columns = [col.title().replace('Adjclose', 'AdjClose') for col in df.columns]
+    df.index.name = 'Datetime'
+
+    return df
+
+
+def _between(df, start, end):
+    # Rows in [start, end), comparing in the index's time zone
+    df = df.sort_index()
+    bounds = []
+    for ts in (start, end):
+        if ts is None:
+            bounds.append(None)
+            continue
+        ts = pd.Timestamp(ts)
+        tz = getattr(df.index, 'tz', None)
+        if tz is not None and ts.tz is None:
+            ts = ts.tz_localize(tz)
+        elif tz is None and ts.tz is not None:
+            ts = ts.tz_convert(None)
+        bounds.append(ts)
+    lo = 0 if bounds[0] is None else df.index.searchsorted(bounds[0])
+    hi = len(df) if bounds[1] is None else df.index.searchsorted(bounds[1])
+    return df.iloc[lo:hi]
+
+
+def _read_csv(source, datetime_col):
+    df = pd.read_csv(source, parse_dates=[datetime_col])
+    df.set_index(datetime_col, inplace=True)
+    df.columns = normalize_columns(df.columns)
+    df.index.name = 'Datetime'
+    return df
+
+
+class DataSource:
+    name = 'source'
+
+    def fetch(self, ticker: str, start, end, interval: str = '1d') -> pd.DataFrame:
+        raise NotImplementedError
+
+    def is_retryable(self, error: Exception) -> bool:
+        return True
+
+    def __call__(self, ticker, start, end, interval='1d'):
+        return self.fetch(ticker, start, end, interval)
+
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+
+
+class YahooSource(DataSource):
+    name = 'yahoo'
+
+    def fetch(self, ticker, start, end, interval='1d'):
+        return download_yahoo(ticker, start, end, interval)
+
+
+class CsvDirectorySource(DataSource):
+    '''
+    Reads <directory>/<pattern> per ticker, pattern can use {ticker} and {interval} (e.g. '{interval}/{ticker}.csv').
+    Column names are normalized like DataHandler.from_csv().
+    '''
+    name = 'csv'
+
+    def __init__(self, directory: str, pattern: str = '{ticker}.csv', datetime_col: str = 'Date'):
+        self.directory = directory
+        self.pattern = pattern
+        self.datetime_col = datetime_col
+
+    def path(self, ticker, interval='1d'):
+        return os.path.join(self.directory, self.pattern.format(ticker=ticker, interval=interval))
+
+    def fetch(self, ticker, start, end, interval='1d'):
+        return _between(_read_csv(self.path(ticker, interval), self.datetime_col), start, end)
+
+    def is_retryable(self, error):
+        return not isinstance(error, (FileNotFoundError, PermissionError, ValueError))
+
+    def __repr__(self):
+        return f"CsvDirectorySource({self.directory!r})"
+
+
+class HttpSource(DataSource):
+    '''
+    GETs CSV bars from url, a template with {ticker}, {start}, {end} and {interval}
+    (e.g. 'http://127.0.0.1:8080/bars/{ticker}.csv?start={start}&end={end}&interval={interval}').
+    The response must have a datetime_col column and OHLCV columns.
+    '''
+    name = 'http'
+
+    def __init__(self, url: str, timeout: float = 30.0, datetime_col: str = 'Date', headers=None):
+        self.url = url
+        self.timeout = timeout
+        self.datetime_col = datetime_col
+        self.headers = dict(headers or {})
+
+    def fetch(self, ticker, start, end, interval='1d'):
+        url = self.url.format(ticker=urllib.parse.quote(str(ticker), safe=''),
+                              start=urllib.parse.quote(pd.Timestamp(start).isoformat()),
+                              end=urllib.parse.quote(pd.Timestamp(end).isoformat()),
+                              interval=urllib.parse.quote(interval))
+        request = urllib.request.Request(url, headers=self.headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = response.read()
+        except urllib.error.HTTPError as error:
+            error.close()  # Holds the open response
+            raise
+        if not body.strip():
+            return pd.DataFrame()
+        return _between(_read_csv(io.BytesIO(body), self.datetime_col), start, end)
+
+    def is_retryable(self, error):
+        # Client errors (404 unknown ticker, 400 bad request, ...) won't change on a retry, 429 and 5xx might
+        if isinstance(error, urllib.error.HTTPError):
+            return error.code == 429 or error.code >= 500
+        return not isinstance(error, ValueError)
+
+    def __repr__(self):
+        return f"HttpSource({self.url!r})"
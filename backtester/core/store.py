@@ -0,0 +1,166 @@
+# backtester/core/store.py
+# Author: Krittin Hirunchupong
+
+'''
+store.py
+    This module converts a (large) CSV price history once into a compact binary columnar store, and opens it again
+    without parsing anything: every column is a raw little endian file that is memory mapped on load.
+    Loading only maps the requested columns and date range, and hands them to the engine as Bars,
+    so no DataFrame is built and nothing is copied.
+
+    Layout:
+        <store_dir>/meta.json         columns, dtype, number of rows, time zone, datetime column and the source
+                                      CSV's absolute path, size and mtime
+        <store_dir>/_timestamp.bin    int64 nanoseconds since epoch, sorted
+        <store_dir>/<Column>.bin      float64 or float32 values
+'''
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from backtester.core.bars import Bars
+
+TIMESTAMP_FILE = '_timestamp.bin'
+META_FILE = 'meta.json'
+
+
+def normalize_columns(columns):
+    """Same column naming as DataHandler.from_csv(): 'adj close' -> 'AdjClose', 'close' -> 'Close'."""
+    columns = pd.Index(columns).str.title().str.replace(' ', '')
+    return [col.replace('Adjclose', 'AdjClose') for col in columns]
+
+
+def _source_signature(csv_path):
+    stat = os.stat(csv_path)
+    return {'source': os.path.abspath(csv_path), 'source_size': stat.st_size, 'source_mtime': stat.st_mtime}
+
+
+def convert_csv_to_store(csv_path: str, store_dir: str, datetime_col: str = 'Date', dtype: str = 'float64',
+                         chunksize: int = 1_000_000) -> str:
+    """
+    Converts csv_path into a columnar store in store_dir, reading the CSV in chunks so memory stays bounded.
+    Only numeric columns are kept. If the CSV is not sorted by time, the store is sorted afterwards,
+    one column at a time.
+    """
+    if dtype not in ('float64', 'float32'):
+        raise ValueError(f"Invalid dtype '{dtype}'. Must be 'float64' or 'float32'")
+    file_dtype = np.dtype(dtype).newbyteorder('<')
+    os.makedirs(store_dir, exist_ok=True)
+
+    files = {}
+    columns = None
+    length = 0
+    is_sorted = True
+    last_ts = None
+    tz = None
+    try:
+        for chunk in pd.read_csv(csv_path, parse_dates=[datetime_col], chunksize=chunksize):
+            timestamps = pd.DatetimeIndex(chunk.pop(datetime_col))
+            if timestamps.tz is not None:
+                tz = str(timestamps.tz)
+                timestamps = timestamps.tz_convert('UTC').tz_localize(None)
+            ns = timestamps.as_unit('ns').asi8
+
+            chunk.columns = normalize_columns(chunk.columns)
+            if columns is None:
+                columns = [col for col in chunk.columns if np.issubdtype(chunk[col].dtype, np.number)]
+                files = {col: open(os.path.join(store_dir, col + '.bin'), 'wb') for col in columns}
+                files[TIMESTAMP_FILE] = open(os.path.join(store_dir, TIMESTAMP_FILE), 'wb')
+
+            if len(ns):
+                if (last_ts is not None and ns[0] < last_ts) or np.any(np.diff(ns) < 0):
+                    is_sorted = False
+                last_ts = ns[-1]
+
+            files[TIMESTAMP_FILE].write(ns.astype('<i8').tobytes())
+            for col in columns:
+                files[col].write(chunk[col].to_numpy(dtype=file_dtype).tobytes())
+            length += len(chunk)
+    finally:
+        for f in files.values():
+            f.close()
+
+    columns = columns or []
+    if not is_sorted and length:
+        order = np.argsort(np.memmap(os.path.join(store_dir, TIMESTAMP_FILE), dtype='<i8', mode='r'),
+                           kind='stable')
+        for name, values_dtype in [(TIMESTAMP_FILE, '<i8')] + [(col + '.bin', file_dtype) for col in columns]:
+            path = os.path.join(store_dir, name)
+            values = np.fromfile(path, dtype=values_dtype)[order]
+            values.tofile(path)
+
+    meta = {
+        'columns': columns,
+        'dtype': dtype,
+        'length': length,
+        'tz': tz,
+        'datetime_col': datetime_col,
+        **_source_signature(csv_path)
+    }
+    with open(os.path.join(store_dir, META_FILE), 'w') as f:
+        json.dump(meta, f)
+    return store_dir
+
+
+def is_store_current(store_dir: str, csv_path: str, datetime_col: str = 'Date', dtype: str = 'float64') -> bool:
+    """
+    True if store_dir holds a store converted from the current version of csv_path with the same datetime_col and
+    dtype (stores written before those were recorded are never current).
+    """
+    meta_path = os.path.join(store_dir, META_FILE)
+    if not os.path.exists(meta_path):
+        return False
+    with open(meta_path) as f:
+        meta = json.load(f)
+    expected = {**_source_signature(csv_path), 'datetime_col': datetime_col, 'dtype': dtype}
+    return all(meta.get(name) == value for name, value in expected.items())
+
+
+class ColumnStore:
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.columns = self.meta['columns']
+        self.dtype = np.dtype(self.meta['dtype']).newbyteorder('<')
+
+    def __len__(self):
+        return self.meta['length']
+
+    def _map(self, name, dtype):
+        if len(self) == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(self.store_dir, name), dtype=dtype, mode='r', shape=(len(self),))
+
+    def timestamps(self) -> np.ndarray:
+        return self._map(TIMESTAMP_FILE, np.dtype('<i8'))
+
+    def load(self, columns=None, start=None, end=None) -> Bars:
+        """
+        Maps the requested columns between start (inclusive) and end (exclusive) and returns them as Bars.
+        The arrays are read-only views of the files, nothing is read until it is used.
+        """
+        columns = self.columns if columns is None else list(columns)
+        missing = [col for col in columns if col not in self.columns]
+        if missing:
+            raise ValueError(f"Columns {missing} are not in the store. Available: {self.columns}")
+
+        timestamps = self.timestamps()
+        lo = 0 if start is None else int(np.searchsorted(timestamps, self._to_ns(start), side='left'))
+        hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, self._to_ns(end), side='left'))
+
+        index = pd.DatetimeIndex(timestamps[lo:hi].view('datetime64[ns]'), name='Datetime')
+        if self.meta.get('tz'):
+            index = index.tz_localize('UTC').tz_convert(self.meta['tz'])
+        return Bars(index, {col: self._map(col + '.bin', self.dtype)[lo:hi] for col in columns})
+
+    def _to_ns(self, ts):
+        ts = pd.Timestamp(ts)
+        if ts.tz is None and self.meta.get('tz'):
+            ts = ts.tz_localize(self.meta['tz'])
+        if ts.tz is not None:
+            ts = ts.tz_convert('UTC').tz_localize(None)
+        return ts.as_unit('ns').value
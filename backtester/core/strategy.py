@@ -7,13 +7,30 @@ strategy.py
 '''
 
 from abc import ABC, abstractmethod
-import pandas as pd
+import numpy as np
+
+from backtester.core.bars import Bars, Panel
+from backtester.indicators import batch
+from backtester.indicators.base import current_pool
+from backtester.indicators.cache import get_indicator_cache
 
 class Strategy(ABC):
-    def __init__(self, data: pd.DataFrame, broker):
+    max_lookback = None  # Most bars get_lookback() is asked for, sizes the window of the streaming engine
+    close_at_end = False  # True when on_data() closes every trade on the last bar, run_vectorized() does the same
+
+    def __init__(self, data: 'pd.DataFrame', broker):
         self.data = data
         self.broker = broker
         self.current_index = 0 # This is the current index of the current bar in the DataFrame
+        self.last_index = None # Index of the last bar, None while it is not known (streaming feeds)
+        self.bars = None       # Column arrays of data, handed over by the engine (see set_bars())
+        self._columns = None
+        self._cursor = 0       # Position of the current bar in the column arrays (differs from current_index when streaming)
+        self._floor = 0        # First position in the column arrays that holds data
+        self.indicators = []   # Streaming indicators updated by the engine once per bar
+        self.indicator_pool = current_pool()  # Shared indicators when built by a FanOutEngine (see add_indicator())
+        self.timeframes = {}   # Higher timeframes by rule, built once in set_bars() (see add_timeframe())
+        self._fingerprint = None  # Content hash of the bars, keys the shared indicator cache (see indicator_array())
 
     '''
     set_index()
@@ -22,23 +39,180 @@ class Strategy(ABC):
     '''
     def set_index(self, idx: int):
         self.current_index = idx
+        self._cursor = idx
+
+    '''
+    set_cursor()
+    Used by the streaming engine, where the column arrays only hold a rolling window of recent bars:
+    idx is the bar number, cursor its position in the arrays and floor the oldest position still held.
+    '''
+    def set_cursor(self, idx: int, cursor: int, floor: int):
+        self.current_index = idx
+        self._cursor = cursor
+        self._floor = floor
+
+    '''
+    is_last_bar()
+    This method returns True on the last bar of the data (never on a live feed where the end is unknown).
+    '''
+    def is_last_bar(self) -> bool:
+        return self.current_index == self.last_index
+
+    '''
+    __getstate__()
+    Checkpoints (see backtester.core.checkpoint) pickle the strategy without its data: the engine hands the data
+    back with set_bars() on resume, which also rebinds the indicators and rebuilds the timeframes.
+    '''
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(data=None, bars=None, _columns=None, _fingerprint=None, indicator_pool=None,
+                     timeframes=dict.fromkeys(self.timeframes))
+        return state
+
+    '''
+    set_bars()
+    This method hands the strategy the column arrays of its data.
+    The engine converts the data once and calls this before the run, otherwise it is done on first use.
+    '''
+    def set_bars(self, bars: Bars):
+        self.bars = bars
+        self._columns = bars.columns
+        self.last_index = len(bars) - 1
+        self._fingerprint = None
+        for indicator in self.indicators:
+            indicator.bind(bars)
+        for rule in self.timeframes:
+            self.timeframes[rule] = self._build_timeframe(rule)
+
+    '''
+    add_indicator()
+    This method registers a streaming indicator (see backtester.indicators) and returns it.
+    The engine updates every registered indicator with the current bar right before on_data() is called,
+    so the strategy only needs to read indicator.value.
+    When the strategy was built inside an IndicatorPool, the pool's indicator with the same key is returned instead:
+    it is shared with the other strategies of the pool and updated once per bar by the engine that owns the pool.
+    '''
+    def add_indicator(self, indicator):
+        if self.indicator_pool is not None:
+            return self.indicator_pool.share(indicator)
+        self.indicators.append(indicator)
+        if self.bars is not None:
+            indicator.bind(self.bars)
+        return indicator
+
+    '''
+    indicator_array()
+    This method returns a whole-column indicator (see backtester.indicators.batch), e.g. for generate_signals().
+    The array is computed once per Bars and reused by every strategy that asks for the same indicator on the
+    same bars, which is what makes sweeps and walk-forward runs cheap.
+    When a process wide IndicatorCache is set (see backtester.indicators.cache) it is also shared across runs,
+    keyed by a hash of every value of the bars, so later runs on the same data get it without recomputing.
+    The returned array is read-only.
+    '''
+    def indicator_array(self, name: str, column: str = 'Close', **params) -> np.ndarray:
+        if self._columns is None:
+            self.set_bars(Bars.from_dataframe(self.data))
+        key = (name, column, tuple(sorted(params.items())))
+        cache = self.bars.indicator_cache
+        if key not in cache:
+            shared = get_indicator_cache()
+            if shared is not None and type(self.bars) in (Bars, Panel) and len(self.data) == len(self.bars):
+                cache[key] = shared.get_or_compute(self._data_fingerprint(), self.bars, name, column, **params)
+            else:
+                cache[key] = batch.compute(name, self.bars, column, **params)
+        return cache[key]
+
+    def _data_fingerprint(self):
+        # Hash of the whole bars (once per run), so runs on the same data share cached indicators and data modified
+        # in place between runs never gets the arrays of its old values
+        if self._fingerprint is None:
+            from backtester.core.result_cache import data_fingerprint
+            self._fingerprint = data_fingerprint(self.bars)
+        return self._fingerprint
+
+    '''
+    add_timeframe()
+    This method registers a higher timeframe (e.g. '1h' on 5m bars, '1d' on 1h bars), usually from __init__.
+    The resampled bars and their index map are built once, then get_timeframe_price()/get_timeframe_lookback()
+    read them on every bar. Only bars that are fully closed at the current bar are visible, so there is no lookahead.
+    '''
+    def add_timeframe(self, rule: str):
+        self.timeframes[rule] = self._build_timeframe(rule) if self.bars is not None else None
+
+    def _build_timeframe(self, rule):
+        import pandas as pd  # Only strategies with higher timeframes need pandas
+        from backtester.core.resample import Timeframe
+
+        if not isinstance(getattr(self.bars, 'index', None), pd.DatetimeIndex):
+            raise ValueError("Higher timeframes need bars with a DatetimeIndex (not supported on streaming feeds)")
+        return Timeframe(self.bars, rule)
+
+    def _timeframe(self, rule):
+        if self._columns is None:
+            self.set_bars(Bars.from_dataframe(self.data))
+        if self.timeframes.get(rule) is None:
+            self.add_timeframe(rule)
+        return self.timeframes[rule]
+
+    '''
+    get_timeframe_price()
+    This method returns the value of 'column' on the last closed bar of the 'rule' timeframe (NaN before the first one).
+    '''
+    def get_timeframe_price(self, rule: str, column: str = 'Close') -> float:
+        timeframe = self._timeframe(rule)
+        count = timeframe.closed_count[self.current_index]
+        return timeframe.bars[column][count - 1] if count else np.nan
+
+    '''
+    get_timeframe_lookback()
+    This method returns the last 'window' closed bars of the 'rule' timeframe as a view, like get_lookback().
+    '''
+    def get_timeframe_lookback(self, rule: str, column: str = 'Close', window: int = 10) -> np.ndarray:
+        timeframe = self._timeframe(rule)
+        count = timeframe.closed_count[self.current_index]
+        return timeframe.bars[column][max(0, count - window):count]
+
+    '''
+    update_indicators()
+    This method feeds bar 'idx' to every registered indicator. Called on every bar by the backtest engine.
+    '''
+    def update_indicators(self, idx: int):
+        if self._columns is None:
+            self.set_bars(Bars.from_dataframe(self.data))
+        for indicator in self.indicators:
+            indicator.update_at(idx)
 
     '''
     get_price()
     This method returns the current price for a specific column at the current index.
+    For multi-asset Panel data it returns the vector of every symbol's price (a cross-sectional slice),
+    and get_lookback() returns a (window, symbols) block.
     '''
     def get_price(self, column: str = 'Close') -> float:
-        return self.data.iloc[self.current_index][column]
+        if self._columns is None:
+            self.set_bars(Bars.from_dataframe(self.data))
+        return self._columns[column][self._cursor]
     
     '''
     get_lookback()
     This method returns a slice of the last 'window' number of price values (inclusive)
     This method is useful for calculating indicators like moving averages, RSI, etc.
+    The slice is a read-only view into the column array, nothing is copied.
+    '''
+    def get_lookback(self, column: str = 'Close', window: int = 10) -> np.ndarray:
+        if self._columns is None:
+            self.set_bars(Bars.from_dataframe(self.data))
+        start = max(self._floor, self._cursor - window + 1)
+        return self._columns[column][start:self._cursor + 1]
+
     '''
-    def get_lookback(self, column: str = 'Close', window: int = 10) -> pd.Series:
+    get_lookback_series()
+    Same as get_lookback() but returns a pandas Series with the timestamps, for code that needs the index.
+    '''
+    def get_lookback_series(self, column: str = 'Close', window: int = 10) -> 'pd.Series':
         start = max(0, self.current_index - window + 1)
         return self.data.iloc[start:self.current_index + 1][column]
-        
+
     
     '''
     on_data()
@@ -49,5 +223,18 @@ class Strategy(ABC):
     def on_data(self, timestamp=None):
         pass
 
+    '''
+    generate_signals()
+    This method is optional and only used by BacktestEngine.run_vectorized().
+    'data' is the engine's Bars, so data['Close'] is the whole Close column as an array.
+    It returns an array with the target net position to hold after every bar of 'data'.
+    It can also return (positions, exits), where exits is a boolean array of bars on which every open trade is
+    closed before moving to the target position (e.g. a stop-loss followed by a new entry on the same bar).
+    Strategies that close everything on their last bar set close_at_end = True, the last bar's trade is then
+    followed by closing every open trade, like on_data() does.
+    '''
+    def generate_signals(self, data: Bars):
+        raise NotImplementedError(f"{type(self).__name__} does not implement generate_signals()")
+
     def close_all_trades(self, timestamp=None):
         self.broker.close_all_trades(price=self.get_price(), timestamp=timestamp)
\ No newline at end of file
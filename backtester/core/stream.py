@@ -0,0 +1,289 @@
+# backtester/core/stream.py
+# Author: Krittin Hirunchupong
+
+'''
+stream.py
+    This module runs a strategy on a feed of bars instead of a DataFrame held in memory.
+    The feed can be any iterator or async iterator of bars (a generator over a file, a chunked Parquet reader,
+    a local socket, ...). The strategy sees a rolling window of the most recent bars, sized to its max_lookback
+    (DEFAULT_MAX_LOOKBACK bars if the strategy doesn't declare one),
+    and the equity/PnL of every bar is written to a sink instead of being kept in lists,
+    so memory stays the same however long the run is (only the trade log grows, with the number of trades).
+
+    A bar is either a (timestamp, mapping) pair or a mapping with a 'timestamp' (or 'Datetime'/'Date') key,
+    where the mapping holds the column values, e.g. (ts, {'Open': 1.0, 'High': 1.2, 'Low': 0.9, 'Close': 1.1}).
+
+    Example:
+        engine = StreamingEngine(SmaCrossover, broker, sink=CsvSink('equity.csv'), short_window=10, long_window=20)
+        engine.run(iter_csv('minute_bars.csv'))
+'''
+
+import asyncio
+import csv
+import json
+
+import numpy as np
+
+from backtester.utils.performance import RunningMetrics
+
+DEFAULT_MAX_LOOKBACK = 256
+TIMESTAMP_KEYS = ('timestamp', 'Datetime', 'Date')
+
+
+class RollingBars:
+    '''
+    Rolling window of the last 'capacity' bars, one array per column.
+    Every value is written twice (at pos and pos + capacity), so the last 'capacity' bars are always one
+    contiguous slice of the array and get_lookback() can still return a view.
+    '''
+    def __init__(self, columns, capacity: int):
+        self.capacity = max(1, capacity)
+        self.columns = {col: np.zeros(2 * self.capacity) for col in columns}
+        self.timestamps = [None] * self.capacity
+        self.count = 0
+        self.pos = 0
+
+    def push(self, timestamp, bar):
+        """Stores a bar and returns its position in the column arrays."""
+        pos, capacity = self.pos, self.capacity
+        for col, values in self.columns.items():
+            value = bar[col]
+            values[pos] = value
+            values[pos + capacity] = value
+        self.timestamps[pos] = timestamp
+        self.pos = pos + 1 if pos + 1 < capacity else 0
+        self.count += 1
+        return pos + capacity
+
+    def floor(self, cursor: int) -> int:
+        """Oldest position that still holds data when 'cursor' is the newest bar."""
+        return cursor - min(self.count, self.capacity) + 1
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.columns[column]
+
+    def __contains__(self, column: str) -> bool:
+        return column in self.columns
+
+    def keys(self):
+        return self.columns.keys()
+
+
+'''
+Sinks
+    A sink receives (timestamp, equity, pnl) once per bar.
+'''
+class NullSink:
+    def write(self, timestamp, equity, pnl):
+        pass
+
+    def close(self):
+        pass
+
+
+class CallbackSink(NullSink):
+    def __init__(self, callback):
+        self.callback = callback
+
+    def write(self, timestamp, equity, pnl):
+        self.callback(timestamp, equity, pnl)
+
+
+class CsvSink(NullSink):
+    def __init__(self, path: str):
+        self._file = open(path, 'w', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(['timestamp', 'equity', 'pnl'])
+
+    def write(self, timestamp, equity, pnl):
+        self._writer.writerow([timestamp, equity, pnl])
+
+    def close(self):
+        self._file.close()
+
+
+class MemorySink(NullSink):
+    '''Keeps the curves in lists like BacktestEngine, for short runs and tests.'''
+    def __init__(self):
+        self.timestamps = []
+        self.equity_curve = []
+        self.pnl_curve = []
+
+    def write(self, timestamp, equity, pnl):
+        self.timestamps.append(timestamp)
+        self.equity_curve.append(equity)
+        self.pnl_curve.append(pnl)
+
+    def get_results(self):
+        return {'timestamps': self.timestamps, 'equity_curve': self.equity_curve, 'pnl_curve': self.pnl_curve}
+
+
+'''
+Feeds
+'''
+def iter_dataframe(df):
+    """Yields (timestamp, bar) from a DataFrame, one row at a time."""
+    columns = list(df.columns)
+    for timestamp, values in zip(df.index, df.itertuples(index=False, name=None)):
+        yield timestamp, dict(zip(columns, values))
+
+
+def iter_csv(path: str, datetime_col: str = 'Date', chunksize: int = 100_000):
+    """Yields (timestamp, bar) from a CSV file, reading it in chunks."""
+    import pandas as pd
+    from backtester.core.store import normalize_columns
+
+    for chunk in pd.read_csv(path, parse_dates=[datetime_col], chunksize=chunksize):
+        chunk = chunk.set_index(datetime_col)
+        chunk.columns = normalize_columns(chunk.columns)
+        yield from iter_dataframe(chunk)
+
+
+def iter_parquet(path: str, datetime_col: str = 'Datetime', batch_size: int = 100_000):
+    """Yields (timestamp, bar) from a Parquet file, one record batch at a time (needs pyarrow)."""
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+        df = batch.to_pandas()
+        if datetime_col in df.columns:
+            df = df.set_index(datetime_col)
+        yield from iter_dataframe(df)
+
+
+async def aiter_socket(host: str, port: int):
+    """Yields bars from a local socket that sends one JSON object per line, e.g. a replay server stand-in."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        writer.close()
+
+
+def _split_bar(item):
+    if isinstance(item, tuple):
+        return item
+    for key in TIMESTAMP_KEYS:
+        if key in item:
+            return item[key], item
+    return None, item
+
+
+class StreamingEngine:
+    """
+    Runs a strategy bar by bar on a feed. The strategy is built with a RollingBars as its data.
+    """
+
+    def __init__(self, strategy_class, broker, columns=None, max_lookback=None, sink=None,
+                 detect_last_bar=True, metrics=None, **strategy_kwargs):
+        self.strategy_class = strategy_class
+        self.broker = broker
+        self.columns = list(columns) if columns is not None else None
+        self.max_lookback = max_lookback
+        self.sink = sink if sink is not None else NullSink()
+        self.detect_last_bar = detect_last_bar  # Holds one bar back to know which bar is the last one
+        self.strategy_kwargs = strategy_kwargs
+        self.metrics = metrics if metrics is not None else RunningMetrics()  # Sharpe, drawdown, ... without the curve
+        if self.metrics.trade_log is None:
+            self.metrics.trade_log = broker.trade_log
+
+        self.strategy = None
+        self.bars = None
+        self.bar_count = 0
+        self.final_equity = broker.cash
+        self.start_timestamp = None
+        self.end_timestamp = None
+
+    def _setup(self, bar):
+        # The strategy is built first so its max_lookback (usually set from its parameters) sizes the window
+        columns = self.columns or [key for key in bar if key not in TIMESTAMP_KEYS]
+        self.strategy = self.strategy_class(None, self.broker, **self.strategy_kwargs)
+        capacity = self.max_lookback or self.strategy.max_lookback or DEFAULT_MAX_LOOKBACK
+        self.bars = RollingBars(columns, capacity)
+        self.strategy.data = self.bars
+        self.strategy.set_bars(self.bars)
+        self.strategy.last_index = None
+
+    def _step(self, item, is_last=False):
+        timestamp, bar = _split_bar(item)
+        if self.strategy is None:
+            self._setup(bar)
+            self.start_timestamp = timestamp
+
+        i = self.bar_count
+        cursor = self.bars.push(timestamp, bar)
+        strategy = self.strategy
+        if is_last:
+            strategy.last_index = i
+        strategy.set_cursor(i, cursor, self.bars.floor(cursor))
+        strategy.update_indicators(cursor)
+
+        columns = self.bars.columns
+        price = columns['Close'][cursor]
+        self.broker.update_price(price)
+        if self.broker.orders:
+            if self.broker.intrabar and 'High' in columns and 'Low' in columns:
+                open_price = columns['Open'][cursor] if 'Open' in columns else None
+                self.broker.process_orders(price, high=columns['High'][cursor], low=columns['Low'][cursor],
+                                           open_price=open_price, timestamp=timestamp)
+            else:
+                self.broker.process_orders(price, timestamp=timestamp)
+        strategy.on_data(timestamp=timestamp)
+
+        unrealized_pnl = self.broker.get_unrealized_pnl()
+        self.final_equity = self.broker.cash + unrealized_pnl
+        self.metrics.update(self.final_equity, bool(self.broker.open_trades))
+        self.sink.write(timestamp, self.final_equity, unrealized_pnl)
+        self.bar_count += 1
+        self.end_timestamp = timestamp
+
+    def run(self, feed):
+        """Consumes a feed (iterator or async iterator) until it is exhausted."""
+        if hasattr(feed, '__aiter__'):
+            return asyncio.run(self.arun(feed))
+
+        pending = None
+        for item in feed:
+            if not self.detect_last_bar:
+                self._step(item)
+                continue
+            if pending is not None:
+                self._step(pending)
+            pending = item
+        if pending is not None:
+            self._step(pending, is_last=True)
+        self.sink.close()
+
+    async def arun(self, feed):
+        """Same as run() for async iterators."""
+        pending = None
+        async for item in feed:
+            if not self.detect_last_bar:
+                self._step(item)
+                continue
+            if pending is not None:
+                self._step(pending)
+            pending = item
+        if pending is not None:
+            self._step(pending, is_last=True)
+        self.sink.close()
+
+    def get_results(self):
+        results = {
+            'final_equity': self.final_equity,
+            'trade_log': self.broker.get_trade_log(),
+            'bars': self.bar_count,
+            'start': self.start_timestamp,
+            'end': self.end_timestamp,
+            'metrics': self.metrics.report(),
+        }
+        if hasattr(self.sink, 'get_results'):
+            results.update(self.sink.get_results())
+        return results
@@ -0,0 +1,263 @@
+# backtester/core/trade_log.py
+# Author: Krittin Hirunchupong
+
+'''
+trade_log.py
+    This module stores the broker's trade log as typed column arrays instead of a list of dicts.
+    Every open and close event is one row. The arrays grow by doubling, and the PnL of closed trades is also kept in
+    its own array, so counts, win rate and other queries are vectorized reductions instead of rescanning dicts.
+
+    Columns:
+        - trade_id:    int64
+        - status:      int8, 0 = open, 1 = closed
+        - side:        int8, 0 = buy, 1 = sell (the entry side for closed rows)
+        - qty:         float64
+        - price:       float64, the fill price (the exit price for closed rows)
+        - entry_price: float64, NaN for open rows
+        - pnl:         float64, NaN for open rows
+        - timestamp:   int64 nanoseconds since epoch, NaT for missing timestamps
+        - symbol:      int32 position in TradeLog.symbols for multi-asset runs, -1 otherwise
+
+    Iterating the log (or indexing it) still gives the same dicts as before, so existing code keeps working.
+'''
+
+import numpy as np
+
+OPEN, CLOSED = 0, 1
+BUY, SELL = 0, 1
+SIDES = ('buy', 'sell')
+STATUSES = ('open', 'closed')
+NAT = np.iinfo(np.int64).min
+
+_DTYPES = {
+    'trade_id': np.int64,
+    'status': np.int8,
+    'side': np.int8,
+    'qty': np.float64,
+    'price': np.float64,
+    'entry_price': np.float64,
+    'pnl': np.float64,
+    'timestamp': np.int64,
+    'symbol': np.int32,
+}
+
+
+class TradeLog:
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self.closed_size = 0
+        self.tz = None    # Time zone of the timestamps, restored when rows are turned back into dicts
+        self.symbols = None  # Symbol names for multi-asset runs (see PortfolioBroker)
+        self._capacity = max(1, capacity)
+        self._data = {name: np.empty(self._capacity, dtype=dtype) for name, dtype in _DTYPES.items()}
+        self._closed_pnl = np.empty(self._capacity, dtype=np.float64)
+
+    def _grow(self):
+        self._capacity *= 2
+        for name, values in self._data.items():
+            grown = np.empty(self._capacity, dtype=values.dtype)
+            grown[:self.size] = values[:self.size]
+            self._data[name] = grown
+        grown = np.empty(self._capacity, dtype=np.float64)
+        grown[:self.closed_size] = self._closed_pnl[:self.closed_size]
+        self._closed_pnl = grown
+
+    def _to_ns(self, timestamp):
+        if timestamp is None:
+            return NAT
+        value = getattr(timestamp, 'value', None)  # pandas Timestamp
+        if isinstance(value, int):
+            if self.tz is None and getattr(timestamp, 'tz', None) is not None:
+                self.tz = timestamp.tz
+            return value
+        return int(np.datetime64(timestamp, 'ns').astype(np.int64))
+
+    def _append(self, trade_id, status, side, qty, price, entry_price, pnl, timestamp, symbol=-1):
+        if self.size == self._capacity:
+            self._grow()
+        n = self.size
+        data = self._data
+        data['trade_id'][n] = trade_id
+        data['status'][n] = status
+        data['side'][n] = side
+        data['qty'][n] = qty
+        data['price'][n] = price
+        data['entry_price'][n] = entry_price
+        data['pnl'][n] = pnl
+        data['timestamp'][n] = self._to_ns(timestamp)
+        data['symbol'][n] = symbol
+        self.size += 1
+
+    def append_open(self, trade_id, side, qty, price, timestamp=None, symbol=-1):
+        self._append(trade_id, OPEN, BUY if side == 'buy' else SELL, qty, price, np.nan, np.nan, timestamp, symbol)
+
+    def append_close(self, trade_id, entry_side, qty, entry_price, exit_price, pnl, timestamp=None, symbol=-1):
+        self._append(trade_id, CLOSED, BUY if entry_side == 'buy' else SELL, qty, exit_price, entry_price, pnl,
+                     timestamp, symbol)
+        self._closed_pnl[self.closed_size] = pnl
+        self.closed_size += 1
+
+    def append(self, trade: dict):
+        """Appends a trade in the dict format (see __iter__)."""
+        if trade.get('status') == 'closed':
+            self.append_close(trade['trade_id'], trade['entry_side'], trade['qty'], trade['entry_price'],
+                              trade['exit_price'], trade['pnl'], trade.get('timestamp'))
+        else:
+            self.append_open(trade['trade_id'], trade['side'], trade['qty'], trade['price'], trade.get('timestamp'))
+
+    def extend(self, trades):
+        if isinstance(trades, TradeLog):
+            columns = trades.to_numpy()
+            while self.size + trades.size > self._capacity:
+                self._grow()
+            for name, values in columns.items():
+                self._data[name][self.size:self.size + trades.size] = values
+            closed = trades.closed_pnl
+            self._closed_pnl[self.closed_size:self.closed_size + len(closed)] = closed
+            self.size += trades.size
+            self.closed_size += len(closed)
+            if self.tz is None:
+                self.tz = trades.tz
+            if self.symbols is None:
+                self.symbols = trades.symbols
+        else:
+            for trade in trades:
+                self.append(trade)
+
+    '''
+    Column access
+    These return views of the filled part of the arrays, nothing is copied.
+    '''
+    def to_numpy(self) -> dict:
+        return {name: values[:self.size] for name, values in self._data.items()}
+
+    @property
+    def closed_pnl(self) -> np.ndarray:
+        return self._closed_pnl[:self.closed_size]
+
+    def to_dataframe(self):
+        """
+        Returns the log as a DataFrame: side/status as categoricals and timestamp as datetime64.
+        The numeric columns are built on the log's arrays.
+        """
+        import pandas as pd
+
+        columns = self.to_numpy()
+        timestamps = pd.DatetimeIndex(columns['timestamp'].view('datetime64[ns]'))
+        if self.tz is not None:
+            timestamps = timestamps.tz_localize('UTC').tz_convert(self.tz)
+
+        frame = {
+            'trade_id': columns['trade_id'],
+            'status': pd.Categorical.from_codes(columns['status'], STATUSES),
+            'side': pd.Categorical.from_codes(columns['side'], SIDES),
+            'qty': columns['qty'],
+            'price': columns['price'],
+            'entry_price': columns['entry_price'],
+            'pnl': columns['pnl'],
+            'timestamp': timestamps,
+        }
+        if self.symbols is not None:
+            frame['symbol'] = pd.Categorical.from_codes(columns['symbol'], self.symbols)
+        return pd.DataFrame(frame, copy=False)
+
+    def to_arrow(self):
+        """Returns the log as a pyarrow Table (needs pyarrow)."""
+        import pyarrow as pa
+        return pa.Table.from_pandas(self.to_dataframe(), preserve_index=False)
+
+    '''
+    Vectorized queries
+    '''
+    def num_open_events(self) -> int:
+        return self.size - self.closed_size
+
+    def num_closed(self) -> int:
+        return self.closed_size
+
+    def win_rate(self) -> float:
+        if self.closed_size == 0:
+            return 0
+        return np.count_nonzero(self.closed_pnl > 0) / self.closed_size
+
+    def total_pnl(self) -> float:
+        return float(self.closed_pnl.sum())
+
+    def closed_rows(self) -> np.ndarray:
+        return np.flatnonzero(self._data['status'][:self.size] == CLOSED)
+
+    '''
+    Row access in the original dict format
+    '''
+    def _timestamp(self, ns):
+        if ns == NAT:
+            return None
+        import pandas as pd
+        if self.tz is not None:
+            return pd.Timestamp(ns, tz='UTC').tz_convert(self.tz)
+        return pd.Timestamp(ns)
+
+    def row(self, i: int) -> dict:
+        data = self._data
+        timestamp = self._timestamp(int(data['timestamp'][i]))
+        side = SIDES[data['side'][i]]
+        qty = float(data['qty'][i])
+        qty = int(qty) if qty.is_integer() else qty  # Whole lots read back as ints, like they were passed in
+        if data['status'][i] == OPEN:
+            trade = {
+                'trade_id': int(data['trade_id'][i]),
+                'side': side,
+                'qty': qty,
+                'price': data['price'][i],
+                'timestamp': timestamp,
+                'status': 'open'
+            }
+        else:
+            trade = {
+                'trade_id': int(data['trade_id'][i]),
+                'entry_price': data['entry_price'][i],
+                'exit_price': data['price'][i],
+                'qty': qty,
+                'entry_side': side,
+                'exit_side': SIDES[1 - data['side'][i]],
+                'timestamp': timestamp,
+                'pnl': data['pnl'][i],
+                'status': 'closed'
+            }
+        symbol = data['symbol'][i]
+        if symbol >= 0:
+            trade['symbol'] = self.symbols[symbol] if self.symbols is not None else int(symbol)
+        return trade
+
+    @property
+    def nbytes(self) -> int:
+        """Memory allocated by the columns (including the spare capacity)."""
+        return sum(values.nbytes for values in self._data.values()) + self._closed_pnl.nbytes
+
+    def __getstate__(self):
+        # Pickled (result cache, worker processes) without the spare capacity
+        state = self.__dict__.copy()
+        capacity = max(1, self.size)
+        state['_capacity'] = capacity
+        state['_data'] = {name: values[:capacity].copy() for name, values in self._data.items()}
+        state['_closed_pnl'] = self._closed_pnl[:capacity].copy()
+        return state
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.row(j) for j in range(*i.indices(self.size))]
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError("trade log index out of range")
+        return self.row(i)
+
+    def __iter__(self):
+        for i in range(self.size):
+            yield self.row(i)
+
+    def __repr__(self):
+        return f"TradeLog({self.size} rows, {self.closed_size} closed)"
@@ -0,0 +1,164 @@
+# backtester/core/vectorized.py
+# Author: Krittin Hirunchupong
+
+'''
+vectorized.py
+    This module simulates a strategy from a whole array of target positions instead of bar by bar.
+    The strategy decides up front what net position it wants to hold after every bar, and this module works out
+    the fills, commission, cash, equity and PnL curves with NumPy, using the same accounting as the Broker.
+    Only the bars where the position actually changes are visited in Python, everything else is array math.
+'''
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from backtester.core.trade_log import TradeLog
+
+
+def rolling_mean(values, window: int) -> np.ndarray:
+    """
+    Mean of the last 'window' values (inclusive) at every bar, NaN until the window is full.
+    Matches Strategy.get_lookback(column, window).mean() once the window is full.
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.full(len(values), np.nan)
+    if 0 < window <= len(values):
+        out[window - 1:] = sliding_window_view(values, window).mean(axis=1)
+    return out
+
+
+def _forward_fill(values, event_idx, initial, length):
+    # Carries the value recorded at each event bar forward until the next event bar.
+    filled = np.full(length, initial, dtype=float)
+    if len(event_idx):
+        marks = np.zeros(length, dtype=np.intp)
+        marks[event_idx] = np.arange(1, len(event_idx) + 1)
+        marks = np.maximum.accumulate(marks)
+        has_event = marks > 0
+        filled[has_event] = np.asarray(values, dtype=float)[marks[has_event] - 1]
+    return filled
+
+
+def simulate_positions(close, positions, exits=None, timestamps=None,
+                       initial_cash=100_000, commission=0.001, first_trade_id=1, close_at_end=False):
+    """
+    Simulates holding positions[i] units after bar i, trading at close[i].
+
+    exits is an optional boolean array, on those bars every open lot is closed before moving to the target
+    (this is how a strategy says "stopped out and re-entered on the same bar").
+    Lots are opened and closed exactly like Broker.execute_order()/close_trade(): increasing a position opens a
+    new lot, reducing it closes lots first in first out, and flipping sides closes everything before reopening.
+    close_at_end closes every lot still open after the last bar's trade, at the last close (what a strategy that
+    calls close_all_trades() on its last bar does).
+
+    Returns a dict with the cash, equity and pnl (unrealized) curves as arrays, the trade_log as a TradeLog like
+    Broker.trade_log, the lots still open at the end and the next trade id.
+    """
+    close = np.asarray(close, dtype=float)
+    positions = np.asarray(positions, dtype=float)
+    n = len(close)
+    if len(positions) != n:
+        raise ValueError(f"Expected {n} target positions, got {len(positions)}")
+
+    previous = np.concatenate(([0.0], positions[:-1]))
+    changed = positions != previous
+    if exits is not None:
+        exits = np.asarray(exits, dtype=bool)
+        changed |= exits & (previous != 0)
+    if close_at_end and n:
+        changed[-1] = True
+    event_idx = np.flatnonzero(changed)
+
+    cash = initial_cash
+    held = 0            # Signed quantity of the open lots
+    basis = 0.0         # Signed entry notional of the open lots, kept like Broker.cost_basis
+    next_trade_id = first_trade_id
+    lots = []           # [trade_id, side, qty, entry_price, timestamp], oldest first
+    trade_log = TradeLog()
+    cash_at_event = np.empty(len(event_idx))
+    net_at_event = np.empty(len(event_idx))
+    basis_at_event = np.empty(len(event_idx))
+
+    def close_lot(lot, qty, price, timestamp):
+        nonlocal cash, held, basis
+        trade_id, side, _, entry_price, _ = lot
+        direction = 1 if side == 'buy' else -1
+        exit_side = 'sell' if side == 'buy' else 'buy'
+        exit_cost = qty * price
+        fee = exit_cost * commission
+        if exit_side == 'buy':
+            cash -= (exit_cost + fee)
+        else:
+            cash += (exit_cost - fee)
+        trade_log.append_close(trade_id, side, qty, entry_price, price, (price - entry_price) * qty * direction,
+                               timestamp)
+        held -= direction * qty
+        basis -= direction * qty * entry_price
+
+    def close_all(price, timestamp):
+        nonlocal lots, held, basis
+        for lot in lots:
+            close_lot(lot, lot[2], price, timestamp)
+        lots = []
+        held, basis = 0, 0.0  # Reset exactly once flat, like the broker
+
+    # Boxing the event timestamps in one go is much cheaper than timestamps[i] per event
+    event_times = list(timestamps[event_idx]) if timestamps is not None else [None] * len(event_idx)
+    for k, (i, timestamp) in enumerate(zip(event_idx.tolist(), event_times)):
+        price = close[i]
+        target = positions[i]
+
+        if held != 0 and (exits is not None and exits[i] or target == 0 or (target > 0) != (held > 0)):
+            close_all(price, timestamp)
+
+        if abs(target) < abs(held):
+            to_close = abs(held) - abs(target)
+            while to_close > 0:
+                lot = lots[0]
+                qty = min(lot[2], to_close)
+                close_lot(lot, qty, price, timestamp)
+                to_close -= qty
+                if qty == lot[2]:
+                    lots.pop(0)
+                else:
+                    lot[2] -= qty
+            if not lots:
+                held, basis = 0, 0.0
+
+        elif target != held:
+            qty = abs(target - held)
+            side = 'buy' if target > held else 'sell'
+            cost = qty * price
+            fee = cost * commission
+            if side == 'buy':
+                cash -= (cost + fee)
+            else:
+                cash += (cost - fee)
+            trade_log.append_open(next_trade_id, side, qty, price, timestamp)
+            lots.append([next_trade_id, side, qty, price, timestamp])
+            next_trade_id += 1
+            direction = 1 if side == 'buy' else -1
+            held += direction * qty
+            basis += direction * qty * price
+
+        if close_at_end and i == n - 1 and lots:
+            close_all(price, timestamp)
+
+        cash_at_event[k] = cash
+        net_at_event[k] = held
+        basis_at_event[k] = basis
+
+    cash_curve = _forward_fill(cash_at_event, event_idx, initial_cash, n)
+    net_curve = _forward_fill(net_at_event, event_idx, 0.0, n)
+    basis_curve = _forward_fill(basis_at_event, event_idx, 0.0, n)
+    pnl_curve = net_curve * close - basis_curve
+
+    return {
+        'cash': cash_curve,
+        'equity_curve': cash_curve + pnl_curve,
+        'pnl_curve': pnl_curve,
+        'net_position': net_curve,
+        'trade_log': trade_log,
+        'open_lots': lots,
+        'next_trade_id': next_trade_id
+    }
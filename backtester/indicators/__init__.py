@@ -0,0 +1,7 @@
+# backtester/indicators/__init__.py
+
+from backtester.indicators.base import Indicator, IndicatorPool, RingBuffer
+from backtester.indicators.cache import IndicatorCache, get_indicator_cache, set_indicator_cache
+from backtester.indicators.moving_average import SMA, EMA
+from backtester.indicators.volatility import RollingStd, ZScore, BollingerBands, ATR
+from backtester.indicators.momentum import RSI
@@ -0,0 +1,135 @@
+# backtester/indicators/base.py
+# Author: Krittin Hirunchupong
+
+'''
+base.py
+    This module is the blueprint for all the streaming indicators.
+    An indicator is registered with a strategy through Strategy.add_indicator(), the engine then feeds it the new bar
+    once per bar (before on_data()) and the strategy simply reads indicator.value.
+    Every update is O(1): indicators keep running sums or a small ring buffer instead of re-reading the lookback window.
+
+    Strategies constructed while an IndicatorPool is active (see FanOutEngine) share their indicators: add_indicator()
+    returns the pool's instance with the same key, which the engine updates once per bar for all of them.
+    Indicators with parameters beyond column and window must include them in their key.
+'''
+
+import contextvars
+import math
+
+_active_pool = contextvars.ContextVar('indicator_pool', default=None)
+
+
+class Indicator:
+    _bound = ('_source',)  # Attributes set by bind(), references to the data that are not pickled
+
+    def __init__(self, column: str = 'Close', window: int = 14):
+        if window < 1:
+            raise ValueError(f"Indicator window must be at least 1, got {window}")
+        self.column = column
+        self.window = window
+        self.value = math.nan
+        self.ready = False   # True once enough bars have been seen for value to be meaningful
+        self.count = 0       # Number of bars seen so far
+        self._source = None
+
+    @property
+    def key(self):
+        """Identifies the indicator by type, input column and parameters."""
+        return (type(self).__name__, self.column, self.window)
+
+    '''
+    bind()
+    This method keeps a reference to the input column array so update_at() is a single array read.
+    It is called by Strategy.set_bars().
+    '''
+    def bind(self, bars):
+        self._source = bars[self.column]
+
+    def update_at(self, i: int):
+        return self.update(self._source[i])
+
+    def __getstate__(self):
+        # Pickled (checkpoints) without the input columns, bind() sets them again
+        state = self.__dict__.copy()
+        for name in self._bound:
+            state[name] = None
+        return state
+
+    def update(self, value: float):
+        raise NotImplementedError
+
+    def __float__(self):
+        return float(self.value)
+
+    def __repr__(self):
+        return f"{type(self).__name__}(column={self.column!r}, window={self.window}, value={self.value})"
+
+
+class RingBuffer:
+    """
+    Fixed size buffer of the last 'size' values, oldest value is overwritten first.
+    """
+    def __init__(self, size: int):
+        self.size = size
+        self.values = [0.0] * size
+        self.pos = 0
+        self.full = False
+
+    def push(self, value):
+        """Stores value and returns the value it replaced (None while the buffer is filling up)."""
+        old = self.values[self.pos] if self.full else None
+        self.values[self.pos] = value
+        self.pos += 1
+        if self.pos == self.size:
+            self.pos = 0
+            self.full = True
+        return old
+
+    def __len__(self):
+        return self.size if self.full else self.pos
+
+
+class IndicatorPool:
+    '''
+    Streaming indicators shared by several strategies on the same bars, one instance per key.
+    Use it as a context manager around the strategies' construction:
+        with pool:
+            strategies = [SmaCrossover(data, broker, **params) for params, broker in ...]
+    '''
+    def __init__(self):
+        self.indicators = {}  # key -> indicator
+        self._bars = None
+        self._tokens = []
+
+    def __len__(self):
+        return len(self.indicators)
+
+    def share(self, indicator):
+        """Returns the pooled indicator with the same key as 'indicator', adding it if it's the first one."""
+        pooled = self.indicators.get(indicator.key)
+        if pooled is None:
+            pooled = self.indicators[indicator.key] = indicator
+            if self._bars is not None:
+                indicator.bind(self._bars)
+        return pooled
+
+    def bind(self, bars):
+        self._bars = bars
+        for indicator in self.indicators.values():
+            indicator.bind(bars)
+
+    def update_at(self, i: int):
+        for indicator in self.indicators.values():
+            indicator.update_at(i)
+
+    def __enter__(self):
+        self._tokens.append(_active_pool.set(self))
+        return self
+
+    def __exit__(self, *exc):
+        _active_pool.reset(self._tokens.pop())
+
+
+def current_pool():
+    """The IndicatorPool active in this context (None outside of one)."""
+    return _active_pool.get()
@@ -0,0 +1,102 @@
+# backtester/indicators/batch.py
+# Author: Krittin Hirunchupong
+
+'''
+batch.py
+    Whole-array versions of the streaming indicators, for generate_signals() and walk-forward/sweep precomputation.
+    Every function takes a full column (or Bars for ATR) and returns an array of the same length,
+    NaN until the indicator is ready. The definitions match the streaming indicators in this package.
+
+    compute() looks the functions up by name: 'sma', 'ema', 'std', 'zscore', 'rsi', 'atr'.
+'''
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from backtester.core.vectorized import rolling_mean
+
+
+def sma(values, window: int) -> np.ndarray:
+    return rolling_mean(values, window)
+
+
+def ema(values, window: int) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    alpha = 2 / (window + 1)
+    out = np.empty(len(values))
+    current = np.nan
+    for i, value in enumerate(values.tolist()):
+        current = value if i == 0 else current + alpha * (value - current)
+        out[i] = current
+    out[:window - 1] = np.nan
+    return out
+
+
+def std(values, window: int, ddof: int = 0) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    out = np.full(len(values), np.nan)
+    if window <= len(values) and window > ddof:
+        out[window - 1:] = sliding_window_view(values, window).std(axis=1, ddof=ddof)
+    return out
+
+
+def zscore(values, window: int, ddof: int = 0) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    deviation = std(values, window, ddof)
+    mean = rolling_mean(values, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = (values - mean) / deviation
+    out[deviation == 0] = 0.0
+    return out
+
+
+def rsi(values, window: int = 14) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    out = np.full(len(values), np.nan)
+    if len(values) <= window:
+        return out
+    change = np.diff(values)
+    gain = np.where(change > 0, change, 0.0)
+    loss = np.where(change < 0, -change, 0.0)
+
+    avg_gain = gain[:window].sum() / window
+    avg_loss = loss[:window].sum() / window
+    for i in range(window, len(values)):
+        if i > window:
+            avg_gain += (gain[i - 1] - avg_gain) / window
+            avg_loss += (loss[i - 1] - avg_loss) / window
+        if avg_loss == 0:
+            out[i] = 100.0 if avg_gain > 0 else 50.0
+        else:
+            out[i] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    return out
+
+
+def atr(bars, window: int = 14) -> np.ndarray:
+    high = np.asarray(bars['High'], dtype=float)
+    low = np.asarray(bars['Low'], dtype=float)
+    close = np.asarray(bars['Close'], dtype=float)
+    out = np.full(len(close), np.nan)
+    if len(close) < window:
+        return out
+
+    previous_close = np.concatenate(([np.nan], close[:-1]))
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - previous_close), np.abs(low - previous_close)))
+    current = true_range[:window].sum() / window
+    out[window - 1] = current
+    for i in range(window, len(close)):
+        current += (true_range[i] - current) / window
+        out[i] = current
+    return out
+
+
+FUNCTIONS = {'sma': sma, 'ema': ema, 'std': std, 'zscore': zscore, 'rsi': rsi}
+
+
+def compute(name: str, bars, column: str = 'Close', **params) -> np.ndarray:
+    """Computes indicator 'name' over a whole column of bars."""
+    if name == 'atr':
+        return atr(bars, **params)
+    if name not in FUNCTIONS:
+        raise ValueError(f"Unknown indicator '{name}'. Must be one of: {sorted(FUNCTIONS) + ['atr']}")
+    return FUNCTIONS[name](bars[column], **params)
@@ -0,0 +1,204 @@
+# backtester/indicators/cache.py
+# Author: Krittin Hirunchupong
+
+'''
+cache.py
+    This module memoizes whole-column indicator arrays (see batch.py) across runs, keyed by
+    (content fingerprint, indicator, column, parameters). Strategy.indicator_array() goes through it when a cache
+    is set, so in a sweep or a notebook every distinct indicator is computed once per process for the same data,
+    however many strategy instances (each with its own Bars) ask for it.
+    The fingerprint hashes every value of the bars (result_cache.data_fingerprint()), so data modified in place
+    never gets the arrays of its old values.
+
+    Tiers:
+        memory  an LRU of arrays kept under max_bytes (the least recently used arrays are dropped first)
+        disk    optional, one .npy file per array under cache_dir, memory mapped when read back and kept under
+                max_disk_bytes like ResultCache. Shared by every process using the same cache_dir, so parallel sweeps
+                compute each indicator once in total. Entries are keyed by the package source too, so changing an
+                indicator's code never returns stale arrays.
+
+    The cached arrays are read-only, since every strategy on the same data shares them.
+    The sharing is opt-in: the process wide cache is get_indicator_cache(), None unless it was turned on with
+    set_indicator_cache(IndicatorCache(...)) or BACKTESTER_INDICATOR_CACHE_DIR is set (a cache with its disk tier
+    there). run_sweep() uses one for the duration of the sweep when none is set.
+
+    Layout:
+        <cache_dir>/<digest[:2]>/<digest>.npy
+    Only files of this layout are counted, evicted and cleared, anything else in cache_dir is left alone.
+'''
+
+import hashlib
+import os
+import re
+from collections import OrderedDict
+
+import numpy as np
+
+from backtester.indicators import batch
+
+DEFAULT_MAX_BYTES = 256_000_000
+_ENTRY_NAME = re.compile(r'[0-9a-f]{40}\.npy')
+
+
+class IndicatorCache:
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, cache_dir: str = None, max_disk_bytes: int = 1_000_000_000):
+        if max_bytes < 0:
+            raise ValueError("max_bytes must be at least 0")
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.arrays = OrderedDict()  # key -> array, least recently used first
+        self.nbytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0               # Arrays computed
+
+    @staticmethod
+    def key(fingerprint: str, name: str, column: str = 'Close', **params) -> tuple:
+        return (fingerprint, name, column, tuple(sorted(params.items())))
+
+    def get(self, key, default=None):
+        array = self.arrays.get(key)
+        if array is not None:
+            self.arrays.move_to_end(key)
+            self.hits += 1
+            return array
+        if self.cache_dir is not None:
+            array = self._load(key)
+            if array is not None:
+                self.disk_hits += 1
+                self._remember(key, array)
+                return array
+        return default
+
+    def put(self, key, array) -> np.ndarray:
+        array = np.asarray(array)
+        array.flags.writeable = False
+        self._remember(key, array)
+        if self.cache_dir is not None:
+            self._save(key, array)
+        return array
+
+    def get_or_compute(self, fingerprint: str, bars, name: str, column: str = 'Close', **params) -> np.ndarray:
+        """The array of indicator 'name' on bars (whose data has 'fingerprint'), computed only on a miss."""
+        key = self.key(fingerprint, name, column, **params)
+        array = self.get(key)
+        if array is None:
+            self.misses += 1
+            array = self.put(key, batch.compute(name, bars, column, **params))
+        return array
+
+    def _remember(self, key, array):
+        if array.nbytes > self.max_bytes:
+            return  # Would evict everything else
+        previous = self.arrays.pop(key, None)
+        if previous is not None:
+            self.nbytes -= previous.nbytes
+        self.arrays[key] = array
+        self.nbytes += array.nbytes
+        while self.nbytes > self.max_bytes:
+            _, evicted = self.arrays.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+    def _path(self, key):
+        from backtester.core.result_cache import code_fingerprint
+        digest = hashlib.blake2b(repr((code_fingerprint(),) + key).encode(), digest_size=20).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], digest + '.npy')
+
+    def _load(self, key):
+        path = self._path(key)
+        try:
+            array = np.load(path, mmap_mode='r')
+        except FileNotFoundError:
+            return None
+        except (ValueError, OSError):
+            self._remove(path)  # Corrupted
+            return None
+        try:
+            os.utime(path)  # Most recently used
+        except OSError:
+            pass
+        return array
+
+    def _save(self, key, array):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+        self._evict_disk()
+
+    def _disk_entries(self):
+        # (mtime, size, path) of every array on disk, only files of the <digest[:2]>/<digest>.npy layout
+        entries = []
+        if self.cache_dir is None or not os.path.isdir(self.cache_dir):
+            return entries
+        for prefix in os.listdir(self.cache_dir):
+            directory = os.path.join(self.cache_dir, prefix)
+            if len(prefix) != 2 or not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if not name.startswith(prefix) or not _ENTRY_NAME.fullmatch(name):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue  # Evicted by another process
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _evict_disk(self):
+        entries = self._disk_entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def disk_bytes(self) -> int:
+        return sum(size for _, size, _ in self._disk_entries())
+
+    def __contains__(self, key) -> bool:
+        return key in self.arrays or (self.cache_dir is not None and os.path.exists(self._path(key)))
+
+    def __len__(self):
+        return len(self.arrays)
+
+    def clear(self, disk: bool = False):
+        """Empties the memory tier (and the disk tier with disk=True)."""
+        self.arrays.clear()
+        self.nbytes = 0
+        if disk:
+            for _, _, path in self._disk_entries():
+                self._remove(path)
+
+    def __repr__(self):
+        return (f"IndicatorCache(arrays={len(self.arrays)}, nbytes={self.nbytes}, max_bytes={self.max_bytes}, "
+                f"cache_dir={self.cache_dir!r})")
+
+
+_cache_dir = os.environ.get('BACKTESTER_INDICATOR_CACHE_DIR') or None
+_default = IndicatorCache(cache_dir=_cache_dir) if _cache_dir else None
+
+
+def get_indicator_cache():
+    """The process wide IndicatorCache used by Strategy.indicator_array() (None when the sharing is off)."""
+    return _default
+
+
+def set_indicator_cache(cache):
+    """Replaces the process wide cache, None turns the sharing across runs off. Returns the previous cache."""
+    global _default
+    if cache is not None and not isinstance(cache, IndicatorCache):
+        raise ValueError("cache must be an IndicatorCache or None")
+    previous, _default = _default, cache
+    return previous
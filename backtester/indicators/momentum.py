@@ -0,0 +1,46 @@
+# backtester/indicators/momentum.py
+# Author: Krittin Hirunchupong
+
+'''
+momentum.py
+    Streaming momentum indicators.
+        - RSI: Wilder's Relative Strength Index, seeded with the simple average of the first 'window' changes
+'''
+
+from backtester.indicators.base import Indicator
+
+
+class RSI(Indicator):
+    def __init__(self, column: str = 'Close', window: int = 14):
+        super().__init__(column, window)
+        self._prev = None
+        self._avg_gain = 0.0
+        self._avg_loss = 0.0
+
+    def update(self, value: float):
+        self.count += 1
+        if self._prev is None:
+            self._prev = value
+            return self.value
+
+        change = value - self._prev
+        self._prev = value
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+        changes = self.count - 1
+
+        if changes <= self.window:
+            self._avg_gain += gain / self.window
+            self._avg_loss += loss / self.window
+            if changes < self.window:
+                return self.value
+            self.ready = True
+        else:
+            self._avg_gain += (gain - self._avg_gain) / self.window
+            self._avg_loss += (loss - self._avg_loss) / self.window
+
+        if self._avg_loss == 0:
+            self.value = 100.0 if self._avg_gain > 0 else 50.0
+        else:
+            self.value = 100.0 - 100.0 / (1.0 + self._avg_gain / self._avg_loss)
+        return self.value
@@ -0,0 +1,50 @@
+# backtester/indicators/moving_average.py
+# Author: Krittin Hirunchupong
+
+'''
+moving_average.py
+    Streaming moving averages.
+        - SMA: running sum over a ring buffer
+        - EMA: exponential smoothing with alpha = 2 / (window + 1), seeded with the first value
+'''
+
+from backtester.indicators.base import Indicator, RingBuffer
+
+
+class SMA(Indicator):
+    def __init__(self, column: str = 'Close', window: int = 20):
+        super().__init__(column, window)
+        self._buffer = RingBuffer(window)
+        self._sum = 0.0
+
+    def update(self, value: float):
+        old = self._buffer.push(value)
+        self.count += 1
+        if old is None:
+            self._sum += value
+        else:
+            self._sum += value - old
+
+        # Re-sum once per window so the running sum can't drift, still O(1) amortized
+        if self._buffer.pos == 0:
+            self._sum = sum(self._buffer.values)
+
+        if self._buffer.full:
+            self.ready = True
+            self.value = self._sum / self.window
+        return self.value
+
+
+class EMA(Indicator):
+    def __init__(self, column: str = 'Close', window: int = 20):
+        super().__init__(column, window)
+        self.alpha = 2 / (window + 1)
+
+    def update(self, value: float):
+        self.count += 1
+        if self.count == 1:
+            self.value = value
+        else:
+            self.value = self.value + self.alpha * (value - self.value)  # Not in place, value may be a view
+        self.ready = self.count >= self.window
+        return self.value
@@ -0,0 +1,125 @@
+# backtester/indicators/volatility.py
+# Author: Krittin Hirunchupong
+
+'''
+volatility.py
+    Streaming volatility indicators.
+        - RollingStd: mean and standard deviation of the last 'window' values (sliding Welford update)
+        - ZScore: (value - rolling mean) / rolling std
+        - BollingerBands: rolling mean +/- num_std rolling std (value is the middle band)
+        - ATR: Wilder's Average True Range from High, Low and Close
+'''
+
+import math
+
+from backtester.indicators.base import Indicator, RingBuffer
+
+
+class RollingStd(Indicator):
+    def __init__(self, column: str = 'Close', window: int = 20, ddof: int = 0):
+        super().__init__(column, window)
+        self.ddof = ddof
+        self.mean = math.nan
+        self.std = math.nan
+        self._buffer = RingBuffer(window)
+        self._mean = 0.0
+        self._m2 = 0.0   # Sum of squared deviations from the mean
+
+    @property
+    def key(self):
+        return (type(self).__name__, self.column, self.window, self.ddof)
+
+    def update(self, value: float):
+        old = self._buffer.push(value)
+        self.count += 1
+        if old is None:
+            delta = value - self._mean
+            self._mean += delta / len(self._buffer)
+            self._m2 += delta * (value - self._mean)
+        else:
+            old_mean = self._mean
+            self._mean += (value - old) / self.window
+            self._m2 += (value - old) * (value - self._mean + old - old_mean)
+
+        # Recompute from the buffer once per window so the running sums can't drift, still O(1) amortized
+        if self._buffer.pos == 0:
+            values = self._buffer.values
+            self._mean = sum(values) / self.window
+            self._m2 = sum((v - self._mean) ** 2 for v in values)
+
+        n = len(self._buffer)
+        if self._buffer.full and n > self.ddof:
+            self.ready = True
+            self.mean = self._mean
+            self.std = math.sqrt(max(self._m2, 0.0) / (n - self.ddof))
+            self.value = self.std
+        return self.value
+
+
+class ZScore(RollingStd):
+    def update(self, value: float):
+        super().update(value)
+        if self.ready:
+            self.value = (value - self.mean) / self.std if self.std > 0 else 0.0
+        return self.value
+
+
+class BollingerBands(RollingStd):
+    def __init__(self, column: str = 'Close', window: int = 20, num_std: float = 2.0):
+        super().__init__(column, window)
+        self.num_std = num_std
+        self.upper = math.nan
+        self.middle = math.nan
+        self.lower = math.nan
+
+    @property
+    def key(self):
+        return (type(self).__name__, self.column, self.window, self.num_std)
+
+    def update(self, value: float):
+        super().update(value)
+        if self.ready:
+            self.middle = self.mean
+            self.upper = self.mean + self.num_std * self.std
+            self.lower = self.mean - self.num_std * self.std
+            self.value = self.middle
+        return self.value
+
+
+class ATR(Indicator):
+    _bound = ('_source', '_high', '_low', '_close')
+
+    def __init__(self, window: int = 14):
+        super().__init__('Close', window)
+        self._prev_close = None
+        self._tr_sum = 0.0
+
+    @property
+    def key(self):
+        return (type(self).__name__, self.window)
+
+    def bind(self, bars):
+        self._high = bars['High']
+        self._low = bars['Low']
+        self._close = bars['Close']
+
+    def update_at(self, i: int):
+        return self.update(self._high[i], self._low[i], self._close[i])
+
+    def update(self, high: float, low: float, close: float):
+        if self._prev_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self._prev_close), abs(low - self._prev_close))
+        self._prev_close = close
+        self.count += 1
+
+        if self.count <= self.window:
+            # Seed with the simple average of the first 'window' true ranges
+            self._tr_sum += true_range
+            if self.count == self.window:
+                self.value = self._tr_sum / self.window
+                self.ready = True
+        else:
+            self.value += (true_range - self.value) / self.window
+        return self.value
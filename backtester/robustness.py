@@ -0,0 +1,207 @@
+# backtester/robustness.py
+# Author: Krittin Hirunchupong
+
+'''
+robustness.py
+    This module runs a Monte Carlo robustness analysis of a backtest: the trades (or bar returns) are resampled
+    thousands of times and the Sharpe ratio, max drawdown, total return and final equity of every simulated path give
+    a distribution, and confidence intervals, instead of the single point estimate of performance.py.
+
+    Resampling methods:
+        'bootstrap'  draws with replacement
+        'block'      draws blocks of block_size consecutive values with replacement (circular), which keeps the
+                     autocorrelation and volatility clustering inside a block
+        'shuffle'    reorders the values (a permutation), so the final equity is unchanged and only the path,
+                     and therefore the drawdown, varies
+
+    Sources:
+        a TradeLog          the PnL of the closed trades, added to initial_equity one trade at a time
+        a list of dicts     the same, from trade dicts in the broker's format (rows with status 'closed')
+        get_results() dict  the bar returns of its equity curve, compounded from its first equity
+        an array/Series     bar returns, compounded from initial_equity
+
+    The PnL of a closed trade is recorded before commission. Pass the broker's commission rate and the entry and exit
+    fees, (entry_price + exit_price) * qty * commission, are taken off every trade. An equity curve already has them.
+
+    Simulations run as 2D NumPy arrays (one row per path) in chunks, so memory stays around max_chunk_bytes however
+    many paths are run, and chunks can be spread across processes. Every chunk has its own seed spawned from 'seed',
+    so the results are the same for any n_jobs.
+
+    Example:
+        mc = monte_carlo(results['trade_log'], method='shuffle', n_sims=10_000)
+        mc['intervals'].loc['max_drawdown', ['lower', 'upper']]
+'''
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backtester.core.trade_log import TradeLog
+
+METHODS = ('bootstrap', 'block', 'shuffle')
+METRICS = ('sharpe', 'max_drawdown', 'total_return', 'final_equity')
+
+_worker = {}  # Per process state: the values to resample and the settings
+
+
+def _path_metrics(samples, initial_equity, additive, freq):
+    """Metrics of every row of 'samples' (PnL per trade if additive, else returns per bar) as a dict of arrays."""
+    if additive:
+        equity = initial_equity + np.cumsum(samples, axis=1)
+        previous = np.empty_like(equity)
+        previous[:, 0] = initial_equity
+        previous[:, 1:] = equity[:, :-1]
+        returns = samples / previous
+    else:
+        returns = samples
+        equity = initial_equity * np.cumprod(1.0 + samples, axis=1)
+
+    mean = returns.mean(axis=1)
+    std = returns.std(axis=1)
+    sharpe = np.divide(mean, std, out=np.zeros_like(mean), where=std > 0) * np.sqrt(freq)
+
+    peak = np.maximum(np.maximum.accumulate(equity, axis=1), initial_equity)
+    max_drawdown = np.minimum(((equity - peak) / peak).min(axis=1), 0.0)
+
+    final_equity = equity[:, -1]
+    return {
+        'sharpe': sharpe,
+        'max_drawdown': max_drawdown,
+        'total_return': final_equity / initial_equity - 1,
+        'final_equity': final_equity,
+    }
+
+
+def _sample_indices(rng, method, rows, n, block_size):
+    if method == 'bootstrap':
+        return rng.integers(0, n, size=(rows, n))
+    if method == 'block':
+        blocks = -(-n // block_size)
+        starts = rng.integers(0, n, size=(rows, blocks, 1))
+        return ((starts + np.arange(block_size)) % n).reshape(rows, blocks * block_size)[:, :n]
+    return rng.permuted(np.broadcast_to(np.arange(n), (rows, n)), axis=1)
+
+
+def _init_worker(values, settings):
+    _worker.update(values=values, settings=settings)
+
+
+def _run_chunk(task):
+    seed, rows = task
+    values, settings = _worker['values'], _worker['settings']
+    rng = np.random.default_rng(seed)
+    idx = _sample_indices(rng, settings['method'], rows, len(values), settings['block_size'])
+    return _path_metrics(values[idx], settings['initial_equity'], settings['additive'], settings['freq'])
+
+
+def _trade_pnl(source, commission):
+    # PnL of the closed trades of a TradeLog or a list of trade dicts, less the entry and exit commission
+    if isinstance(source, TradeLog):
+        columns, closed = source.to_numpy(), source.closed_rows()
+        pnl = np.array(source.closed_pnl, dtype=float)
+        turnover = (columns['entry_price'][closed] + columns['price'][closed]) * columns['qty'][closed]
+    else:
+        closed = [trade for trade in source if trade.get('status') == 'closed']
+        pnl = np.array([trade['pnl'] for trade in closed], dtype=float)
+        turnover = np.array([(trade['entry_price'] + trade['exit_price']) * trade['qty'] for trade in closed],
+                            dtype=float)
+    if commission:
+        pnl -= turnover * commission
+    return pnl
+
+
+def _source_values(source, initial_equity, commission):
+    # (values, initial equity, additive) for a TradeLog, a list of trade dicts, a get_results() dict or a return series
+    if isinstance(source, dict):
+        if 'equity_curve' not in source:
+            raise ValueError("A results dict needs an 'equity_curve' (run without store_curve=False)")
+        equity_curve = np.asarray(source['equity_curve'], dtype=float)
+        return np.diff(equity_curve) / equity_curve[:-1], float(equity_curve[0]), False
+    if isinstance(source, TradeLog) or (isinstance(source, (list, tuple)) and source and
+                                        all(isinstance(trade, dict) for trade in source)):
+        return _trade_pnl(source, commission), float(initial_equity), True
+    try:
+        return np.asarray(source, dtype=float), float(initial_equity), False
+    except (TypeError, ValueError):
+        raise ValueError("Unsupported source: expected a TradeLog, a list of trade dicts, a get_results() dict "
+                         "or an array/Series of returns") from None
+
+
+def confidence_intervals(simulations: pd.DataFrame, confidence: float = 0.95, observed: dict = None) -> pd.DataFrame:
+    """
+    One row per metric: mean, lower, median and upper (the central 'confidence' interval) of the simulations,
+    and the observed (not resampled) value when 'observed' is given.
+    """
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be between 0 and 1")
+    tail = (1 - confidence) / 2
+    quantiles = simulations.quantile([tail, 0.5, 1 - tail]).T
+    intervals = pd.DataFrame({
+        'mean': simulations.mean(),
+        'lower': quantiles.iloc[:, 0],
+        'median': quantiles.iloc[:, 1],
+        'upper': quantiles.iloc[:, 2],
+    })
+    if observed is not None:
+        intervals.insert(0, 'observed', pd.Series(observed))
+    return intervals
+
+
+def monte_carlo(source, method: str = 'bootstrap', n_sims: int = 1000, block_size: int = 20,
+                initial_equity: float = 100_000, freq: int = 252, confidence: float = 0.95, seed=None,
+                max_chunk_bytes: int = 64_000_000, n_jobs: int = 1, commission: float = 0.0) -> dict:
+    """
+    Resamples 'source' (a TradeLog or list of trade dicts, a get_results() dict or a return series) n_sims times
+    with 'method'. freq annualizes the Sharpe ratio per resampled value (per trade for a trade log).
+    commission is the broker's rate, taken off the PnL of every trade (trade logs only).
+    n_jobs is the number of worker processes (None or -1 uses every core, 1 runs in this process).
+    Returns a dict with:
+        - simulations: DataFrame, one row per simulated path and one column per metric
+        - intervals:   DataFrame from confidence_intervals(), with the observed values of the original order
+    """
+    if method not in METHODS:
+        raise ValueError(f"Invalid method '{method}'. Must be one of: {list(METHODS)}")
+    if n_sims < 1:
+        raise ValueError("n_sims must be at least 1")
+    if block_size < 1:
+        raise ValueError("block_size must be at least 1")
+
+    values, initial_equity, additive = _source_values(source, initial_equity, commission)
+    if len(values) < 2:
+        raise ValueError("Need at least 2 trades/returns to resample")
+    n = len(values)
+    settings = {
+        'method': method,
+        'block_size': min(block_size, n),
+        'initial_equity': initial_equity,
+        'additive': additive,
+        'freq': freq,
+    }
+
+    # A chunk holds a few (rows, n) float64 arrays at once (indices, samples, equity, returns)
+    chunk_rows = max(1, min(n_sims, max_chunk_bytes // (4 * 8 * n)))
+    sizes = [min(chunk_rows, n_sims - start) for start in range(0, n_sims, chunk_rows)]
+    tasks = list(zip(np.random.SeedSequence(seed).spawn(len(sizes)), sizes))
+
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+    if n_jobs == 1 or len(tasks) == 1:
+        _init_worker(values, settings)
+        chunks = [_run_chunk(task) for task in tasks]
+        _worker.clear()
+    else:
+        with ProcessPoolExecutor(min(n_jobs, len(tasks)), initializer=_init_worker,
+                                 initargs=(values, settings)) as pool:
+            chunks = list(pool.map(_run_chunk, tasks))
+
+    simulations = pd.DataFrame({metric: np.concatenate([chunk[metric] for chunk in chunks]) for metric in METRICS})
+    observed = {metric: float(value[0]) for metric, value in
+                _path_metrics(values[None, :], initial_equity, additive, freq).items()}
+    return {
+        'method': method,
+        'n_sims': n_sims,
+        'simulations': simulations,
+        'intervals': confidence_intervals(simulations, confidence, observed),
+    }
@@ -1,24 +1,73 @@
+import numpy as np
+
 from backtester.core.strategy import Strategy
+from backtester.indicators import SMA
 
 class MeanReversion(Strategy):
-    def __init__(self, data, broker, window=20, threshold=0.02, trailing_stop=0.05):
+    def __init__(self, data, broker, window=20, threshold=0.02, trailing_stop=0.05, broker_stops=True):
         super().__init__(data, broker)
         self.window = window
         self.threshold = threshold
         self.trailing_stop = trailing_stop
-        self.trailing_prices = {}  # trade_id -> best_price_seen
+        # The trailing stops rest in the broker (see Broker.set_trailing_stop()), so no bar scans the open trades.
+        # A stop is armed on the bar after the entry, with that bar's close as the best price, like the per-bar
+        # check this strategy used to run. The one difference: the broker fires when the price reaches the level,
+        # the old check only once the close went past it. broker_stops=False runs that check instead.
+        self.broker_stops = broker_stops
+        self.max_lookback = 1  # Only the current bar is read, the SMA keeps its own history
+        self.trailing_prices = {}  # trade_id -> best_price_seen (broker_stops=False)
+        self.unarmed = []  # Trades opened on the previous bar, their stop is set on this one (broker_stops=True)
+        self.sma = self.add_indicator(SMA('Close', window))
 
     def on_data(self, timestamp=None):
         if self.current_index < self.window:
             return
 
         close = self.get_price('Close')
-        ma = self.get_lookback('Close', self.window).mean()
+        ma = self.sma.value
         deviation = (close - ma) / ma
+
+        # ➤ Trailing stop-loss
+        if self.broker_stops:
+            for tid in self.unarmed:
+                if tid in self.broker.open_trades:
+                    self.broker.set_trailing_stop(tid, self.trailing_stop, best=close, timestamp=timestamp)
+            self.unarmed = []
+        else:
+            self._check_trailing_stops(close, timestamp)
+
+        # ➤ Get current position (after potential stops)
         open_ids = list(self.broker.open_trades.keys())
+        current_pos = self.broker.net_position
+
+        # ➤ Mean reversion logic
+        if deviation < -self.threshold and current_pos <= 0:
+            for tid in open_ids:
+                trade = self.broker.open_trades.get(tid)
+                if trade and trade['side'] == 'sell':
+                    self.broker.close_trade(tid, price=close, timestamp=timestamp)
+                    self.trailing_prices.pop(tid, None)
+            self._open('buy', close, timestamp)
+
+        elif deviation > self.threshold and current_pos >= 0:
+            for tid in open_ids:
+                trade = self.broker.open_trades.get(tid)
+                if trade and trade['side'] == 'buy':
+                    self.broker.close_trade(tid, price=close, timestamp=timestamp)
+                    self.trailing_prices.pop(tid, None)
+            self._open('sell', close, timestamp)
+
+        elif abs(deviation) < 0.005:
+            self.close_all_trades(timestamp=timestamp)
+            self.trailing_prices.clear()
 
-        # ➤ Trailing stop-loss check
-        for tid in open_ids:
+    def _open(self, side, close, timestamp):
+        tid = self.broker.execute_order(qty=1, side=side, price=close, timestamp=timestamp)
+        if self.broker_stops:
+            self.unarmed.append(tid)
+
+    def _check_trailing_stops(self, close, timestamp):
+        for tid in list(self.broker.open_trades.keys()):
             trade = self.broker.open_trades.get(tid)
             if not trade:
                 continue
@@ -43,31 +92,47 @@ class MeanReversion(Strategy):
             # Save updated best price
             self.trailing_prices[tid] = best
 
-        # ➤ Get current position (after potential stops)
-        open_ids = list(self.broker.open_trades.keys())  # Refresh after possible stops
-        current_pos = 0
-        for tid in open_ids:
-            trade = self.broker.open_trades.get(tid)
-            if trade:
-                current_pos += 1 if trade['side'] == 'buy' else -1
+    def generate_signals(self, data):
+        # The trailing stop depends on the path since entry, so the moving average is computed with NumPy
+        # and the entry/stop rules run as a tight state machine over plain floats.
+        close = np.asarray(data['Close'], dtype=float)
+        ma = self.indicator_array('sma', 'Close', window=self.window)
+        positions = np.zeros(len(close))
+        exits = np.zeros(len(close), dtype=bool)
+        broker_stops = self.broker_stops
 
-        # ➤ Mean reversion logic
-        if deviation < -self.threshold and current_pos <= 0:
-            for tid in open_ids:
-                trade = self.broker.open_trades.get(tid)
-                if trade and trade['side'] == 'sell':
-                    self.broker.close_trade(tid, price=close, timestamp=timestamp)
-                    self.trailing_prices.pop(tid, None)
-            self.broker.execute_order(qty=1, side='buy', price=close, timestamp=timestamp)
+        position = 0
+        best = None  # Best price seen since entry, starts at the close of the first bar after the entry
+        for i, (price, mean) in enumerate(zip(close.tolist(), ma.tolist())):
+            if i < self.window:
+                continue
+            deviation = (price - mean) / mean
 
-        elif deviation > self.threshold and current_pos >= 0:
-            for tid in open_ids:
-                trade = self.broker.open_trades.get(tid)
-                if trade and trade['side'] == 'buy':
-                    self.broker.close_trade(tid, price=close, timestamp=timestamp)
-                    self.trailing_prices.pop(tid, None)
-            self.broker.execute_order(qty=1, side='sell', price=close, timestamp=timestamp)
+            if position != 0:
+                best = price if best is None else best
+                if position > 0:
+                    best = max(best, price)
+                    level = best * (1 - self.trailing_stop)
+                    stopped = price <= level if broker_stops else price < level
+                else:
+                    best = min(best, price)
+                    level = best * (1 + self.trailing_stop)
+                    stopped = price >= level if broker_stops else price > level
+                if stopped:
+                    exits[i] = True
+                    position = 0
+                    best = None
 
-        elif abs(deviation) < 0.005:
-            self.close_all_trades(timestamp=timestamp)
-            self.trailing_prices.clear()
+            if deviation < -self.threshold and position <= 0:
+                position = 1
+                best = None
+            elif deviation > self.threshold and position >= 0:
+                position = -1
+                best = None
+            elif abs(deviation) < 0.005:
+                position = 0
+                best = None
+
+            positions[i] = position
+
+        return positions, exits
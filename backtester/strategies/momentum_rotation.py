@@ -0,0 +1,47 @@
+# backtester/strategies/momentum_rotation.py
+# Author: Krittin Hirunchupong
+
+'''
+momentum_rotation.py
+    A simple cross-sectional strategy for multi-asset runs (Panel data with a PortfolioBroker).
+    Strategy:
+        - Every 'rebalance_every' bars, ranks the symbols by their return over the last 'lookback' bars
+        - Holds 'qty' units of the 'top_k' best symbols and nothing in the others
+        - Closes everything on the last bar
+'''
+
+import numpy as np
+
+from backtester.core.strategy import Strategy
+
+
+class MomentumRotation(Strategy):
+    def __init__(self, data, broker, lookback=20, top_k=5, rebalance_every=5, qty=1):
+        super().__init__(data, broker)
+        self.lookback = lookback
+        self.top_k = top_k
+        self.rebalance_every = rebalance_every
+        self.qty = qty
+        self.max_lookback = lookback + 1
+
+    def on_data(self, timestamp=None):
+        if self.current_index < self.lookback:
+            return
+
+        if self.is_last_bar():
+            self.close_all_trades(timestamp)
+            return
+
+        if (self.current_index - self.lookback) % self.rebalance_every:
+            return
+
+        window = self.get_lookback('Close', self.lookback + 1)   # (lookback + 1, symbols)
+        returns = window[-1] / window[0] - 1
+        returns = np.where(np.isfinite(returns), returns, -np.inf)
+
+        ranked = np.argsort(-returns, kind='stable')[:self.top_k]
+        ranked = ranked[np.isfinite(returns[ranked])]
+
+        targets = np.zeros(len(returns))
+        targets[ranked] = self.qty
+        self.broker.order_target_positions(targets, timestamp=timestamp)
@@ -7,38 +7,58 @@ sma_crossover.py
     Strategy:
         - Enters a long position when the short_sma crosses upward over the long_sma, and close all the short position
         - Enters a short position when the short_sma corsses downward over the long_sma, and close all the long position
+        - Every bar with a signal closes the open trade and opens a new one on the signaled side
+        - Closes everything on the last bar
 '''
 
+import numpy as np
+
 from backtester.core.strategy import Strategy
+from backtester.indicators import SMA
 
 class SmaCrossover(Strategy):
+    close_at_end = True
+
     def __init__(self, data, broker, short_window=10, long_window=20):
         super().__init__(data, broker)
         self.short_window = short_window
         self.long_window = long_window
+        self.max_lookback = 1  # Only the current bar is read, the SMAs keep their own history
+        self.short_sma = self.add_indicator(SMA('Close', short_window))
+        self.long_sma = self.add_indicator(SMA('Close', long_window))
 
     def on_data(self, timestamp=None):
         if self.current_index < self.long_window:
             return
-        
-        short_ma = self.get_lookback('Close', self.short_window).mean()
-        long_ma = self.get_lookback('Close', self.long_window).mean()
+
+        short_ma = self.short_sma.value
+        long_ma = self.long_sma.value
         price = self.get_price()
         open_ids = list(self.broker.open_trades.keys())
 
         if short_ma > long_ma:
-            if open_ids:
-                for trade_id in open_ids:
-                    self.broker.close_trade(trade_id, price=price, timestamp=timestamp)
+            for trade_id in open_ids:
+                self.broker.close_trade(trade_id, price=price, timestamp=timestamp)
             self.broker.execute_order(qty=1, side='buy', price=price, timestamp=timestamp)
 
         elif short_ma < long_ma:
-            if open_ids:
-                for trade_id in open_ids:
-                    self.broker.close_trade(trade_id, price=price, timestamp=timestamp)
+            for trade_id in open_ids:
+                self.broker.close_trade(trade_id, price=price, timestamp=timestamp)
             self.broker.execute_order(qty=1, side='sell', price=price, timestamp=timestamp)
 
-        if self.current_index == len(self.data) - 1:
+        if self.is_last_bar():
             self.close_all_trades(timestamp)
 
-        
\ No newline at end of file
+    def generate_signals(self, data):
+        short_ma = self.indicator_array('sma', 'Close', window=self.short_window)
+        long_ma = self.indicator_array('sma', 'Close', window=self.long_window)
+
+        # +1 while short_ma is above long_ma, -1 while below, equal MAs keep the previous side
+        signal = np.nan_to_num(np.sign(short_ma - long_ma))
+        signal[:self.long_window] = 0
+        last_signal = np.maximum.accumulate(np.where(signal != 0, np.arange(len(signal)), 0))
+        positions = signal[last_signal] if len(signal) else signal
+
+        # Like on_data(), every bar with a signal closes the open trade and opens a new one (exits), and the
+        # last bar closes everything after its trade (close_at_end)
+        return positions, signal != 0
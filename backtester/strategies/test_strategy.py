@@ -7,6 +7,7 @@ class TestStrategy(Strategy):
         self.holding_period = 10
         self.entry_interval = 5
         self.trades = []  # Stores (trade_id, entry_index)
+        self.max_lookback = 1
 
     def on_data(self, timestamp=None):
         current_idx = self.current_index
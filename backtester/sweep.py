@@ -0,0 +1,220 @@
+# backtester/sweep.py
+# Author: Krittin Hirunchupong
+
+'''
+sweep.py
+    This module runs one strategy over a grid of parameters on a pool of worker processes.
+    The OHLCV data is copied once into shared memory and every worker builds its DataFrame on top of it,
+    so the data is never pickled to the workers. Workers are reused across chunks of the grid. The grid is read
+    lazily and only a few chunks per worker are in flight at a time, so a generator of parameter sets is never
+    materialized; the result rows (one dict per set, plus its curves with return_curves=True) are all kept.
+    Indicator arrays are shared across the runs of a worker through an IndicatorCache (see indicators/cache.py),
+    the process wide one when it is set or one that lives for the sweep otherwise, so each distinct indicator is
+    computed once per worker (once in total with a disk tier).
+
+    Example:
+        results = run_sweep(SmaCrossover, df, {'short_window': [10, 20], 'long_window': [50, 100]}, n_jobs=4)
+'''
+
+import itertools
+import os
+import sys
+from collections import deque
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+
+from backtester.core.broker import Broker
+from backtester.core.engine import BacktestEngine
+from backtester.indicators.cache import IndicatorCache, get_indicator_cache, set_indicator_cache
+from backtester.utils.performance import (
+    compute_sharpe_ratio,
+    compute_max_drawdown,
+    compute_num_trades,
+    compute_total_return,
+    compute_win_rate
+)
+
+_worker = {}  # Per process state: the strategy, run settings and the DataFrame built on shared memory
+CHUNKS_IN_FLIGHT = 4  # Chunks submitted per worker ahead of the results read back
+UNSIZED_CHUNKSIZE = 16  # Largest chunksize picked for a grid of unknown size (a generator)
+
+
+def iter_param_grid(param_grid):
+    """
+    Yields one dict of strategy kwargs per parameter set.
+    param_grid is either a dict of lists (every combination is used) or an iterable of dicts.
+    """
+    if isinstance(param_grid, dict):
+        names = list(param_grid)
+        for values in itertools.product(*(param_grid[name] for name in names)):
+            yield dict(zip(names, values))
+    else:
+        yield from param_grid
+
+
+def _grid_size(param_grid):
+    if isinstance(param_grid, dict):
+        return int(np.prod([len(values) for values in param_grid.values()]))
+    return len(param_grid) if hasattr(param_grid, '__len__') else None
+
+
+def summarize_results(results, freq=252):
+    """Computes the sweep metrics for one get_results() dict."""
+    equity_curve = np.asarray(results['equity_curve'], dtype=float)
+    if len(equity_curve) < 2:
+        sharpe, max_drawdown, total_return = 0.0, 0.0, 0.0
+    else:
+        sharpe = compute_sharpe_ratio(equity_curve, freq=freq)
+        max_drawdown = compute_max_drawdown(equity_curve)
+        total_return = compute_total_return(equity_curve)
+    return {
+        'sharpe': float(sharpe),
+        'max_drawdown': float(max_drawdown),
+        'total_return': float(total_return),
+        'win_rate': float(compute_win_rate(results['trade_log'])),
+        'num_trades': compute_num_trades(results['trade_log']),
+        'final_equity': float(results['final_equity']),
+    }
+
+
+def _share_data(data):
+    # Copies the numeric columns (and a datetime index) into one shared memory block, laid out column by column
+    columns = [col for col in data.columns if np.issubdtype(data[col].dtype, np.number)]
+    is_datetime = isinstance(data.index, pd.DatetimeIndex)
+    rows = len(columns) + (1 if is_datetime else 0)
+
+    shm = SharedMemory(create=True, size=max(1, rows * len(data) * 8))
+    block = np.ndarray((rows, len(data)), dtype=np.float64, buffer=shm.buf)
+    for i, col in enumerate(columns):
+        block[i] = data[col].to_numpy(dtype=float)
+    if is_datetime:
+        block[-1].view(np.int64)[:] = data.index.as_unit('ns').asi8  # Read back as datetime64[ns]
+        index_meta = ('datetime', data.index.tz, data.index.name)
+    else:
+        index_meta = ('pickled', data.index, None)
+
+    layout = (shm.name, (rows, len(data)), columns, index_meta)
+    return shm, layout
+
+
+def _attach_data(layout):
+    shm_name, shape, columns, index_meta = layout
+    if sys.version_info >= (3, 13):
+        shm = SharedMemory(name=shm_name, track=False)
+    else:
+        shm = SharedMemory(name=shm_name)
+    block = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+
+    kind, value, name = index_meta
+    if kind == 'datetime':
+        index = pd.DatetimeIndex(block[-1].view('datetime64[ns]'), name=name)
+        if value is not None:
+            index = index.tz_localize('UTC').tz_convert(value)
+        values = block[:-1]
+    else:
+        index = value
+        values = block
+
+    # values is (columns, rows) in C order, so each column of the frame is a contiguous row of shared memory
+    data = pd.DataFrame(values.T, index=index, columns=columns, copy=False)
+    return shm, data
+
+
+def _init_worker(strategy_class, layout, settings):
+    shm, data = _attach_data(layout)
+    _worker.update(strategy_class=strategy_class, shm=shm, data=data, settings=settings)
+    if get_indicator_cache() is None:
+        set_indicator_cache(IndicatorCache())  # The shared data can't change during the sweep
+
+
+def _run_one(params):
+    settings = _worker['settings']
+    broker = Broker(initial_cash=settings['initial_cash'], commission=settings['commission'])
+    engine = BacktestEngine(_worker['strategy_class'], _worker['data'], broker, **params)
+    if settings['mode'] == 'vectorized':
+        engine.run_vectorized()
+    else:
+        engine.run()
+    results = engine.get_results()
+
+    row = {**params, **summarize_results(results, freq=settings['freq'])}
+    if settings['return_curves']:
+        row['equity_curve'] = np.asarray(results['equity_curve'], dtype=float)
+        row['pnl_curve'] = np.asarray(results['pnl_curve'], dtype=float)
+    return row
+
+
+def _run_chunk(chunk):
+    return [_run_one(params) for params in chunk]
+
+
+def _pick_chunksize(param_grid, params, n_jobs):
+    # About CHUNKS_IN_FLIGHT chunks per worker. A generator's size is unknown: its first sets are read ahead
+    # (put back in front of params) and only a short grid gets smaller chunks
+    size = _grid_size(param_grid)
+    if size is None:
+        head = list(itertools.islice(params, n_jobs * CHUNKS_IN_FLIGHT * UNSIZED_CHUNKSIZE))
+        size = len(head)
+        params = itertools.chain(head, params)
+    return max(1, size // (n_jobs * CHUNKS_IN_FLIGHT)), params
+
+
+def run_sweep(strategy_class, data, param_grid, n_jobs=None, initial_cash=100_000, commission=0.001,
+              mode='event', return_curves=False, chunksize=None, freq=252):
+    """
+    Runs strategy_class once per parameter set in param_grid and returns one row per set with
+    sharpe, max_drawdown, total_return, win_rate, num_trades and final_equity (plus the equity and pnl curves
+    as arrays when return_curves=True). Rows are in the same order as the grid.
+
+    n_jobs is the number of worker processes (None or -1 uses every core, 1 runs in this process).
+    mode is 'event' or 'vectorized', like run_backtest().
+    """
+    if mode not in ('event', 'vectorized'):
+        raise ValueError(f"Invalid mode '{mode}'. Must be 'event' or 'vectorized'")
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+
+    settings = {
+        'initial_cash': initial_cash,
+        'commission': commission,
+        'mode': mode,
+        'return_curves': return_curves,
+        'freq': freq,
+    }
+
+    if n_jobs == 1:
+        _worker.update(strategy_class=strategy_class, data=data, settings=settings)
+        previous = get_indicator_cache()
+        if previous is None:
+            set_indicator_cache(IndicatorCache())
+        try:
+            rows = [_run_one(params) for params in iter_param_grid(param_grid)]
+        finally:
+            _worker.clear()
+            set_indicator_cache(previous)
+        return pd.DataFrame(rows)
+
+    params = iter_param_grid(param_grid)
+    if chunksize is None:
+        chunksize, params = _pick_chunksize(param_grid, params, n_jobs)
+
+    rows = []
+    shm, layout = _share_data(data)
+    try:
+        with Pool(n_jobs, initializer=_init_worker, initargs=(strategy_class, layout, settings)) as pool:
+            # At most n_jobs * CHUNKS_IN_FLIGHT chunks are pending, results are read back in grid order
+            pending = deque()
+            for chunk in iter(lambda: list(itertools.islice(params, chunksize)), []):
+                pending.append(pool.apply_async(_run_chunk, (chunk,)))
+                if len(pending) >= n_jobs * CHUNKS_IN_FLIGHT:
+                    rows.extend(pending.popleft().get())
+            while pending:
+                rows.extend(pending.popleft().get())
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return pd.DataFrame(rows)
@@ -9,6 +9,9 @@ performance.py
         - Max Drawdown
         - Total Return
         - Win Rate
+
+    RunningMetrics computes the same metrics (and a few more) one bar at a time while the engine runs,
+    so they are available without keeping the equity curve.
 '''
 import numpy as np
 
@@ -29,6 +32,10 @@ def compute_total_return(equity_curve):
     return (equity_curve[-1] / equity_curve[0]) - 1
 
 def compute_win_rate(trade_log):
+    if hasattr(trade_log, 'closed_pnl'):
+        closed_pnl = trade_log.closed_pnl
+        return np.count_nonzero(closed_pnl > 0) / len(closed_pnl) if len(closed_pnl) > 0 else 0
+
     wins = 0
     total = 0
     for trade in trade_log:
@@ -37,4 +44,200 @@ def compute_win_rate(trade_log):
             if pnl > 0:
                 wins += 1
             total += 1
-    return wins / total if total > 0 else 0
\ No newline at end of file
+    return wins / total if total > 0 else 0
+
+
+def compute_num_trades(trade_log):
+    """Number of closed trades (the log also has a row for every opening)."""
+    if hasattr(trade_log, 'num_closed'):
+        return trade_log.num_closed()
+    return sum(1 for trade in trade_log if trade.get("status") == "closed")
+
+
+class RunningMetrics:
+    '''
+    Streaming performance metrics, updated once per bar with update(equity, exposed).
+        - mean/variance of the bar returns (Welford), for the Sharpe ratio and volatility
+        - running peak, max drawdown and drawdown duration (in bars)
+        - total return, exposure (share of bars with an open position)
+        - wins/losses of closed trades, read incrementally from the trade log given to the constructor
+        - with window=N, Sharpe ratio and return over the last N bars (kept in a ring of N returns)
+    sharpe and max_drawdown match compute_sharpe_ratio() and compute_max_drawdown() on the full curve.
+    '''
+    def __init__(self, freq=252, window=None, trade_log=None):
+        self.freq = freq
+        self.window = window
+        self.trade_log = trade_log
+
+        self.bars = 0
+        self.exposed_bars = 0
+        self.first_equity = None
+        self.last_equity = None
+
+        self.count = 0       # Number of returns
+        self.mean = 0.0
+        self.m2 = 0.0        # Sum of squared deviations from the mean
+
+        self.peak = None
+        self.max_drawdown = 0.0
+        self.drawdown_duration = 0
+        self.max_drawdown_duration = 0
+
+        self.wins = 0
+        self.losses = 0
+        self._closed_seen = 0
+
+        if window is not None:
+            self._returns = np.zeros(window)
+            self._pos = 0
+            self._sum = 0.0
+            self._sum_sq = 0.0
+            self._growth = np.ones(window)  # 1 + return, for the rolling return
+
+    def update(self, equity: float, exposed: bool = False):
+        self.bars += 1
+        if exposed:
+            self.exposed_bars += 1
+
+        previous = self.last_equity
+        self.last_equity = equity
+        if previous is None:
+            self.first_equity = equity
+            self.peak = equity
+            return
+
+        r = equity / previous - 1
+        self.count += 1
+        delta = r - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (r - self.mean)
+
+        if equity >= self.peak:
+            self.peak = equity
+            self.drawdown_duration = 0
+        else:
+            self.drawdown_duration += 1
+            drawdown = (equity - self.peak) / self.peak
+            if drawdown < self.max_drawdown:
+                self.max_drawdown = drawdown
+            if self.drawdown_duration > self.max_drawdown_duration:
+                self.max_drawdown_duration = self.drawdown_duration
+
+        if self.window is not None:
+            pos = self._pos
+            old = self._returns[pos]
+            self._returns[pos] = r
+            self._growth[pos] = 1 + r
+            self._pos = pos + 1 if pos + 1 < self.window else 0
+            if self._pos == 0:
+                # Re-summed once per window so the running sums can't drift
+                self._sum = float(self._returns.sum())
+                self._sum_sq = float(self._returns @ self._returns)
+            else:
+                self._sum += r - old
+                self._sum_sq += r * r - old * old
+
+    def update_many(self, equity_curve, exposed=None):
+        """Same as calling update() for every value, with NumPy (used after a vectorized run)."""
+        equity_curve = np.asarray(equity_curve, dtype=float)
+        if exposed is None:
+            exposed = np.zeros(len(equity_curve), dtype=bool)
+        if not len(equity_curve):
+            return
+        if self.window is not None:
+            # The rolling ring is path dependent, so this falls back to the bar by bar update
+            for equity, is_exposed in zip(equity_curve.tolist(), np.asarray(exposed, dtype=bool).tolist()):
+                self.update(equity, is_exposed)
+            return
+
+        self.bars += len(equity_curve)
+        self.exposed_bars += int(np.count_nonzero(exposed))
+        if self.last_equity is None:
+            self.first_equity = equity_curve[0]
+            self.peak = equity_curve[0]
+        else:
+            equity_curve = np.concatenate(([self.last_equity], equity_curve))
+        self.last_equity = float(equity_curve[-1])
+        if len(equity_curve) < 2:
+            return
+
+        # Combine the batch's return mean/variance with the running ones (Chan et al.)
+        returns = np.diff(equity_curve) / equity_curve[:-1]
+        n, mean, m2 = len(returns), float(returns.mean()), float(((returns - returns.mean()) ** 2).sum())
+        total = self.count + n
+        delta = mean - self.mean
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.mean += delta * n / total
+        self.count = total
+
+        peaks = np.maximum.accumulate(np.concatenate(([self.peak], equity_curve[1:])))[1:]
+        drawdowns = (equity_curve[1:] - peaks) / peaks
+        self.max_drawdown = min(self.max_drawdown, float(drawdowns.min()))
+        in_drawdown = equity_curve[1:] < peaks
+        # Length of every run of bars below the peak, the first run continues the current drawdown
+        run_ids = np.cumsum(~in_drawdown)
+        lengths = np.bincount(run_ids[in_drawdown], minlength=run_ids[-1] + 1)
+        lengths[0] += self.drawdown_duration
+        self.max_drawdown_duration = max(self.max_drawdown_duration, int(lengths.max()))
+        self.drawdown_duration = int(lengths[run_ids[-1]]) if in_drawdown[-1] else 0
+        self.peak = float(peaks[-1])
+
+    def _count_trades(self):
+        if self.trade_log is None or not hasattr(self.trade_log, 'closed_pnl'):
+            return
+        closed_pnl = self.trade_log.closed_pnl
+        new = closed_pnl[self._closed_seen:]
+        self.wins += int(np.count_nonzero(new > 0))
+        self.losses += int(np.count_nonzero(new <= 0))
+        self._closed_seen = len(closed_pnl)
+
+    @property
+    def std(self) -> float:
+        return (self.m2 / self.count) ** 0.5 if self.count else 0.0
+
+    @property
+    def sharpe(self) -> float:
+        std = self.std
+        return self.mean / std * np.sqrt(self.freq) if std else 0.0
+
+    @property
+    def total_return(self) -> float:
+        return self.last_equity / self.first_equity - 1 if self.first_equity else 0.0
+
+    @property
+    def rolling_sharpe(self) -> float:
+        n = min(self.count, self.window or 0)
+        if not n:
+            return 0.0
+        mean = self._sum / n
+        variance = max(self._sum_sq / n - mean * mean, 0.0)
+        return mean / variance ** 0.5 * np.sqrt(self.freq) if variance > 0 else 0.0
+
+    @property
+    def rolling_return(self) -> float:
+        n = min(self.count, self.window or 0)
+        if not n:
+            return 0.0
+        return float(np.prod(self._growth)) - 1  # Unused slots hold 1.0
+
+    def report(self) -> dict:
+        self._count_trades()
+        closed = self.wins + self.losses
+        report = {
+            'bars': self.bars,
+            'final_equity': self.last_equity,
+            'total_return': self.total_return,
+            'sharpe': self.sharpe,
+            'volatility': self.std * np.sqrt(self.freq),
+            'max_drawdown': self.max_drawdown,
+            'max_drawdown_duration': self.max_drawdown_duration,
+            'current_drawdown_duration': self.drawdown_duration,
+            'exposure': self.exposed_bars / self.bars if self.bars else 0.0,
+            'wins': self.wins,
+            'losses': self.losses,
+            'win_rate': self.wins / closed if closed else 0.0,
+        }
+        if self.window is not None:
+            report['rolling_sharpe'] = self.rolling_sharpe
+            report['rolling_return'] = self.rolling_return
+        return report
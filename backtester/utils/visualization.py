@@ -7,29 +7,177 @@ visualization.py
     Visualization Included:
         - Equity Curve
         - Candle Stick chart with trade overlays
+
+    Charts are drawn at the level of detail the output can show. A chart 'width' pixels wide is drawn with at most
+    about 2 equity points per pixel (picked with LTTB, Largest-Triangle-Three-Buckets, which keeps the peaks and
+    troughs) and about one candle per 3 pixels (consecutive bars are aggregated into OHLC candles). Trade markers
+    are placed by joining the trade log's timestamps against the index with NumPy, not one lookup per trade.
+    matplotlib and mplfinance are only imported when a chart is drawn.
+
+    Passing save_path writes the chart to a file or file object (the format comes from the extension, e.g. .png or
+    .svg) instead of showing it. Saved charts are drawn on a bare matplotlib Figure (candles through mplfinance's
+    external axes mode), never registered with pyplot, so they work headless and don't leave figures open.
+    save_sweep_report() writes one equity chart per row of a parameter sweep.
 '''
 
+import os
 
-import matplotlib.pyplot as plt
-import mplfinance as mpf
 import pandas as pd
 import numpy as np
 
-def plot_equity_curve(timestamps, strategy_equity, buy_hold_equity):
-    plt.figure(figsize=(10, 4))
-    plt.plot(timestamps, strategy_equity, label="Strategy Equity", linewidth=2)
-    plt.plot(timestamps, buy_hold_equity, label="Buy & Hold Equity", linestyle="--", color="gray")
-    
-    plt.xlabel("Time")
-    plt.ylabel("Equity")
-    plt.title("Equity Curve Comparison")
-    plt.grid(True)
-    plt.legend()
-    plt.tight_layout()
-    plt.show()
-
-
-def plot_candles_with_trades(data, trades, timestamps=None):
+from backtester.core.resample import reduce_buckets
+from backtester.core.trade_log import TradeLog, OPEN, CLOSED, BUY, SELL, NAT
+
+FIGSIZE = (10, 4)
+DPI = 100
+POINTS_PER_PIXEL = 2   # Equity curve points drawn per horizontal pixel
+PIXELS_PER_CANDLE = 3  # Narrower candles can't be told apart
+SWEEP_METRICS = ('sharpe', 'max_drawdown', 'total_return', 'win_rate', 'num_trades', 'final_equity')
+
+
+'''
+Level of detail
+'''
+def lttb(x, y, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling. Returns the positions of the n_out points of (x, y) that keep its
+    visual shape: the first and last points, and from every bucket in between the point forming the largest triangle
+    with the point picked before it and the average of the next bucket.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    x = x - x[0]  # Keeps nanosecond timestamps in a range where the areas are exact
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    edges[-1] = n - 1
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], max(edges[b + 1], edges[b] + 1)
+        next_lo = hi
+        next_hi = edges[b + 2] if b + 2 < len(edges) else n
+        next_hi = min(max(next_hi, next_lo + 1), n)
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[b + 1] = a
+    return selected
+
+
+def downsample_ohlc(df: pd.DataFrame, max_candles: int):
+    """
+    Aggregates runs of consecutive bars so that df has at most max_candles candles (first Open, max High, min Low,
+    last Close, summed Volume), labelled by the first bar of each run.
+    Returns (downsampled df, bars per candle).
+    """
+    n = len(df)
+    if max_candles < 1:
+        raise ValueError("max_candles must be at least 1")
+    if n <= max_candles:
+        return df, 1
+    step = -(-n // max_candles)
+    starts = np.arange(0, n, step, dtype=np.intp)
+    columns = {col: reduce_buckets(col, df[col].to_numpy(), starts) for col in df.columns}
+    return pd.DataFrame(columns, index=df.index[starts]), step
+
+
+def _index_ns(index) -> np.ndarray:
+    # UTC nanoseconds of a DatetimeIndex, the same unit as the trade log timestamps
+    return pd.DatetimeIndex(index).as_unit('ns').asi8
+
+
+def trade_markers(index, trades):
+    """
+    Positions in 'index' (a sorted DatetimeIndex) of the buy and sell fills of 'trades' (a TradeLog or trade dicts).
+    An open row is a fill on its side, a closed row a fill on the opposite side of its entry.
+    Trades whose timestamp isn't in the index are skipped.
+    """
+    if not isinstance(trades, TradeLog):
+        log = TradeLog()
+        log.extend(trades)
+        trades = log
+    columns = trades.to_numpy()
+    ts, status, side = columns['timestamp'], columns['status'], columns['side']
+
+    index_ns = _index_ns(index)
+    pos = np.searchsorted(index_ns, ts)
+    found = (ts != NAT) & (pos < len(index_ns))
+    found[found] = index_ns[pos[found]] == ts[found]
+
+    buys = ((status == OPEN) & (side == BUY)) | ((status == CLOSED) & (side == SELL))
+    return pos[found & buys], pos[found & ~buys]
+
+
+'''
+Charts
+'''
+def _new_figure(save_path, figsize, dpi):
+    # Saved charts use a bare Figure (no pyplot), so nothing needs a display and nothing stays open
+    if save_path is not None:
+        from matplotlib.figure import Figure
+        return Figure(figsize=figsize, dpi=dpi)
+    import matplotlib.pyplot as plt
+    return plt.figure(figsize=figsize, dpi=dpi)
+
+
+def _finish(fig, save_path):
+    if save_path is None:
+        import matplotlib.pyplot as plt
+        plt.show()
+        return None
+    fig.savefig(save_path)
+    return save_path
+
+
+def plot_equity_curve(timestamps, strategy_equity, buy_hold_equity=None, max_points=None, save_path=None,
+                      figsize=FIGSIZE, dpi=DPI, title="Equity Curve Comparison"):
+    '''
+    Plots the strategy equity against buy & hold. Curves longer than max_points (default: POINTS_PER_PIXEL per
+    pixel of the figure width) are downsampled with LTTB. Writes the chart to save_path instead of showing it
+    when given, and returns save_path.
+    '''
+    strategy_equity = np.asarray(strategy_equity, dtype=float)
+    n = len(strategy_equity)
+    if timestamps is None:
+        timestamps = np.arange(n)
+    timestamps = pd.Index(timestamps)
+    if max_points is None:
+        max_points = int(figsize[0] * dpi * POINTS_PER_PIXEL)
+    x = _index_ns(timestamps) if isinstance(timestamps, pd.DatetimeIndex) else np.arange(n)
+
+    fig = _new_figure(save_path, figsize, dpi)
+    ax = fig.gca()
+    keep = lttb(x, strategy_equity, max_points)
+    ax.plot(timestamps[keep], strategy_equity[keep], label="Strategy Equity", linewidth=2)
+    if buy_hold_equity is not None:
+        buy_hold_equity = np.asarray(buy_hold_equity, dtype=float)
+        keep = lttb(x, buy_hold_equity, max_points)
+        ax.plot(timestamps[keep], buy_hold_equity[keep], label="Buy & Hold Equity", linestyle="--", color="gray")
+
+    ax.set_xlabel("Time")
+    ax.set_ylabel("Equity")
+    ax.set_title(title)
+    ax.grid(True)
+    ax.legend()
+    fig.tight_layout()
+    return _finish(fig, save_path)
+
+
+def plot_candles_with_trades(data, trades, timestamps=None, max_candles=None, save_path=None,
+                             figsize=FIGSIZE, dpi=DPI):
+    '''
+    Plots candles with a green marker under every buy fill and a red marker above every sell fill.
+    More bars than max_candles (default: one candle per PIXELS_PER_CANDLE pixels of the figure width) are
+    aggregated into wider candles, and a marker goes on the candle its bar was merged into.
+    Writes the chart to save_path instead of showing it when given, and returns save_path.
+    '''
+    import mplfinance as mpf
+
     df = data.copy()
     df.index.name = 'Date'
 
@@ -38,30 +186,65 @@ def plot_candles_with_trades(data, trades, timestamps=None):
         end = timestamps[-1]
         df = df.loc[start:end]
 
-    buy_signals = pd.Series(index=df.index, dtype=float)
-    sell_signals = pd.Series(index=df.index, dtype=float)
-
-    for trade in trades:
-        ts = trade.get("timestamp")
-        if ts not in df.index:
-            continue
-
-        if trade.get("status") == "open":
-            if trade["side"] == "buy":
-                buy_signals[ts] = df.loc[ts]["Low"] * 0.98
-            elif trade["side"] == "sell":
-                sell_signals[ts] = df.loc[ts]["High"] * 1.02
-        elif trade.get("status") == "closed":
-            if trade["exit_side"] == "sell":
-                sell_signals[ts] = df.loc[ts]["High"] * 1.02
-            elif trade["exit_side"] == "buy":
-                buy_signals[ts] = df.loc[ts]["Low"] * 0.98
-
-    apds = [
-        mpf.make_addplot(buy_signals, type='scatter', marker='^', color='green', markersize=100),
-        mpf.make_addplot(sell_signals, type='scatter', marker='v', color='red', markersize=100)
-    ]
-
-
-    mpf.plot(df, type='candle', style='yahoo', addplot=apds, volume=True,
-             title="Candlestick Chart with Trades", xlim=(df.index[0], df.index[-1]))
+    buy_pos, sell_pos = trade_markers(df.index, trades)
+
+    if max_candles is None:
+        max_candles = max(1, int(figsize[0] * dpi / PIXELS_PER_CANDLE))
+    df, step = downsample_ohlc(df, max_candles)
+
+    buy_signals = np.full(len(df), np.nan)
+    sell_signals = np.full(len(df), np.nan)
+    buy_pos, sell_pos = buy_pos // step, sell_pos // step
+    buy_signals[buy_pos] = df['Low'].to_numpy()[buy_pos] * 0.98
+    sell_signals[sell_pos] = df['High'].to_numpy()[sell_pos] * 1.02
+
+    title = "Candlestick Chart with Trades"
+    volume = 'Volume' in df.columns
+    price_ax = volume_ax = None
+    if save_path is not None:
+        # Drawn on the axes of a bare Figure (mplfinance's external axes mode), so pyplot never holds the figure
+        fig = _new_figure(save_path, figsize, dpi)
+        if volume:
+            price_ax, volume_ax = fig.subplots(2, 1, sharex=True, gridspec_kw={'height_ratios': [3, 1]})
+        else:
+            price_ax = fig.subplots()
+
+    apds = []
+    # mplfinance refuses an addplot without any value
+    if len(buy_pos):
+        apds.append(mpf.make_addplot(buy_signals, type='scatter', marker='^', color='green', markersize=100,
+                                     ax=price_ax))
+    if len(sell_pos):
+        apds.append(mpf.make_addplot(sell_signals, type='scatter', marker='v', color='red', markersize=100,
+                                     ax=price_ax))
+
+    kwargs = dict(type='candle', style='yahoo', addplot=apds, xlim=(df.index[0], df.index[-1]))
+    if save_path is None:
+        mpf.plot(df, volume=volume, title=title, figsize=figsize, **kwargs)
+        return None
+    mpf.plot(df, ax=price_ax, volume=volume_ax if volume else False, **kwargs)
+    price_ax.set_title(title)
+    return _finish(fig, save_path)
+
+
+def save_sweep_report(sweep, out_dir: str, fmt: str = 'png', max_points=None, figsize=FIGSIZE, dpi=DPI) -> list:
+    '''
+    Writes one equity chart per row of a parameter sweep run with return_curves=True (a DataFrame or list of
+    dicts with an 'equity_curve' column) to out_dir, named after the row's parameters. Returns the file paths.
+    '''
+    rows = sweep.to_dict('records') if isinstance(sweep, pd.DataFrame) else list(sweep)
+    if rows and 'equity_curve' not in rows[0]:
+        raise ValueError("save_sweep_report() needs the equity curves, run the sweep with return_curves=True")
+    os.makedirs(out_dir, exist_ok=True)
+
+    paths = []
+    for i, row in enumerate(rows):
+        params = {key: value for key, value in row.items()
+                  if key not in SWEEP_METRICS and not isinstance(value, (np.ndarray, pd.Series, list))}
+        label = '_'.join(f"{key}={value}" for key, value in params.items()) or f"run{i}"
+        path = os.path.join(out_dir, f"{i:04d}_{label}.{fmt}")
+        curve = row['equity_curve']
+        plot_equity_curve(getattr(curve, 'index', None), curve, max_points=max_points, save_path=path,
+                          figsize=figsize, dpi=dpi, title=label)
+        paths.append(path)
+    return paths
@@ -0,0 +1,215 @@
+# backtester/walk_forward.py
+# Author: Krittin Hirunchupong
+
+'''
+walk_forward.py
+    This module runs a walk-forward optimization: the history is cut into folds of (train, test) windows,
+    the best parameter set of every train window is picked from a grid and then traded on the test window that follows,
+    and the test windows are stitched into one out-of-sample equity curve.
+
+    Nothing is recomputed per fold. The data is converted to Bars once, every indicator is computed once over the
+    full history (Strategy.indicator_array() caches it on the Bars, so parameter sets sharing a window share the
+    array) and every parameter set's target positions are generated once with generate_signals().
+    A fold only slices those arrays and runs simulate_positions() on the slice, so folds are cheap and run in parallel.
+    With worker processes the close prices and signals are copied once into shared memory (like run_sweep() does
+    with the data), so they are never pickled to the workers.
+    Because indicators come from the full history, a test window starts with its indicators already warmed up
+    (no bars are lost to warm-up at the start of every window), and it starts flat and ends flat.
+    Only strategies that implement generate_signals() can be used.
+
+    Example:
+        result = walk_forward(SmaCrossover, df, {'short_window': [10, 20], 'long_window': [50, 100]},
+                              train_size=500, test_size=100, n_jobs=4)
+        result['equity_curve'], result['folds']
+'''
+
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+
+from backtester.core.bars import Bars
+from backtester.core.broker import Broker
+from backtester.core.vectorized import simulate_positions
+from backtester.sweep import iter_param_grid, summarize_results
+
+METRICS = ('sharpe', 'total_return', 'max_drawdown', 'final_equity', 'win_rate')
+
+_worker = {}  # Per process state: close prices, every parameter set's signals and the run settings
+
+
+def make_folds(n: int, train_size: int, test_size: int, step: int = None, anchored: bool = False):
+    """
+    Returns the folds as a list of ((train_start, train_end), (test_start, test_end)) bar ranges, end exclusive.
+    Every test window starts where its train window ends. step defaults to test_size, so test windows don't overlap.
+    anchored=True keeps every train window starting at bar 0 (expanding window).
+    """
+    if train_size < 2 or test_size < 1:
+        raise ValueError("train_size must be at least 2 and test_size at least 1")
+    step = test_size if step is None else step
+    if step < 1:
+        raise ValueError("step must be at least 1")
+
+    folds = []
+    start = 0
+    while start + train_size < n:
+        train_end = start + train_size
+        test_end = min(train_end + test_size, n)
+        folds.append(((0 if anchored else start, train_end), (train_end, test_end)))
+        start += step
+    return folds
+
+
+def _simulate(k, start, end):
+    # One parameter set on bars [start, end), flattened on the last bar like the engine does
+    settings = _worker['settings']
+    positions = _worker['positions'][k][start:end].copy()
+    positions[-1] = 0
+    exits = _worker['exits'][k]
+    exits = exits[start:end] if exits is not None else None
+    sim = simulate_positions(_worker['close'][start:end], positions, exits=exits,
+                             initial_cash=settings['initial_cash'], commission=settings['commission'])
+    sim['final_equity'] = sim['equity_curve'][-1]
+    return sim
+
+
+def _score(sim):
+    metric = _worker['settings']['metric']
+    if callable(metric):
+        return float(metric(sim['equity_curve']))
+    return summarize_results(sim, freq=_worker['settings']['freq'])[metric]
+
+
+def _run_fold(fold):
+    (train_start, train_end), (test_start, test_end) = fold
+    scores = [_score(_simulate(k, train_start, train_end)) for k in range(len(_worker['positions']))]
+    best = int(np.nanargmax(scores)) if not np.all(np.isnan(scores)) else 0
+
+    sim = _simulate(best, test_start, test_end)
+    return best, scores[best], sim['equity_curve'], summarize_results(sim, freq=_worker['settings']['freq'])
+
+
+def _init_worker(close, positions, exits, settings):
+    _worker.update(close=close, positions=positions, exits=exits, settings=settings)
+
+
+def _share_signals(close, positions, exits):
+    # One shared memory block: close and every set's positions as float64 rows, then the exits as bool rows
+    n, k = len(close), len(positions)
+    with_exits = [i for i, signal_exits in enumerate(exits) if signal_exits is not None]
+    float_bytes = (1 + k) * n * 8
+    shm = SharedMemory(create=True, size=max(1, float_bytes + len(with_exits) * n))
+    values = np.ndarray((1 + k, n), dtype=np.float64, buffer=shm.buf)
+    values[0] = close
+    values[1:] = positions
+    flags = np.ndarray((len(with_exits), n), dtype=bool, buffer=shm.buf, offset=float_bytes)
+    for row, i in enumerate(with_exits):
+        flags[row] = exits[i]
+    return shm, (shm.name, n, k, with_exits)
+
+
+def _attach_worker(layout, settings):
+    shm_name, n, k, with_exits = layout
+    if sys.version_info >= (3, 13):
+        shm = SharedMemory(name=shm_name, track=False)
+    else:
+        shm = SharedMemory(name=shm_name)
+    values = np.ndarray((1 + k, n), dtype=np.float64, buffer=shm.buf)
+    flags = np.ndarray((len(with_exits), n), dtype=bool, buffer=shm.buf, offset=(1 + k) * n * 8)
+    exits = [None] * k
+    for row, i in enumerate(with_exits):
+        exits[i] = flags[row]
+    _init_worker(values[0], values[1:], exits, settings)
+    _worker['shm'] = shm  # Keeps the views valid for the life of the worker
+
+
+def walk_forward(strategy_class, data, param_grid, train_size: int, test_size: int, step: int = None,
+                 anchored: bool = False, folds=None, metric='sharpe', n_jobs=1,
+                 initial_cash=100_000, commission=0.001, freq=252):
+    """
+    Runs a walk-forward optimization of strategy_class over param_grid (a dict of lists or an iterable of dicts,
+    like run_sweep()).
+
+    folds can be given explicitly as ((train_start, train_end), (test_start, test_end)) bar ranges, otherwise they
+    are built from train_size, test_size, step and anchored (see make_folds()).
+    metric is the train window score to maximize: one of METRICS or a callable taking the equity curve array.
+    n_jobs is the number of worker processes for the folds (None or -1 uses every core, 1 runs in this process).
+
+    Returns a dict with:
+        'equity_curve'  out-of-sample equity as a Series over the test bars. Each test window starts from the
+                        previous one's final equity, and is flat at the end of its window.
+        'folds'         DataFrame with one row per fold: its bar ranges and dates, the chosen params,
+                        the train score and the test sharpe/max_drawdown/total_return/num_trades
+    """
+    if not callable(metric) and metric not in METRICS:
+        raise ValueError(f"Invalid metric '{metric}'. Must be one of {METRICS} or a callable")
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+
+    bars = data if isinstance(data, Bars) else Bars.from_dataframe(data)
+    if folds is None:
+        folds = make_folds(len(bars), train_size, test_size, step, anchored)
+    if not folds:
+        raise ValueError("Not enough bars for a single fold")
+    if any(folds[i][1][0] < folds[i - 1][1][1] for i in range(1, len(folds))):
+        raise ValueError("Test windows must not overlap to be stitched, use step >= test_size")
+
+    # Signals of every parameter set over the full history, indicators are shared through bars.indicator_cache
+    params_list = list(iter_param_grid(param_grid))
+    if not params_list:
+        raise ValueError("param_grid is empty")
+    positions, exits = [], []
+    for params in params_list:
+        strategy = strategy_class(data, Broker(initial_cash=initial_cash, commission=commission), **params)
+        strategy.set_bars(bars)
+        signals = strategy.generate_signals(bars)
+        signal_positions, signal_exits = signals if isinstance(signals, tuple) else (signals, None)
+        positions.append(np.asarray(signal_positions, dtype=float))
+        exits.append(None if signal_exits is None else np.asarray(signal_exits, dtype=bool))
+
+    close = np.asarray(bars['Close'], dtype=float)
+    settings = {'initial_cash': initial_cash, 'commission': commission, 'metric': metric, 'freq': freq}
+
+    if n_jobs == 1 or len(folds) == 1:
+        _init_worker(close, positions, exits, settings)
+        try:
+            fold_results = [_run_fold(fold) for fold in folds]
+        finally:
+            _worker.clear()
+    else:
+        shm, layout = _share_signals(close, positions, exits)
+        try:
+            with ProcessPoolExecutor(min(n_jobs, len(folds)), initializer=_attach_worker,
+                                     initargs=(layout, settings)) as pool:
+                fold_results = list(pool.map(_run_fold, folds))
+        finally:
+            shm.close()
+            shm.unlink()
+
+    # Stitch the test windows, PnL doesn't depend on the starting cash so each curve is shifted to chain on
+    curves, rows = [], []
+    equity = initial_cash
+    for i, (fold, (best, score, curve, test_metrics)) in enumerate(zip(folds, fold_results)):
+        (train_start, train_end), (test_start, test_end) = fold
+        curves.append(curve - initial_cash + equity)
+        equity = curves[-1][-1]
+        rows.append({
+            'fold': i,
+            'train_start': bars.index[train_start],
+            'train_end': bars.index[train_end - 1],
+            'test_start': bars.index[test_start],
+            'test_end': bars.index[test_end - 1],
+            'params': params_list[best],
+            'train_score': score,
+            'test_sharpe': test_metrics['sharpe'],
+            'test_max_drawdown': test_metrics['max_drawdown'],
+            'test_total_return': test_metrics['total_return'],
+            'test_num_trades': test_metrics['num_trades'],
+        })
+
+    test_idx = np.concatenate([np.arange(start, end) for _, (start, end) in folds])
+    equity_curve = pd.Series(np.concatenate(curves), index=bars.index[test_idx], name='equity')
+    return {'equity_curve': equity_curve, 'folds': pd.DataFrame(rows), 'final_equity': float(equity)}
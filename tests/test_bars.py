@@ -0,0 +1,77 @@
+# tests/test_bars.py
+# Author: Krittin Hirunchupong
+
+'''
+test_bars.py
+    Bars/Panel hold the columns as NumPy arrays, and get_price()/get_lookback() read the same values as DataFrame.iloc.
+'''
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester.benchmarks.synthetic import gbm_ohlcv
+from backtester.core.bars import Bars, Panel
+from backtester.core.broker import Broker
+from backtester.core.engine import BacktestEngine
+from backtester.core.strategy import Strategy
+
+WINDOW = 7
+
+
+class Recorder(Strategy):
+    # Keeps what get_price()/get_lookback() returned on every bar
+    def __init__(self, data, broker):
+        super().__init__(data, broker)
+        self.prices = []
+        self.lookbacks = []
+
+    def on_data(self, timestamp=None):
+        self.prices.append(self.get_price('Close'))
+        self.lookbacks.append(self.get_lookback('High', window=WINDOW))
+
+
+@pytest.fixture(scope='module')
+def data():
+    return gbm_ohlcv(300, seed=2)
+
+
+def test_from_dataframe(data):
+    df = data.assign(Volume=data['Volume'].astype(np.int64), Symbol='SPY')
+    bars = Bars.from_dataframe(df)
+    assert list(bars.keys()) == ['Open', 'High', 'Low', 'Close', 'Volume']
+    assert 'Symbol' not in bars and len(bars) == len(df)
+    assert np.shares_memory(bars['Close'], df['Close'].to_numpy())  # Float64 columns are not copied
+    assert bars['Volume'].dtype == np.float64
+    assert all(values.flags.c_contiguous for values in bars.columns.values())
+    pd.testing.assert_frame_equal(bars.to_dataframe(), df.drop(columns='Symbol').astype(float))
+
+    with pytest.raises(ValueError, match="'Close' has 3 rows"):
+        Bars(df.index[:4], {'Close': [1.0, 2.0, 3.0]})
+
+
+def test_price_and_lookback_match_iloc(data):
+    engine = BacktestEngine(Recorder, data, Broker())
+    engine.run()
+    strategy = engine.strategy
+    assert len(strategy.prices) == len(data)
+    for i, (price, lookback) in enumerate(zip(strategy.prices, strategy.lookbacks)):
+        assert price == data['Close'].iloc[i]
+        np.testing.assert_array_equal(lookback, data['High'].iloc[max(0, i - WINDOW + 1):i + 1])
+        assert np.shares_memory(lookback, strategy.bars['High'])
+
+
+def test_panel_alignment():
+    a = pd.DataFrame({'Close': [1.0, 2.0, 3.0], 'Volume': [10.0, 20.0, 30.0]},
+                     index=pd.to_datetime(['2024-01-01', '2024-01-02', '2024-01-04']))
+    b = pd.DataFrame({'Close': [5.0, 6.0], 'Volume': [1.0, 2.0]},
+                     index=pd.to_datetime(['2024-01-02', '2024-01-03']))
+    panel = Panel.from_frames({'A': a, 'B': b})
+    assert panel.symbols == ['A', 'B'] and len(panel) == 4
+    np.testing.assert_array_equal(panel['Close'], [[1, np.nan], [2, 5], [2, 6], [3, 6]])
+    np.testing.assert_array_equal(panel['Volume'], [[10, 0], [20, 1], [0, 2], [30, 0]])
+    assert np.shares_memory(panel['Close'][1], panel['Close'])  # A row is every symbol at one bar
+
+    single = panel.symbol('B')
+    np.testing.assert_array_equal(single['Close'], [np.nan, 5, 6, 6])
+    assert single['Close'].flags.c_contiguous
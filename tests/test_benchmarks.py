@@ -0,0 +1,59 @@
+# tests/test_benchmarks.py
+# Author: Krittin Hirunchupong
+
+'''
+test_benchmarks.py
+    Smoke run of the benchmark suite on a few hundred bars, the baseline comparison and the synthetic data.
+'''
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester.benchmarks.__main__ import main
+from backtester.benchmarks.suite import BENCHMARKS, compare_to_baseline, load_baseline, run_benchmarks, save_baseline
+from backtester.benchmarks.synthetic import gbm_ohlcv, regime_switching_ohlcv
+from backtester.indicators.cache import get_indicator_cache
+
+
+def test_every_benchmark_runs():
+    pytest.importorskip('matplotlib')
+    cache = get_indicator_cache()
+    rows = run_benchmarks(sizes=(300,), data='regime', repeat=1)
+    assert [row['name'] for row in rows] == list(BENCHMARKS)
+    for row in rows:
+        assert row['bars'] == 300 and row['seconds'] > 0 and row['peak_memory_bytes'] > 0
+    assert get_indicator_cache() is cache  # Turned back on afterwards
+
+    with pytest.raises(ValueError, match='Unknown benchmarks'):
+        run_benchmarks(names=['nope'])
+
+
+def test_baseline_comparison(tmp_path):
+    rows = run_benchmarks(sizes=(200,), names=['sma_crossover', 'broker_many_lots'], repeat=1, measure_memory=False)
+    path = str(tmp_path / 'baseline.json')
+    save_baseline(rows, path)
+    assert load_baseline(path) == rows
+
+    slower = [dict(row, bars_per_sec=row['bars_per_sec'] * 0.5, peak_memory_bytes=50_000_000) for row in rows]
+    baseline = [dict(row, peak_memory_bytes=10_000_000) for row in rows]
+    flagged = compare_to_baseline(slower, baseline)
+    assert all(row['regression'] for row in flagged)
+    assert flagged[0]['reason'] == '50% slower, 400% more memory'
+    assert not any(row['regression'] for row in compare_to_baseline([dict(row) for row in rows], path))
+
+    # The command line: save a baseline, then compare to it with a tolerance nothing can miss
+    argv = ['--sizes', '200', '--only', 'sma_crossover', '--repeat', '1', '--no-memory']
+    assert main(argv + ['--save', path]) == 0
+    assert main(argv + ['--compare', path, '--tolerance', '0.99']) == 0
+
+
+def test_synthetic_data():
+    df = gbm_ohlcv(1000, seed=3)
+    pd.testing.assert_frame_equal(df, gbm_ohlcv(1000, seed=3))
+    assert (df['High'] >= df[['Open', 'Close']].max(axis=1)).all()
+    assert (df['Low'] <= df[['Open', 'Close']].min(axis=1)).all()
+
+    df, regimes = regime_switching_ohlcv(5000, seed=3, return_regimes=True)
+    assert len(df) == len(regimes) == 5000
+    assert set(np.unique(regimes)) == {0, 1, 2}
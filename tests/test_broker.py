@@ -0,0 +1,66 @@
+# tests/test_broker.py
+# Author: Krittin Hirunchupong
+
+'''
+test_broker.py
+    The broker's running totals (net position, cost basis, realized and unrealized PnL) equal the sums over the
+    open trades and the trade log after any sequence of orders.
+'''
+
+import numpy as np
+import pytest
+
+from backtester.core.broker import Broker
+
+
+def per_lot(broker):
+    # The totals recomputed from scratch over the open trades
+    direction = {'buy': 1, 'sell': -1}
+    net_position = sum(direction[t['side']] * t['qty'] for t in broker.open_trades.values())
+    cost_basis = sum(direction[t['side']] * t['qty'] * t['price'] for t in broker.open_trades.values())
+    unrealized = sum((broker.current_price - t['price']) * t['qty'] * direction[t['side']]
+                     for t in broker.open_trades.values())
+    return net_position, cost_basis, unrealized
+
+
+def test_running_totals_match_per_lot_sums():
+    rng = np.random.default_rng(4)
+    broker = Broker()
+    price = 100.0
+    for step in range(3000):
+        price *= np.exp(rng.normal(0, 0.01))
+        broker.update_price(price)
+        if broker.open_trades and rng.random() < 0.45:
+            trade_id = rng.choice(list(broker.open_trades))
+            broker.close_trade(int(trade_id), price=price, timestamp=step)
+        else:
+            qty = float(rng.integers(1, 5)) if rng.random() < 0.7 else round(rng.random(), 3) + 0.001
+            broker.execute_order(qty=qty, side=rng.choice(['buy', 'sell']), price=price, timestamp=step)
+        if step % 500 == 0:
+            broker.close_all_trades(price=price, timestamp=step)
+
+        net_position, cost_basis, unrealized = per_lot(broker)
+        assert broker.net_position == pytest.approx(net_position, abs=1e-9)
+        assert broker.cost_basis == pytest.approx(cost_basis, rel=1e-9, abs=1e-6)
+        assert broker.get_unrealized_pnl() == pytest.approx(unrealized, rel=1e-9, abs=1e-6)
+        assert broker.realized_pnl == pytest.approx(broker.trade_log.closed_pnl.sum(), rel=1e-9, abs=1e-6)
+
+    assert broker.trade_log.num_closed() > 1000
+    assert broker.get_equity() == pytest.approx(broker.cash + unrealized, rel=1e-12)
+
+
+def test_flat_book_resets_the_totals():
+    broker = Broker(commission=0.0)
+    broker.update_price(10.0)
+    ids = [broker.execute_order(qty=0.1, side='buy', price=10.0 + i / 3) for i in range(3)]
+    for trade_id in ids:
+        broker.close_trade(trade_id, price=11.0)
+    # No float residue left over from adding and removing the lots
+    assert broker.net_position == 0 and broker.cost_basis == 0.0
+    assert broker.get_unrealized_pnl() == 0.0
+    assert broker.cash == pytest.approx(100_000 + broker.realized_pnl)
+
+    with pytest.raises(ValueError):
+        broker.close_trade(ids[0])
+    with pytest.raises(ValueError):
+        broker.execute_order(side='hold', price=10.0)
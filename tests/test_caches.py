@@ -0,0 +1,108 @@
+# tests/test_caches.py
+# Author: Krittin Hirunchupong
+
+'''
+test_caches.py
+    Data modified in place must never get the indicators or results of its old values.
+'''
+
+import numpy as np
+import pytest
+
+from backtester import run_backtest
+from backtester.benchmarks.synthetic import gbm_ohlcv
+from backtester.core.bars import Bars
+from backtester.core.result_cache import ResultCache
+from backtester.indicators.cache import IndicatorCache, get_indicator_cache, set_indicator_cache
+from backtester.strategies.sma_crossover import SmaCrossover
+
+
+@pytest.fixture
+def indicator_cache():
+    cache = IndicatorCache()
+    previous = set_indicator_cache(cache)
+    yield cache
+    set_indicator_cache(previous)
+
+
+def _edit_in_place(df, rows):
+    # Halves Close on 'rows', writing into the frame's own buffer
+    close = df['Close'].to_numpy()
+    address = close.__array_interface__['data'][0]
+    df.iloc[rows, df.columns.get_loc('Close')] = close[rows] * 0.5
+    assert df['Close'].to_numpy().__array_interface__['data'][0] == address
+
+
+def test_indicator_cache_is_off_by_default():
+    assert get_indicator_cache() is None
+
+
+def test_indicator_cache_after_in_place_edit(indicator_cache):
+    df = gbm_ohlcv(20_000, seed=2)
+    run_backtest(SmaCrossover, df, mode='vectorized')
+    assert indicator_cache.misses == 2
+
+    run_backtest(SmaCrossover, df, mode='vectorized')
+    assert indicator_cache.misses == 2  # Same data, the SMAs come from the cache
+
+    _edit_in_place(df, np.arange(10_001, 19_999, 2))
+    vectorized = run_backtest(SmaCrossover, df, mode='vectorized')
+    event = run_backtest(SmaCrossover, df)
+    assert indicator_cache.misses == 4
+    assert vectorized['final_equity'] == pytest.approx(event['final_equity'], rel=1e-12)
+    np.testing.assert_allclose(vectorized['equity_curve'], event['equity_curve'], rtol=1e-12)
+
+
+def test_result_cache_after_in_place_edit(tmp_path):
+    cache = ResultCache(cache_dir=str(tmp_path))
+    df = gbm_ohlcv(20_000, seed=3)
+    first = run_backtest(SmaCrossover, df, mode='vectorized', cache=cache)
+    run_backtest(SmaCrossover, df, mode='vectorized', cache=cache)
+    assert (cache.hits, len(cache)) == (1, 1)
+
+    # One row of the same object
+    _edit_in_place(df, [12_345])
+    result = run_backtest(SmaCrossover, df, mode='vectorized', cache=cache)
+    assert (cache.hits, len(cache)) == (1, 2)
+    assert result['final_equity'] != first['final_equity']
+    assert result['final_equity'] == run_backtest(SmaCrossover, df, mode='vectorized')['final_equity']
+
+    # A copy has the same content
+    run_backtest(SmaCrossover, df.copy(), mode='vectorized', cache=cache)
+    assert (cache.hits, len(cache)) == (2, 2)
+
+
+def test_result_cache_only_touches_its_own_entries(tmp_path):
+    # E.g. the market data cache's <interval>/<ticker>.pkl files in a shared directory
+    foreign = [tmp_path / '1d' / 'SPY.pkl', tmp_path / 'ab' / 'notes.pkl', tmp_path / 'top.pkl']
+    for path in foreign:
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(b'x' * 100)
+
+    cache = ResultCache(cache_dir=str(tmp_path), max_bytes=0)
+    run_backtest(SmaCrossover, gbm_ohlcv(500, seed=0), cache=cache)
+    assert len(cache) == 0  # Evicted right away under max_bytes=0
+    cache.put('ab' + '0' * 38, {'results': None})
+    cache.clear()
+    assert all(path.exists() for path in foreign)
+
+
+def test_indicator_cache_disk_tier_only_touches_its_own_files(tmp_path):
+    foreign = [tmp_path / 'prices.npy', tmp_path / 'ab' / 'weights.npy', tmp_path / 'results' / 'x.npy']
+    for path in foreign:
+        path.parent.mkdir(exist_ok=True)
+        np.save(path, np.zeros(1000))
+
+    cache = IndicatorCache(cache_dir=str(tmp_path), max_disk_bytes=0)
+    previous = set_indicator_cache(cache)
+    try:
+        run_backtest(SmaCrossover, gbm_ohlcv(500, seed=0), mode='vectorized')
+    finally:
+        set_indicator_cache(previous)
+    assert cache.disk_bytes() == 0  # Its own arrays are evicted right away under max_disk_bytes=0
+    cache.max_disk_bytes = 10_000_000
+    cache.get_or_compute('fingerprint', Bars.from_dataframe(gbm_ohlcv(500, seed=0)), 'sma', window=5)
+    assert cache.disk_bytes() > 0
+    cache.clear(disk=True)
+    assert cache.disk_bytes() == 0
+    assert all(path.exists() for path in foreign)
@@ -0,0 +1,84 @@
+# tests/test_checkpoint.py
+# Author: Krittin Hirunchupong
+
+'''
+test_checkpoint.py
+    A run resumed from a checkpoint on appended bars must give the same results as a full run on the longer data.
+'''
+
+import numpy as np
+import pytest
+
+from backtester.benchmarks.synthetic import gbm_ohlcv
+from backtester.core.broker import Broker
+from backtester.core.engine import BacktestEngine
+from backtester.strategies.mean_reversion import MeanReversion
+from backtester.strategies.sma_crossover import SmaCrossover
+
+
+class Killed(Exception):
+    pass
+
+
+class KilledOnce(MeanReversion):
+    # Stands for a run killed on bar 2222 (the checkpoint pickles the strategy, so it lives at module level)
+    kill = True
+
+    def on_data(self, timestamp=None):
+        if self.current_index == 2222 and KilledOnce.kill:
+            raise Killed
+        super().on_data(timestamp)
+
+
+@pytest.fixture(scope='module')
+def data():
+    return gbm_ohlcv(4000, seed=6)
+
+
+def _assert_same(resumed, full):
+    np.testing.assert_array_equal(resumed['equity_curve'], full['equity_curve'])
+    np.testing.assert_array_equal(resumed['pnl_curve'], full['pnl_curve'])
+    assert (resumed['timestamps'] == full['timestamps']).all()
+    assert list(resumed['trade_log']) == list(full['trade_log'])
+    assert resumed['metrics'] == full['metrics']
+    assert resumed['final_equity'] == full['final_equity']
+
+
+@pytest.mark.parametrize('strategy_class, kwargs', [(SmaCrossover, {}), (MeanReversion, {'window': 30})])
+@pytest.mark.parametrize('curve_step', [1, 7])
+def test_resume_on_appended_bars(tmp_path, data, strategy_class, kwargs, curve_step):
+    path = str(tmp_path / 'run.ckpt')
+    full = BacktestEngine(strategy_class, data, Broker(), curve_step=curve_step, **kwargs)
+    full.run()
+
+    first = BacktestEngine(strategy_class, data.iloc[:2500], Broker(), curve_step=curve_step, **kwargs)
+    first.run(checkpoint_path=path)
+    second = BacktestEngine.resume(path, data.iloc[:3203])
+    second.run(checkpoint_path=path)
+    last = BacktestEngine.resume(path, data)
+    assert last.start_bar == 3202
+    last.run()
+    _assert_same(last.get_results(), full.get_results())
+
+
+def test_resume_after_a_killed_run(tmp_path, data, monkeypatch):
+    path = str(tmp_path / 'run.ckpt')
+    with pytest.raises(Killed):
+        BacktestEngine(KilledOnce, data, Broker()).run(checkpoint_path=path, checkpoint_every=1000)
+    monkeypatch.setattr(KilledOnce, 'kill', False)
+
+    engine = BacktestEngine.resume(path, data)
+    assert engine.start_bar == 2000
+    engine.run()
+    full = BacktestEngine(KilledOnce, data, Broker())
+    full.run()
+    _assert_same(engine.get_results(), full.get_results())
+
+
+def test_resume_rejects_other_data(tmp_path, data):
+    path = str(tmp_path / 'run.ckpt')
+    BacktestEngine(SmaCrossover, data.iloc[:1000], Broker()).run(checkpoint_path=path)
+    with pytest.raises(ValueError):
+        BacktestEngine.resume(path, data.iloc[1:])
+    with pytest.raises(ValueError):
+        BacktestEngine.resume(path, data.iloc[:500])
@@ -0,0 +1,80 @@
+# tests/test_cli.py
+# Author: Krittin Hirunchupong
+
+'''
+test_cli.py
+    python -m backtester: parameters, strategy lookup and a run on a CSV written to a temporary directory.
+'''
+
+import json
+import sys
+import types
+
+import pytest
+
+from backtester import run_backtest
+from backtester.__main__ import STRATEGIES, load_strategy, main, parse_params
+from backtester.benchmarks.synthetic import gbm_ohlcv
+from backtester.core.strategy import Strategy
+from backtester.strategies.sma_crossover import SmaCrossover
+
+
+class Broken(Strategy):
+    def on_data(self, timestamp=None):
+        self.brokr.execute_order()  # A typo in the strategy's own code
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    df = gbm_ohlcv(400, seed=3)
+    df.index.name = 'Date'
+    path = tmp_path / 'prices.csv'
+    df.to_csv(path)
+    return str(path)
+
+
+def test_parse_params():
+    assert parse_params(['window=20', 'threshold=0.02', 'name=abc', 'flag=true']) == \
+        {'window': 20, 'threshold': 0.02, 'name': 'abc', 'flag': True}
+    assert parse_params(None) == {}
+    with pytest.raises(ValueError):
+        parse_params(['window'])
+
+
+def test_load_strategy():
+    assert load_strategy('sma_crossover') is SmaCrossover
+    assert load_strategy(STRATEGIES['sma_crossover']) is SmaCrossover
+    with pytest.raises(ValueError):
+        load_strategy('no_such_strategy')
+    with pytest.raises(ValueError):
+        load_strategy('backtester.strategies.sma_crossover:NoSuchClass')
+    with pytest.raises(ImportError):
+        load_strategy('no_such_package.module:Strategy')
+
+
+def test_run_on_a_csv(csv_path, tmp_path):
+    output = str(tmp_path / 'result.json')
+    assert main(['sma_crossover', '--csv', csv_path, '-p', 'short_window=5', '-p', 'long_window=20',
+                 '--curves', '--trades', '-o', output]) == 0
+    with open(output) as f:
+        report = json.load(f)
+
+    from backtester.core.data_handler import DataHandler
+    results = run_backtest(SmaCrossover, DataHandler().from_csv(csv_path), short_window=5, long_window=20)
+    assert report['bars'] == 400
+    assert report['params'] == {'short_window': 5, 'long_window': 20}
+    assert report['final_equity'] == pytest.approx(results['final_equity'])
+    assert report['num_trades'] == results['trade_log'].num_closed()
+    assert len(report['trades']) == len(results['trade_log'])
+    assert len(report['equity_curve']) == 400
+
+
+def test_errors(csv_path, capsys, monkeypatch):
+    assert main(['no_such_strategy', '--csv', csv_path]) == 2
+    assert capsys.readouterr().err.startswith('error:')
+
+    module = types.ModuleType('broken_strategies')
+    module.Broken = Broken
+    monkeypatch.setitem(sys.modules, 'broken_strategies', module)
+    with pytest.raises(AttributeError):
+        main(['broken_strategies:Broken', '--csv', csv_path])
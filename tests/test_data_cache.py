@@ -0,0 +1,81 @@
+# tests/test_data_cache.py
+# Author: Krittin Hirunchupong
+
+'''
+test_data_cache.py
+    MarketDataCache fetches every date range once, including ranges without any bars.
+'''
+
+import time
+
+import pandas as pd
+import pytest
+
+from backtester.core.data_cache import MarketDataCache, missing_ranges
+
+
+class FakeFetcher:
+    # Daily bars on weekdays of 2023 only, like a ticker listed that year
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, ticker, start, end, interval):
+        self.calls.append((start, end))
+        index = pd.bdate_range(max(start, pd.Timestamp('2023-01-01')), end, inclusive='left', name='Date')
+        index = index[index < pd.Timestamp('2024-01-01')]
+        return pd.DataFrame({'Close': range(len(index))}, index=index, dtype=float)
+
+
+def test_fetches_only_missing_ranges(tmp_path):
+    fetcher = FakeFetcher()
+    cache = MarketDataCache(str(tmp_path), fetcher=fetcher)
+    first = cache.get('SPY', '2023-01-01', '2023-03-01')
+    second = cache.get('SPY', '2023-02-01', '2023-04-01')
+    assert fetcher.calls == [(pd.Timestamp('2023-01-01'), pd.Timestamp('2023-03-01')),
+                             (pd.Timestamp('2023-03-01'), pd.Timestamp('2023-04-01'))]
+    assert first.index[0] == pd.Timestamp('2023-01-02')
+    assert second.index[0] == pd.Timestamp('2023-02-01')
+    assert second.index[-1] == pd.Timestamp('2023-03-31')
+
+
+def test_empty_fetch_is_recorded(tmp_path):
+    fetcher = FakeFetcher()
+    cache = MarketDataCache(str(tmp_path), fetcher=fetcher)
+    assert cache.get('SPY', '2022-01-01', '2022-06-01').empty
+    assert cache.is_cached('SPY', '2022-01-01', '2022-06-01')
+    assert cache.get('SPY', '2022-01-01', '2022-06-01').empty
+    assert len(fetcher.calls) == 1
+
+    # Both sides of the listing date: only the new part is fetched
+    df = cache.get('SPY', '2022-03-01', '2023-02-01')
+    assert len(fetcher.calls) == 2
+    assert df.index[0] == pd.Timestamp('2023-01-02')
+
+    offline = MarketDataCache(str(tmp_path), offline=True)
+    assert offline.get('SPY', '2022-01-01', '2022-06-01').empty
+
+
+def test_offline_without_data(tmp_path):
+    with pytest.raises(ValueError):
+        MarketDataCache(str(tmp_path), offline=True).get('SPY', '2023-01-01', '2023-02-01')
+
+
+def test_missing_ranges():
+    assert missing_ranges([[2, 4], [6, 8]], 0, 10) == [(0, 2), (4, 6), (8, 10)]
+    assert missing_ranges([[0, 10]], 2, 5) == []
+
+
+def test_fetched_ranges_stop_at_utc_now(tmp_path, monkeypatch):
+    # The local clock is 14 hours ahead of UTC: the recent bars are still marked as not fetched
+    monkeypatch.setenv('TZ', 'Pacific/Kiritimati')
+    time.tzset()
+    try:
+        cache = MarketDataCache(str(tmp_path), fetcher=lambda *args: pd.DataFrame())
+        before = pd.Timestamp.now(tz='UTC').tz_localize(None)
+        cache.get('SPY', before - pd.Timedelta(days=2), before + pd.Timedelta(days=2), interval='1h')
+        after = pd.Timestamp.now(tz='UTC').tz_localize(None)
+        (_, end), = cache._read_ranges('SPY', '1h')
+        assert before <= end <= after
+    finally:
+        monkeypatch.undo()
+        time.tzset()
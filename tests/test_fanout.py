@@ -0,0 +1,65 @@
+# tests/test_fanout.py
+# Author: Krittin Hirunchupong
+
+'''
+test_fanout.py
+    Every instance of a FanOutEngine run ends up with the trades, curves and metrics of its own BacktestEngine run.
+'''
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester.benchmarks.synthetic import gbm_ohlcv
+from backtester.core.broker import Broker
+from backtester.core.engine import BacktestEngine
+from backtester.core.fanout import METRICS_BLOCK, FanOutEngine
+from backtester.strategies.mean_reversion import MeanReversion
+from backtester.strategies.sma_crossover import SmaCrossover
+
+INSTANCES = [
+    (SmaCrossover, {'short_window': 5, 'long_window': 20}),
+    (SmaCrossover, {'short_window': 10, 'long_window': 20}),
+    (SmaCrossover, {'short_window': 5, 'long_window': 50}),
+    (MeanReversion, {'window': 20, 'threshold': 0.005}),  # SMA('Close', 20) is shared with the crossovers
+    (MeanReversion, {'window': 20, 'threshold': 0.01, 'trailing_stop': 0.01}),  # Resting orders
+]
+
+
+@pytest.fixture(scope='module')
+def data():
+    return gbm_ohlcv(METRICS_BLOCK + 1500, seed=17)  # More than one block of metrics
+
+
+@pytest.mark.parametrize('curve_step', [1, 7])
+def test_instances_match_separate_runs(data, curve_step):
+    fanout = FanOutEngine(data, INSTANCES, commission=0.0005, curve_step=curve_step)
+    assert len(fanout) == 5 and len(fanout.pool) == 4  # SMA 5, 10, 20 and 50
+    fanout.run()
+
+    for (strategy_class, params), results in zip(INSTANCES, fanout.get_results()):
+        engine = BacktestEngine(strategy_class, data, Broker(commission=0.0005), curve_step=curve_step, **params)
+        engine.run()
+        expected = engine.get_results()
+        assert len(results['trade_log']) > 20
+        assert list(results['trade_log']) == list(expected['trade_log'])
+        np.testing.assert_array_equal(results['equity_curve'], expected['equity_curve'])
+        np.testing.assert_array_equal(results['pnl_curve'], expected['pnl_curve'])
+        pd.testing.assert_index_equal(pd.Index(results['timestamps']), pd.Index(expected['timestamps']))
+        assert results['final_equity'] == expected['final_equity']
+        for key, value in expected['metrics'].items():
+            assert results['metrics'][key] == pytest.approx(value, rel=1e-9, abs=1e-12), key
+
+
+def test_from_grid_and_summary(data):
+    grid = {'short_window': [5, 10], 'long_window': [30, 60]}
+    fanout = FanOutEngine.from_grid(SmaCrossover, data.iloc[:2000], grid, store_curve=False)
+    fanout.run()
+    summary = fanout.summary()
+    assert list(summary[['short_window', 'long_window']].itertuples(index=False, name=None)) == \
+        [(5, 30), (5, 60), (10, 30), (10, 60)]
+    assert (summary['strategy'] == 'SmaCrossover').all()
+    assert all(len(results['equity_curve']) == 0 for results in fanout.get_results())
+
+    with pytest.raises(ValueError):
+        FanOutEngine(data, [])
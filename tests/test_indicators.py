@@ -0,0 +1,76 @@
+# tests/test_indicators.py
+# Author: Krittin Hirunchupong
+
+'''
+test_indicators.py
+    The streaming indicators give the values of their batch versions (and of pandas) on every bar.
+'''
+
+import numpy as np
+import pytest
+
+from backtester.benchmarks.synthetic import gbm_ohlcv
+from backtester.core.bars import Bars
+from backtester.indicators import ATR, EMA, RSI, SMA, BollingerBands, IndicatorPool, RollingStd, ZScore
+from backtester.indicators import batch
+
+
+@pytest.fixture(scope='module')
+def bars():
+    return Bars.from_dataframe(gbm_ohlcv(2000, seed=9))
+
+
+def stream(indicator, bars, attribute='value'):
+    # Feeds every bar and keeps 'attribute', NaN while the indicator isn't ready
+    indicator.bind(bars)
+    out = np.full(len(bars), np.nan)
+    for i in range(len(bars)):
+        indicator.update_at(i)
+        if indicator.ready:
+            out[i] = getattr(indicator, attribute)
+    return out
+
+
+@pytest.mark.parametrize('indicator, name, params', [
+    (SMA('Close', 20), 'sma', {'window': 20}),
+    (SMA('High', 1), 'sma', {'window': 1}),
+    (EMA('Close', 10), 'ema', {'window': 10}),
+    (RollingStd('Close', 30), 'std', {'window': 30}),
+    (RollingStd('Close', 30, ddof=1), 'std', {'window': 30, 'ddof': 1}),
+    (ZScore('Close', 15), 'zscore', {'window': 15}),
+    (RSI('Close', 14), 'rsi', {'window': 14}),
+    (ATR(14), 'atr', {'window': 14}),
+])
+def test_streaming_matches_batch(bars, indicator, name, params):
+    expected = batch.compute(name, bars, indicator.column, **params)
+    np.testing.assert_allclose(stream(indicator, bars), expected, rtol=1e-9, atol=1e-9)
+    assert np.isnan(expected[:params['window'] - 1]).all()
+
+
+def test_against_pandas(bars):
+    close = bars.to_dataframe()['Close']
+    np.testing.assert_allclose(stream(SMA('Close', 25), bars), close.rolling(25).mean(), rtol=1e-10)
+    np.testing.assert_allclose(stream(RollingStd('Close', 25, ddof=1), bars), close.rolling(25).std(), rtol=1e-8)
+    np.testing.assert_allclose(stream(EMA('Close', 12), bars)[11:], close.ewm(span=12, adjust=False).mean()[11:],
+                               rtol=1e-10)
+
+    bands = BollingerBands('Close', 20, num_std=2.5)
+    upper = stream(bands, bars, 'upper')
+    np.testing.assert_allclose(upper, close.rolling(20).mean() + 2.5 * close.rolling(20).std(ddof=0), rtol=1e-8)
+
+
+def test_flat_prices():
+    bars = Bars(range(50), {'Close': np.full(50, 100.0)})
+    assert (stream(ZScore('Close', 10), bars)[9:] == 0).all()
+    assert (stream(RSI('Close', 14), bars)[14:] == 50).all()
+    with pytest.raises(ValueError):
+        SMA('Close', 0)
+
+
+def test_pool_shares_one_instance_per_key():
+    pool = IndicatorPool()
+    first, second = pool.share(SMA('Close', 20)), pool.share(SMA('Close', 20))
+    assert first is second
+    assert pool.share(SMA('Close', 30)) is not first
+    assert pool.share(BollingerBands('Close', 20, 2.0)) is not pool.share(BollingerBands('Close', 20, 3.0))
+    assert len(pool) == 4
@@ -0,0 +1,82 @@
+# tests/test_metrics.py
+# Author: Krittin Hirunchupong
+
+'''
+test_metrics.py
+    RunningMetrics, bar by bar or in batches, gives the values of the compute_* functions on the whole curve.
+'''
+
+import numpy as np
+import pytest
+
+from backtester import run_backtest
+from backtester.benchmarks.synthetic import gbm_ohlcv
+from backtester.strategies.mean_reversion import MeanReversion
+from backtester.utils.performance import (RunningMetrics, compute_max_drawdown, compute_num_trades,
+                                          compute_sharpe_ratio, compute_total_return, compute_win_rate)
+
+
+@pytest.fixture(scope='module')
+def curve():
+    rng = np.random.default_rng(21)
+    returns = rng.normal(0.0002, 0.01, 5000)
+    returns[1000:1010] = 0.0  # Flat bars
+    return 100_000 * np.cumprod(1 + returns)
+
+
+def longest_drawdown(curve):
+    # Longest run of bars below the running peak, by brute force
+    longest = current = 0
+    peak = curve[0]
+    for equity in curve[1:]:
+        if equity >= peak:
+            peak, current = equity, 0
+        else:
+            current += 1
+            longest = max(longest, current)
+    return longest, current
+
+
+def test_bar_by_bar_matches_the_full_curve(curve):
+    metrics = RunningMetrics(freq=252, window=250)
+    for equity in curve:
+        metrics.update(equity)
+    report = metrics.report()
+    assert report['sharpe'] == pytest.approx(compute_sharpe_ratio(curve), rel=1e-9)
+    assert report['max_drawdown'] == pytest.approx(compute_max_drawdown(curve), rel=1e-12)
+    assert report['total_return'] == pytest.approx(compute_total_return(curve), rel=1e-12)
+    assert report['volatility'] == pytest.approx(np.std(np.diff(curve) / curve[:-1]) * np.sqrt(252), rel=1e-9)
+    assert (report['max_drawdown_duration'], report['current_drawdown_duration']) == longest_drawdown(curve)
+
+    last = curve[-251:]
+    assert report['rolling_sharpe'] == pytest.approx(compute_sharpe_ratio(last), rel=1e-6)
+    assert report['rolling_return'] == pytest.approx(compute_total_return(last), rel=1e-9)
+
+
+def test_batches_match_bar_by_bar(curve):
+    single = RunningMetrics()
+    for equity in curve:
+        single.update(equity)
+    batched = RunningMetrics()
+    for chunk in np.array_split(curve, [1, 7, 1000, 1003, 2500]):
+        batched.update_many(chunk)
+    expected = single.report()
+    for key, value in batched.report().items():
+        assert value == pytest.approx(expected[key], rel=1e-9, abs=1e-12), key
+
+
+def test_engine_metrics_match_the_curves():
+    params = {'window': 20, 'threshold': 0.005}
+    data = gbm_ohlcv(4000, seed=13)
+    for mode in ('event', 'vectorized'):
+        results = run_backtest(MeanReversion, data, mode=mode, **params)
+        metrics, curve = results['metrics'], results['equity_curve']
+        assert metrics['sharpe'] == pytest.approx(compute_sharpe_ratio(curve), rel=1e-9)
+        assert metrics['max_drawdown'] == pytest.approx(compute_max_drawdown(curve), rel=1e-12)
+        assert metrics['total_return'] == pytest.approx(compute_total_return(curve), rel=1e-12)
+        assert metrics['win_rate'] == pytest.approx(compute_win_rate(results['trade_log']))
+        assert metrics['wins'] + metrics['losses'] == compute_num_trades(results['trade_log']) > 50
+        assert metrics['win_rate'] == pytest.approx(compute_win_rate(list(results['trade_log'])))
+
+    without_curve = run_backtest(MeanReversion, data, store_curve=False, **params)['metrics']
+    assert without_curve == run_backtest(MeanReversion, data, **params)['metrics']
@@ -0,0 +1,195 @@
+# tests/test_orders.py
+# Author: Krittin Hirunchupong
+
+'''
+test_orders.py
+    Resting orders of the Broker (stop-loss, take-profit, trailing stop, limit) and MeanReversion's trailing stop.
+    The OrderBook's heaps and trailing ladders are checked against a scan over every resting order.
+'''
+
+import numpy as np
+import pytest
+
+from backtester import run_backtest
+from backtester.benchmarks.synthetic import gbm_ohlcv
+from backtester.core.broker import Broker
+from backtester.core.orders import STOP_TYPES, OrderBook
+from backtester.strategies.mean_reversion import MeanReversion
+
+
+def test_stop_loss_fires_on_touch_and_cancels_take_profit():
+    broker = Broker(initial_cash=10_000, commission=0.0)
+    broker.update_price(100)
+    trade_id = broker.execute_order(qty=1, side='buy', stop_loss=95, take_profit=110)
+
+    assert broker.process_orders(96) == 0
+    assert broker.process_orders(95) == 1
+    assert trade_id not in broker.open_trades
+    assert not broker.orders  # The take-profit went with the trade
+    assert broker.trade_log[-1]['pnl'] == pytest.approx(-5)
+
+
+def test_take_profit_of_a_short():
+    broker = Broker(initial_cash=10_000, commission=0.0)
+    broker.update_price(100)
+    broker.execute_order(qty=2, side='sell', take_profit=90)
+
+    assert broker.process_orders(91) == 0
+    assert broker.process_orders(89) == 1
+    assert broker.trade_log[-1]['pnl'] == pytest.approx(2 * (100 - 89))
+
+
+def test_trailing_stop_follows_the_best_price():
+    broker = Broker(initial_cash=10_000, commission=0.0)
+    broker.update_price(100)
+    trade_id = broker.execute_order(qty=1, side='buy', trailing_stop=0.1)
+    order_id = next(iter(broker.orders))
+
+    assert broker.get_order_price(order_id) == pytest.approx(90)
+    assert broker.process_orders(120) == 0
+    assert broker.get_order_price(order_id) == pytest.approx(108)
+    assert broker.process_orders(110) == 0  # A lower price doesn't move the stop down
+    assert broker.get_order_price(order_id) == pytest.approx(108)
+    assert broker.process_orders(107) == 1
+    assert trade_id not in broker.open_trades
+
+
+def test_limit_order_opens_a_trade():
+    broker = Broker(initial_cash=10_000, commission=0.0)
+    broker.place_limit_order(qty=1, side='buy', limit_price=95)
+
+    assert broker.process_orders(96) == 0
+    assert broker.process_orders(94) == 1
+    assert broker.net_position == 1
+    assert next(iter(broker.open_trades.values()))['price'] == 94
+
+
+def test_intrabar_fills_at_the_level_or_the_gap_open():
+    broker = Broker(initial_cash=10_000, commission=0.0, intrabar=True)
+    broker.update_price(100)
+    broker.execute_order(qty=1, side='buy', stop_loss=95)
+    assert broker.process_orders(99, high=101, low=94, open_price=100) == 1
+    assert broker.trade_log[-1]['exit_price'] == 95
+
+    broker.execute_order(qty=1, side='buy', price=100, stop_loss=95)
+    assert broker.process_orders(90, high=93, low=89, open_price=92) == 1
+    assert broker.trade_log[-1]['exit_price'] == 92  # Gapped through the stop
+
+
+def test_trailing_stop_from_a_given_best_price():
+    broker = Broker(initial_cash=10_000, commission=0.0)
+    broker.update_price(100)
+    trade_id = broker.execute_order(qty=1, side='sell')
+    order_id = broker.set_trailing_stop(trade_id, 0.1, best=90)
+    assert broker.get_order_price(order_id) == pytest.approx(99)
+    assert broker.process_orders(99.5) == 1
+
+
+@pytest.mark.parametrize('broker_stops', [True, False])
+def test_mean_reversion_trailing_stop_starts_after_entry(broker_stops):
+    # The stop starts on the bar after the entry, with that bar's close as the best price
+    close = np.array([100.0] * 5 + [90.0, 95.0, 94.0, 89.5, 89.0, 89.5])
+    data = gbm_ohlcv(len(close), seed=0)
+    data['Close'] = close
+    _, broker = run_backtest(MeanReversion, data, return_broker=True, commission=0.0, window=5, threshold=0.02,
+                             trailing_stop=0.06, broker_stops=broker_stops)
+    closes = [trade for trade in broker.trade_log if trade['status'] == 'closed']
+    entry = broker.trade_log[0]
+    assert entry['side'] == 'buy' and entry['price'] == 90.0
+    # Best is 95 (bar 6), the level 89.3: 89.0 on bar 9 stops the trade
+    assert closes[0]['exit_price'] == 89.0
+    assert closes[0]['timestamp'] == data.index[9]
+
+
+def test_mean_reversion_broker_stops_match_its_own_check():
+    data = gbm_ohlcv(3000, seed=4)
+    params = {'window': 10, 'threshold': 0.01, 'trailing_stop': 0.02}
+    broker_stops = run_backtest(MeanReversion, data, **params)
+    own_check = run_backtest(MeanReversion, data, broker_stops=False, **params)
+    assert len(broker_stops['trade_log']) > 500
+    assert list(broker_stops['trade_log']) == list(own_check['trade_log'])
+
+
+@pytest.mark.parametrize('broker_stops', [False, True])
+def test_mean_reversion_vectorized_matches_event_loop(broker_stops):
+    data = gbm_ohlcv(3000, seed=4)
+    params = {'window': 10, 'threshold': 0.01, 'trailing_stop': 0.02, 'broker_stops': broker_stops}
+    event = run_backtest(MeanReversion, data, **params)
+    vectorized = run_backtest(MeanReversion, data, mode='vectorized', **params)
+    assert list(vectorized['trade_log']) == list(event['trade_log'])
+    np.testing.assert_allclose(vectorized['equity_curve'], event['equity_curve'], rtol=1e-12)
+
+
+def scan(orders, close, high=None, low=None, open_price=None):
+    # The brute force OrderBook.trigger(): every resting order is checked, trailing stops keep their own best price
+    intrabar = high is not None
+    if not intrabar:
+        high = low = close
+    triggered = []
+    for order_id, order in orders.items():
+        if order['type'] == 'trailing_stop':
+            direction = 1 if order['side'] == 'sell' else -1
+            if not intrabar:
+                order['best'] = max(order['best'], close) if direction > 0 else min(order['best'], close)
+            level = order['best'] * (1 - direction * order['trail'])
+            falls = direction > 0
+        else:
+            level = order['price']
+            falls = (order['side'] == 'sell') == (order['type'] == 'stop_loss')
+        if (low <= level) if falls else (high >= level):
+            if not intrabar:
+                fill = close
+            elif open_price is None:
+                fill = level
+            else:
+                fill = min(level, open_price) if falls else max(level, open_price)
+            triggered.append((order_id, fill))
+    if intrabar:
+        for order_id, order in orders.items():
+            if order['type'] == 'trailing_stop' and order_id not in dict(triggered):
+                order['best'] = max(order['best'], high) if order['side'] == 'sell' else min(order['best'], low)
+    triggered.sort(key=lambda fill: (orders[fill[0]]['type'] not in STOP_TYPES, fill[0]))
+    return triggered
+
+
+@pytest.mark.parametrize('intrabar', [False, True])
+def test_order_book_matches_a_full_scan(intrabar):
+    rng = np.random.default_rng(12)
+    book, resting = OrderBook(), {}
+    price, fills = 100.0, 0
+    for bar in range(3000):
+        for _ in range(rng.integers(0, 4)):
+            order_type = rng.choice(['stop_loss', 'take_profit', 'limit', 'trailing_stop'])
+            side = str(rng.choice(['buy', 'sell']))
+            if order_type == 'trailing_stop':
+                trail, best = float(rng.choice([0.01, 0.02, 0.05])), price + float(rng.integers(-4, 5)) * 0.5
+                order_id = book.add(order_type, side, 1, trail=trail, best=best)
+                resting[order_id] = {'type': order_type, 'side': side, 'trail': trail, 'best': best}
+            else:
+                level = price + float(rng.integers(-10, 11)) * 0.5
+                order_id = book.add(str(order_type), side, 1, price=level)
+                resting[order_id] = {'type': order_type, 'side': side, 'price': level}
+        if resting and rng.random() < 0.2:
+            order_id = int(rng.choice(list(resting)))
+            assert book.cancel(order_id) is not None
+            del resting[order_id]
+
+        open_price = price
+        price = round(price + float(rng.normal(0, 1)) * 2) / 2  # Half points, so levels are often hit exactly
+        bar_range = {}
+        if intrabar:
+            bar_range = {'high': max(open_price, price) + float(rng.integers(0, 3)) * 0.5,
+                         'low': min(open_price, price) - float(rng.integers(0, 3)) * 0.5, 'open_price': open_price}
+        triggered = book.trigger(price, **bar_range)
+        assert triggered == scan(resting, price, **bar_range)
+        fills += len(triggered)
+        for order_id, _ in triggered:
+            book.cancel(order_id)
+            del resting[order_id]
+
+        assert set(book.orders) == set(resting)
+        for order_id, order in resting.items():
+            expected = (order['best'] * (1 - (1 if order['side'] == 'sell' else -1) * order['trail'])
+                        if order['type'] == 'trailing_stop' else order['price'])
+            assert book.stop_price(order_id) == expected
+    assert fills > 2000 and resting
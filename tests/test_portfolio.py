@@ -0,0 +1,100 @@
+# tests/test_portfolio.py
+# Author: Krittin Hirunchupong
+
+'''
+test_portfolio.py
+    PortfolioBroker's array fills give the positions, average prices, cash and PnL of a symbol by symbol reference,
+    including flips from long to short.
+'''
+
+import numpy as np
+import pytest
+
+from backtester.core.portfolio import PortfolioBroker
+
+SYMBOLS = ['AAA', 'BBB', 'CCC', 'DDD']
+
+
+class Reference:
+    # One symbol at a time, in plain Python
+    def __init__(self, n, cash, commission):
+        self.positions = [0.0] * n
+        self.avg_price = [0.0] * n
+        self.cash = cash
+        self.realized = 0.0
+        self.commission = commission
+
+    def fill(self, j, delta, price):
+        if delta == 0:
+            return
+        self.cash -= delta * price + abs(delta) * price * self.commission
+        position, avg = self.positions[j], self.avg_price[j]
+        if position * delta < 0:
+            closed = min(abs(delta), abs(position))
+            self.realized += closed * (price - avg) * np.sign(position)
+        new_position = position + delta
+        if new_position == 0:
+            avg = 0.0
+        elif position == 0 or np.sign(new_position) != np.sign(position):
+            avg = price
+        elif abs(new_position) > abs(position):
+            avg = (abs(position) * avg + abs(delta) * price) / abs(new_position)
+        self.positions[j], self.avg_price[j] = new_position, avg
+
+
+def test_rebalances_match_reference():
+    rng = np.random.default_rng(8)
+    broker = PortfolioBroker(SYMBOLS, commission=0.0005)
+    reference = Reference(len(SYMBOLS), 100_000, 0.0005)
+    prices = np.full(len(SYMBOLS), 50.0)
+    for step in range(400):
+        prices = prices * np.exp(rng.normal(0, 0.02, len(SYMBOLS)))
+        broker.update_price(prices)
+        if step % 3:
+            targets = rng.integers(-5, 6, len(SYMBOLS)) * (rng.random(len(SYMBOLS)) < 0.6)
+            broker.order_target_positions(targets, timestamp=step)
+            for j in range(len(SYMBOLS)):
+                reference.fill(j, targets[j] - reference.positions[j], prices[j])
+        else:
+            j = int(rng.integers(len(SYMBOLS)))
+            side = 'buy' if rng.random() < 0.5 else 'sell'
+            broker.execute_order(qty=2, side=side, symbol=SYMBOLS[j], timestamp=step)
+            reference.fill(j, 2 if side == 'buy' else -2, prices[j])
+
+        np.testing.assert_allclose(broker.positions, reference.positions)
+        np.testing.assert_allclose(broker.avg_price, reference.avg_price, rtol=1e-12)
+        assert broker.cash == pytest.approx(reference.cash, rel=1e-12)
+        assert broker.realized_pnl == pytest.approx(reference.realized, rel=1e-9, abs=1e-9)
+        assert broker.trade_log.closed_pnl.sum() == pytest.approx(reference.realized, rel=1e-9, abs=1e-9)
+        unrealized = sum(p * (price - avg) for p, price, avg in zip(reference.positions, prices, reference.avg_price))
+        assert broker.get_equity() == pytest.approx(reference.cash + unrealized, rel=1e-12)
+
+    broker.close_all_trades(timestamp=400)
+    assert not broker.positions.any() and not broker.open_trades and not broker.trade_ids.any()
+
+
+def test_flip_and_average_price():
+    broker = PortfolioBroker(SYMBOLS, commission=0.0)
+    broker.update_price([100.0, 20.0, np.nan, np.nan])
+    first = broker.execute_order(qty=10, side='buy', symbol='AAA')
+    broker.execute_order(qty=10, side='buy', symbol='AAA', price=110.0)
+    assert broker.avg_price[0] == 105.0 and broker.open_trades[first]['qty'] == 20
+
+    flipped = broker.execute_order(qty=25, side='sell', symbol='AAA', price=120.0)
+    assert flipped != first and first not in broker.open_trades
+    assert broker.positions[0] == -5 and broker.avg_price[0] == 120.0
+    assert broker.realized_pnl == 20 * 15
+    close, opened = broker.trade_log[-2:]
+    assert (close['status'], close['trade_id'], close['qty'], close['pnl'], close['symbol']) == \
+        ('closed', first, 20, 300.0, 'AAA')
+    assert (opened['status'], opened['trade_id'], opened['side'], opened['qty']) == ('open', flipped, 'sell', 5)
+
+    broker.update_price([np.nan, 21.0, np.nan, np.nan])  # NaN keeps the last known price
+    assert broker.prices[0] == 100.0  # Fills at a given price don't move the marks
+    broker.close_trade(flipped)
+    assert broker.positions[0] == 0 and broker.cash == pytest.approx(100_000 + 300 + 5 * 20)
+
+    with pytest.raises(ValueError):
+        broker.execute_order(qty=1, side='buy')
+    with pytest.raises(ValueError):
+        broker.set_stop_loss(first, 90.0)
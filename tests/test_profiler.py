@@ -0,0 +1,61 @@
+# tests/test_profiler.py
+# Author: Krittin Hirunchupong
+
+'''
+test_profiler.py
+    A profiled run reports its phases and gives the same results as a normal run.
+'''
+
+import json
+
+from backtester import run_backtest
+from backtester.benchmarks.synthetic import gbm_ohlcv
+from backtester.core.broker import Broker
+from backtester.core.engine import BacktestEngine
+from backtester.core.profiler import Profiler
+from backtester.strategies.mean_reversion import MeanReversion
+from backtester.strategies.sma_crossover import SmaCrossover
+
+
+def test_profile_of_a_tiny_run(tmp_path):
+    data = gbm_ohlcv(300, seed=1)
+    engine = BacktestEngine(SmaCrossover, data, Broker(), profile=Profiler(cprofile=True))
+    engine.run()
+    results = engine.get_results()
+    report = results['profile']
+
+    assert results['final_equity'] == run_backtest(SmaCrossover, data)['final_equity']
+    assert report['bars'] == 300
+    assert report['trades'] == len(results['trade_log'])
+    assert set(report['phases']) == {'indicators', 'broker', 'on_data', 'bookkeeping', 'other'}
+    assert all(phase['seconds'] >= 0 for phase in report['phases'].values())
+    assert sum(phase['share'] for phase in report['phases'].values()) <= 1 + 1e-9
+    assert report['memory_bytes']['equity_curve'] == 300 * 8
+    assert any('on_data' in row['function'] for row in report['cprofile'])
+
+    path = str(tmp_path / 'profile.json')
+    engine.profiler.to_json(path)
+    with open(path) as f:
+        assert json.load(f)['bars'] == 300
+
+    # The timers are gone after the run
+    assert 'on_data' not in vars(engine.strategy)
+    assert 'get_unrealized_pnl' not in vars(engine.broker)
+
+
+def test_profiled_run_with_checkpoints(tmp_path):
+    data = gbm_ohlcv(3000, seed=2)
+    path = str(tmp_path / 'run.ckpt')
+    engine = BacktestEngine(MeanReversion, data.iloc[:2000], Broker(), profile=True)
+    engine.run(checkpoint_path=path, checkpoint_every=500)
+    assert 'checkpoint' in engine.get_results()['profile']['phases']
+
+    resumed = BacktestEngine.resume(path, data, profile=True)
+    resumed.run()
+    assert resumed.get_results()['profile']['bars'] == 1001
+    assert resumed.get_results()['final_equity'] == run_backtest(MeanReversion, data)['final_equity']
+
+
+def test_profiled_vectorized_run():
+    report = run_backtest(SmaCrossover, gbm_ohlcv(300, seed=1), mode='vectorized', profile=True)['profile']
+    assert {'signals', 'simulate'} <= set(report['phases'])
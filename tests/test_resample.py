@@ -0,0 +1,74 @@
+# tests/test_resample.py
+# Author: Krittin Hirunchupong
+
+'''
+test_resample.py
+    Resampled bars match pandas, and a Timeframe only shows higher timeframe bars that have closed.
+'''
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester.benchmarks.synthetic import gbm_ohlcv
+from backtester.core.bars import Bars
+from backtester.core.broker import Broker
+from backtester.core.engine import BacktestEngine
+from backtester.core.resample import Timeframe, parse_rule, resample_ohlcv
+from backtester.core.strategy import Strategy
+
+AGG = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+
+class HigherClose(Strategy):
+    # Keeps the last closed 15 minute Close seen on every bar
+    def __init__(self, data, broker):
+        super().__init__(data, broker)
+        self.add_timeframe('15m')
+        self.seen = []
+
+    def on_data(self, timestamp=None):
+        self.seen.append(self.get_timeframe_price('15m'))
+
+
+@pytest.fixture(scope='module')
+def gappy():
+    # Minute bars with random bars missing, including whole buckets and bucket ends
+    data = gbm_ohlcv(3000, seed=6)
+    keep = np.random.default_rng(6).random(len(data)) > 0.3
+    keep[1200:1260] = False
+    return data[keep]
+
+
+def test_matches_pandas(gappy):
+    for rule, pandas_rule in [('5m', '5min'), ('15m', '15min'), ('1h', '1h')]:
+        expected = gappy.resample(pandas_rule).agg(AGG).dropna(subset=['Open'])
+        pd.testing.assert_frame_equal(resample_ohlcv(gappy, rule), expected, check_freq=False, check_index_type=False)
+    assert parse_rule('4h') == pd.Timedelta(hours=4)
+    with pytest.raises(ValueError):
+        parse_rule('0m')
+
+
+def test_closed_count_matches_bucket_ends(gappy):
+    timeframe = Timeframe(Bars.from_dataframe(gappy), '15m', base_step='1m')
+    ends = timeframe.bars.index + pd.Timedelta(minutes=15)
+    bar_ends = gappy.index + pd.Timedelta(minutes=1)
+    expected = np.searchsorted(ends.as_unit('ns').asi8, bar_ends.as_unit('ns').asi8, side='right')
+    np.testing.assert_array_equal(timeframe.closed_count, expected)
+
+
+def test_no_lookahead(gappy):
+    full = Timeframe(Bars.from_dataframe(gappy), '15m', base_step='1m')
+    for i in np.random.default_rng(1).choice(len(gappy), 60, replace=False):
+        # What is visible at bar i doesn't change when the bars after it are removed
+        prefix = Timeframe(Bars.from_dataframe(gappy.iloc[:i + 1]), '15m', base_step='1m')
+        count = full.closed_count[i]
+        assert prefix.closed_count[i] == count
+        for col in AGG:
+            np.testing.assert_array_equal(prefix.bars[col][:count], full.bars[col][:count])
+
+    engine = BacktestEngine(HigherClose, gappy, Broker())
+    engine.run()
+    closes = resample_ohlcv(gappy, '15m')['Close']
+    expected = [closes.iloc[count - 1] if count else np.nan for count in full.closed_count]
+    np.testing.assert_array_equal(engine.strategy.seen, expected)
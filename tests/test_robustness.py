@@ -0,0 +1,58 @@
+# tests/test_robustness.py
+# Author: Krittin Hirunchupong
+
+'''
+test_robustness.py
+    monte_carlo(): a shuffle keeps the final equity, the results do not depend on n_jobs, and a trade log is
+    resampled the same way as a TradeLog or as a list of trade dicts.
+'''
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester import run_backtest
+from backtester.benchmarks.synthetic import gbm_ohlcv
+from backtester.robustness import monte_carlo
+from backtester.strategies.mean_reversion import MeanReversion
+
+
+@pytest.fixture(scope='module')
+def results():
+    return run_backtest(MeanReversion, gbm_ohlcv(3000, seed=11), window=20, threshold=0.002)
+
+
+def test_shuffle_keeps_the_final_equity(results):
+    trade_log = results['trade_log']
+    assert trade_log.num_closed() > 20
+    mc = monte_carlo(trade_log, method='shuffle', n_sims=500, seed=1)
+    final_equity = 100_000 + trade_log.closed_pnl.sum()
+    np.testing.assert_allclose(mc['simulations']['final_equity'], final_equity)
+    assert mc['intervals'].loc['final_equity', 'observed'] == pytest.approx(final_equity)
+    assert mc['simulations']['max_drawdown'].nunique() > 1
+
+
+@pytest.mark.parametrize('method', ['bootstrap', 'block', 'shuffle'])
+def test_same_results_for_any_n_jobs(results, method):
+    kwargs = dict(method=method, n_sims=400, seed=7, max_chunk_bytes=20_000)  # Several chunks
+    serial = monte_carlo(results, n_jobs=1, **kwargs)
+    parallel = monte_carlo(results, n_jobs=2, **kwargs)
+    pd.testing.assert_frame_equal(parallel['simulations'], serial['simulations'])
+    pd.testing.assert_frame_equal(parallel['intervals'], serial['intervals'])
+
+
+def test_trade_dicts_and_commission(results):
+    trade_log = results['trade_log']
+    as_log = monte_carlo(trade_log, n_sims=200, seed=3, commission=0.001)
+    as_dicts = monte_carlo(list(trade_log), n_sims=200, seed=3, commission=0.001)
+    pd.testing.assert_frame_equal(as_dicts['simulations'], as_log['simulations'])
+
+    fees = sum((trade['entry_price'] + trade['exit_price']) * trade['qty'] * 0.001
+               for trade in trade_log if trade['status'] == 'closed')
+    observed = as_log['intervals'].loc['final_equity', 'observed']
+    assert observed == pytest.approx(100_000 + trade_log.closed_pnl.sum() - fees)
+
+
+def test_unsupported_source():
+    with pytest.raises(ValueError, match='TradeLog'):
+        monte_carlo(['a', 'b', 'c'])
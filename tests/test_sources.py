@@ -0,0 +1,138 @@
+# tests/test_sources.py
+# Author: Krittin Hirunchupong
+
+'''
+test_sources.py
+    The data sources (CSV directory, HTTP) and DataHandler.load_many(): concurrent fetches, retries of the errors
+    worth retrying, and per ticker error reports.
+'''
+
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester.core.data_handler import DataHandler
+from backtester.core.sources import CsvDirectorySource, DataSource, HttpSource
+
+
+def daily_bars(ticker, start='2023-01-02', periods=30):
+    index = pd.bdate_range(start, periods=periods, name='Date')
+    close = 100 + np.arange(periods) + len(ticker)
+    return pd.DataFrame({'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+                         'volume': 1000.0}, index=index)
+
+
+class Flaky(DataSource):
+    # Fails 'failures[ticker]' times with 'error' before returning the bars, and counts calls and concurrency
+    def __init__(self, failures, error=ConnectionError('reset'), delay=0.0):
+        self.failures = dict(failures)
+        self.error = error
+        self.delay = delay
+        self.calls = {}
+        self.running = self.max_running = 0
+        self.lock = threading.Lock()
+
+    def fetch(self, ticker, start, end, interval='1d'):
+        with self.lock:
+            self.calls[ticker] = self.calls.get(ticker, 0) + 1
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            failing = self.calls[ticker] <= self.failures.get(ticker, 0)
+        try:
+            time.sleep(self.delay)
+            if failing:
+                raise self.error
+            return daily_bars(ticker).rename(columns=str.title)
+        finally:
+            with self.lock:
+                self.running -= 1
+
+    def is_retryable(self, error):
+        return not isinstance(error, KeyError)
+
+
+@pytest.fixture
+def server():
+    # Serves daily_bars() as CSV at /bars/<ticker>.csv, the ticker 'DOWN' answers 503 twice, 'NONE' 404
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urllib.parse.urlparse(self.path)
+            ticker = url.path.rsplit('/', 1)[-1][:-len('.csv')]
+            requests.append((ticker, urllib.parse.parse_qs(url.query)))
+            if ticker == 'NONE' or (ticker == 'DOWN' and len(requests) <= 2):
+                self.send_error(404 if ticker == 'NONE' else 503)
+                return
+            body = daily_bars(ticker).to_csv().encode()
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    url = f'http://127.0.0.1:{httpd.server_address[1]}/bars/{{ticker}}.csv?start={{start}}&end={{end}}'
+    yield url, requests
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_csv_directory(tmp_path):
+    for ticker in ('AAA', 'BB'):
+        daily_bars(ticker).to_csv(tmp_path / f'{ticker}.csv')
+    source = CsvDirectorySource(str(tmp_path))
+    df = source('AAA', '2023-01-05', '2023-01-10')
+    assert list(df.columns) == ['Open', 'High', 'Low', 'Close', 'Volume']
+    assert list(df.index) == list(pd.bdate_range('2023-01-05', '2023-01-09'))  # end is excluded
+
+    handler = DataHandler(fetcher=source)
+    panel, errors = handler.load_many(['AAA', 'BB', 'MISSING'], '2023-01-01', '2023-03-01', backoff=0,
+                                      return_errors=True)
+    assert panel.symbols == ['AAA', 'BB'] and len(panel) == 30
+    assert list(errors) == ['MISSING'] and errors['MISSING'].startswith('FileNotFoundError')
+    assert '(attempt 1 of 4)' in errors['MISSING']  # Not retried
+
+
+def test_http_source(server):
+    url, requests = server
+    source = HttpSource(url, timeout=5)
+    df = source('A B', '2023-01-03', '2023-02-01')
+    assert df.index[0] == pd.Timestamp('2023-01-03') and df.index[-1] < pd.Timestamp('2023-02-01')
+    assert requests[0] == ('A%20B', {'start': ['2023-01-03T00:00:00'], 'end': ['2023-02-01T00:00:00']})
+
+    handler = DataHandler(fetcher=source)
+    requests.clear()
+    panel, errors = handler.load_many(['DOWN', 'NONE'], '2023-01-01', '2023-03-01', max_workers=1, backoff=0.01,
+                                      return_errors=True)
+    assert panel.symbols == ['DOWN']
+    assert [ticker for ticker, _ in requests] == ['DOWN', 'DOWN', 'DOWN', 'NONE']  # 503 retried, 404 not
+    assert errors == {'NONE': 'HTTPError: HTTP Error 404: Not Found (attempt 1 of 4)'}
+
+
+def test_load_many_retries_and_reports():
+    source = Flaky({'B': 2, 'C': 10}, delay=0.02)
+    handler = DataHandler(fetcher=source)
+    tickers = ['A', 'B', 'C', 'D', 'E', 'F', 'A']
+    with pytest.warns(UserWarning, match="skipped 1 ticker"):
+        panel = handler.load_many(tickers, '2023-01-01', '2023-03-01', max_workers=3, retries=2, backoff=0.001)
+    assert panel.symbols == ['A', 'B', 'D', 'E', 'F']
+    assert source.calls == {'A': 1, 'B': 3, 'C': 3, 'D': 1, 'E': 1, 'F': 1}
+    assert 1 < source.max_running <= 3
+    np.testing.assert_array_equal(panel.symbol('B')['Close'], daily_bars('B')['close'])
+
+    permanent = Flaky({'A': 5}, error=KeyError('bad'))
+    with pytest.raises(ValueError, match="No ticker could be loaded: A: KeyError"):
+        DataHandler(fetcher=permanent).load_many(['A'], '2023-01-01', '2023-03-01', backoff=0)
+    assert permanent.calls == {'A': 1}
+    with pytest.raises(ValueError):
+        handler.load_many([], '2023-01-01', '2023-03-01')
@@ -0,0 +1,61 @@
+# tests/test_store.py
+# Author: Krittin Hirunchupong
+
+'''
+test_store.py
+    A column store is reused only when it was converted from the same CSV with the same settings.
+'''
+
+import os
+import shutil
+
+import numpy as np
+
+from backtester.benchmarks.synthetic import gbm_ohlcv
+from backtester.core.data_handler import DataHandler
+from backtester.core.store import convert_csv_to_store, is_store_current
+
+
+def _write_csv(path, n=300, seed=0):
+    df = gbm_ohlcv(n, seed=seed)
+    df.index.name = 'Date'
+    df.to_csv(path)
+    return df
+
+
+def test_store_matches_csv(tmp_path):
+    csv_path = str(tmp_path / 'prices.csv')
+    df = _write_csv(csv_path)
+    bars = DataHandler().from_csv(csv_path, store_dir=str(tmp_path / 'store'))
+    np.testing.assert_allclose(bars['Close'], df['Close'])
+    assert len(bars) == len(df)
+
+
+def test_store_is_current_only_for_the_same_conversion(tmp_path):
+    csv_path = str(tmp_path / 'prices.csv')
+    store_dir = str(tmp_path / 'store')
+    _write_csv(csv_path)
+    convert_csv_to_store(csv_path, store_dir, dtype='float32')
+
+    assert is_store_current(store_dir, csv_path, dtype='float32')
+    assert not is_store_current(store_dir, csv_path)  # float64
+    assert not is_store_current(store_dir, csv_path, datetime_col='Datetime', dtype='float32')
+
+    # A copy with the same size and mtime is a different source
+    other_path = str(tmp_path / 'other.csv')
+    shutil.copy2(csv_path, other_path)
+    assert not is_store_current(store_dir, other_path, dtype='float32')
+
+    bars = DataHandler().from_csv(csv_path, store_dir=store_dir)  # Reconverted as float64
+    assert bars['Close'].dtype == np.float64
+    assert is_store_current(store_dir, csv_path)
+
+
+def test_store_is_stale_after_the_csv_changes(tmp_path):
+    csv_path = str(tmp_path / 'prices.csv')
+    store_dir = str(tmp_path / 'store')
+    _write_csv(csv_path)
+    convert_csv_to_store(csv_path, store_dir)
+    _write_csv(csv_path, n=301, seed=1)
+    os.utime(csv_path, (0, 0))
+    assert not is_store_current(store_dir, csv_path)
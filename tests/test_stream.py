@@ -0,0 +1,77 @@
+# tests/test_stream.py
+# Author: Krittin Hirunchupong
+
+'''
+test_stream.py
+    StreamingEngine on a feed of bars must give the same results as BacktestEngine on the whole DataFrame.
+'''
+
+import numpy as np
+import pytest
+
+from backtester import run_backtest
+from backtester.benchmarks.synthetic import gbm_ohlcv
+from backtester.core.broker import Broker
+from backtester.core.strategy import Strategy
+from backtester.core.stream import MemorySink, StreamingEngine, iter_csv, iter_dataframe
+from backtester.strategies.mean_reversion import MeanReversion
+from backtester.strategies.sma_crossover import SmaCrossover
+from backtester.strategies import test_strategy  # Not its class, pytest would try to collect it
+
+
+class BelowMean(Strategy):
+    # Reads a lookback window, so the rolling window wraps around many times
+    max_lookback = 5
+
+    def on_data(self, timestamp=None):
+        window = self.get_lookback('Close', 5)
+        if self.current_index > 10 and window.mean() > window[-1]:
+            if not self.broker.open_trades:
+                self.broker.execute_order(qty=1, side='buy', timestamp=timestamp)
+        elif self.broker.open_trades:
+            self.broker.close_all_trades(timestamp=timestamp)
+
+
+@pytest.fixture(scope='module')
+def data():
+    return gbm_ohlcv(2000, seed=9)
+
+
+def _stream(strategy_class, feed, **kwargs):
+    engine = StreamingEngine(strategy_class, Broker(), sink=MemorySink(), **kwargs)
+    engine.run(feed)
+    return engine.get_results()
+
+
+def _assert_same(streamed, full):
+    assert streamed['final_equity'] == full['final_equity']
+    assert list(streamed['trade_log']) == list(full['trade_log'])
+    np.testing.assert_array_equal(streamed['equity_curve'], full['equity_curve'])
+    np.testing.assert_array_equal(streamed['pnl_curve'], full['pnl_curve'])
+
+
+@pytest.mark.parametrize('strategy_class, kwargs', [
+    (SmaCrossover, {'short_window': 10, 'long_window': 30}),
+    (MeanReversion, {}),
+    (test_strategy.TestStrategy, {}),
+    (BelowMean, {}),
+])
+def test_stream_matches_backtest(data, strategy_class, kwargs):
+    full = run_backtest(strategy_class, data, **kwargs)
+    streamed = _stream(strategy_class, iter_dataframe(data), **kwargs)
+    _assert_same(streamed, full)
+    assert streamed['bars'] == len(data)
+
+
+def test_async_and_csv_feeds(data, tmp_path):
+    full = run_backtest(SmaCrossover, data, short_window=10, long_window=30)
+
+    async def feed():
+        for item in iter_dataframe(data):
+            yield item
+    _assert_same(_stream(SmaCrossover, feed(), short_window=10, long_window=30), full)
+
+    path = str(tmp_path / 'bars.csv')
+    data.rename_axis('Date').to_csv(path)
+    streamed = _stream(SmaCrossover, iter_csv(path, chunksize=300), short_window=10, long_window=30)
+    assert streamed['final_equity'] == pytest.approx(full['final_equity'], rel=1e-9)  # CSV rounds the last digit
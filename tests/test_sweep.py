@@ -0,0 +1,91 @@
+# tests/test_sweep.py
+# Author: Krittin Hirunchupong
+
+'''
+test_sweep.py
+    run_sweep() on worker processes must return the rows of the in-process run, in grid order.
+'''
+
+import pandas as pd
+import pytest
+
+from backtester import run_backtest
+from backtester.benchmarks.synthetic import gbm_ohlcv
+from backtester.core.strategy import Strategy
+from backtester.strategies.mean_reversion import MeanReversion
+from backtester.strategies.sma_crossover import SmaCrossover
+from backtester.sweep import _attach_data, _share_data, iter_param_grid, run_sweep
+
+GRID = {'short_window': [5, 10, 20], 'long_window': [30, 60]}
+
+
+class OnTheClock(Strategy):
+    # Trades on the timestamps only: long from minute 0 to minute 'hold' of every 'every' minutes
+    def __init__(self, data, broker, every=10, hold=5):
+        super().__init__(data, broker)
+        self.every = every
+        self.hold = hold
+
+    def on_data(self, timestamp=None):
+        minute = timestamp.minute % self.every
+        if minute == 0 and not self.broker.open_trades:
+            self.broker.execute_order(qty=1, side='buy', timestamp=timestamp)
+        elif minute == self.hold:
+            self.close_all_trades(timestamp=timestamp)
+
+
+@pytest.fixture(scope='module')
+def data():
+    return gbm_ohlcv(1500, seed=5)
+
+
+@pytest.mark.parametrize('mode', ['event', 'vectorized'])
+def test_workers_match_one_process(data, mode):
+    serial = run_sweep(SmaCrossover, data, GRID, n_jobs=1, mode=mode)
+    parallel = run_sweep(SmaCrossover, data, GRID, n_jobs=2, mode=mode)
+    assert len(serial) == 6
+    pd.testing.assert_frame_equal(parallel, serial)
+
+    trade_log = run_backtest(SmaCrossover, data, mode=mode, short_window=5, long_window=30)['trade_log']
+    assert serial['num_trades'][0] == trade_log.num_closed() == len(trade_log) // 2
+
+
+def test_generator_grid_in_small_chunks(data):
+    grid = [{'window': window, 'threshold': threshold}
+            for window in (10, 20, 30) for threshold in (0.01, 0.02, 0.03, 0.04)]
+    serial = run_sweep(MeanReversion, data, grid, n_jobs=1, return_curves=True)
+    # A generator, with more chunks than can be in flight at once
+    parallel = run_sweep(MeanReversion, data, (params for params in grid), n_jobs=2, chunksize=1,
+                         return_curves=True)
+    assert list(parallel['window']) == [params['window'] for params in grid]
+    pd.testing.assert_frame_equal(parallel.drop(columns=['equity_curve', 'pnl_curve']),
+                                  serial.drop(columns=['equity_curve', 'pnl_curve']))
+    for a, b in zip(parallel['equity_curve'], serial['equity_curve']):
+        assert (a == b).all()
+
+    unsized = run_sweep(MeanReversion, data, iter(grid), n_jobs=2)
+    pd.testing.assert_frame_equal(unsized, serial.drop(columns=['equity_curve', 'pnl_curve']))
+
+
+def test_workers_see_the_same_timestamps(data):
+    shm, layout = _share_data(data)
+    try:
+        attach_shm, shared = _attach_data(layout)
+        pd.testing.assert_index_equal(shared.index, data.index, exact=False)
+        worker_log = run_backtest(OnTheClock, shared)['trade_log'].to_dataframe()
+        del shared
+        attach_shm.close()
+    finally:
+        shm.close()
+        shm.unlink()
+    local_log = run_backtest(OnTheClock, data)['trade_log'].to_dataframe()
+    assert len(local_log) > 100
+    pd.testing.assert_frame_equal(worker_log, local_log)
+
+    grid = {'every': [10, 15], 'hold': [3, 5]}
+    pd.testing.assert_frame_equal(run_sweep(OnTheClock, data, grid, n_jobs=2),
+                                  run_sweep(OnTheClock, data, grid, n_jobs=1))
+
+
+def test_iter_param_grid():
+    assert list(iter_param_grid({'a': [1, 2], 'b': [3]})) == [{'a': 1, 'b': 3}, {'a': 2, 'b': 3}]
@@ -0,0 +1,89 @@
+# tests/test_trade_log.py
+# Author: Krittin Hirunchupong
+
+'''
+test_trade_log.py
+    TradeLog gives back the trade dicts it was given, and its exports and pickles keep every column.
+'''
+
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester.core.trade_log import TradeLog
+
+
+def make_trades(n, tz=None):
+    start = pd.Timestamp('2024-03-01 09:30', tz=tz)
+    trades = []
+    for i in range(n):
+        side = 'buy' if i % 3 else 'sell'
+        qty = 2 if i % 2 else 0.5
+        entry, exit_ = 100.0 + i, 101.5 + i
+        trades.append({'trade_id': i, 'side': side, 'qty': qty, 'price': entry,
+                       'timestamp': start + pd.Timedelta(minutes=2 * i), 'status': 'open'})
+        trades.append({'trade_id': i, 'entry_price': entry, 'exit_price': exit_, 'qty': qty, 'entry_side': side,
+                       'exit_side': 'sell' if side == 'buy' else 'buy',
+                       'timestamp': start + pd.Timedelta(minutes=2 * i + 1),
+                       'pnl': (exit_ - entry) * qty * (1 if side == 'buy' else -1), 'status': 'closed'})
+    return trades
+
+
+@pytest.mark.parametrize('tz', [None, 'America/New_York'])
+def test_round_trip(tz):
+    trades = make_trades(40, tz)
+    log = TradeLog(capacity=4)  # Grows several times
+    log.extend(trades)
+    assert len(log) == 80 and log.num_closed() == 40 and log.num_open_events() == 40
+    assert list(log) == trades
+    assert log[-1] == trades[-1] and log[2:5] == trades[2:5]
+    with pytest.raises(IndexError):
+        log[80]
+
+    closed = [t['pnl'] for t in trades if t['status'] == 'closed']
+    np.testing.assert_array_equal(log.closed_pnl, closed)
+    assert log.total_pnl() == pytest.approx(sum(closed))
+    assert log.win_rate() == np.mean(np.array(closed) > 0)
+
+
+def test_missing_timestamp_and_extend():
+    log = TradeLog()
+    log.append_open(1, 'buy', 1, 10.0)
+    log.append_close(1, 'buy', 1, 10.0, 12.0, 2.0)
+    assert log[0]['timestamp'] is None and log[1]['timestamp'] is None
+
+    merged = TradeLog(capacity=1)
+    merged.extend(log)
+    merged.extend(make_trades(3))
+    assert list(merged) == list(log) + make_trades(3)
+    np.testing.assert_array_equal(merged.closed_pnl, [2.0] + [t['pnl'] for t in make_trades(3)[1::2]])
+
+
+def test_dataframe_and_arrow():
+    trades = make_trades(10, 'UTC')
+    log = TradeLog()
+    log.extend(trades)
+    df = log.to_dataframe()
+    assert list(df['status']) == [t['status'] for t in trades]
+    assert list(df['side']) == [t.get('side', t.get('entry_side')) for t in trades]
+    assert list(df['timestamp']) == [t['timestamp'] for t in trades]
+    assert df['pnl'].isna().sum() == 10
+    np.testing.assert_array_equal(df['price'], [t.get('price', t.get('exit_price')) for t in trades])
+
+    pa = pytest.importorskip('pyarrow')
+    table = log.to_arrow()
+    assert table.num_rows == 20
+    assert pa.types.is_dictionary(table.schema.field('side').type)
+    pd.testing.assert_frame_equal(table.to_pandas(), df, check_categorical=False)
+
+
+def test_pickle_keeps_rows_and_stays_appendable():
+    log = TradeLog(capacity=1024)
+    log.extend(make_trades(5, 'Asia/Tokyo'))
+    restored = pickle.loads(pickle.dumps(log))
+    assert restored.nbytes < log.nbytes  # Spare capacity is not pickled
+    assert list(restored) == list(log)
+    restored.extend(make_trades(5))
+    assert len(restored) == 20 and restored.num_closed() == 10
@@ -0,0 +1,49 @@
+# tests/test_vectorized.py
+# Author: Krittin Hirunchupong
+
+'''
+test_vectorized.py
+    run_vectorized() must give the same trades, curves and final equity as the event loop.
+'''
+
+import numpy as np
+import pytest
+
+from backtester import run_backtest
+from backtester.benchmarks.synthetic import gbm_ohlcv
+from backtester.core.vectorized import rolling_mean
+from backtester.strategies.mean_reversion import MeanReversion
+from backtester.strategies.sma_crossover import SmaCrossover
+
+CASES = [
+    (SmaCrossover, {}),
+    (SmaCrossover, {'short_window': 5, 'long_window': 50}),
+    (MeanReversion, {}),
+    (MeanReversion, {'window': 10, 'threshold': 0.01, 'trailing_stop': 0.02}),
+]
+
+
+@pytest.fixture(scope='module')
+def data():
+    return gbm_ohlcv(3000, seed=11)
+
+
+@pytest.mark.parametrize('strategy_class, params', CASES)
+def test_vectorized_matches_event_loop(data, strategy_class, params):
+    event = run_backtest(strategy_class, data, **params)
+    vectorized = run_backtest(strategy_class, data, mode='vectorized', **params)
+
+    assert list(vectorized['trade_log']) == list(event['trade_log'])
+    np.testing.assert_allclose(vectorized['equity_curve'], event['equity_curve'], rtol=1e-12)
+    np.testing.assert_allclose(vectorized['pnl_curve'], event['pnl_curve'], rtol=1e-12, atol=1e-9)
+    assert vectorized['final_equity'] == pytest.approx(event['final_equity'], rel=1e-12)
+
+
+def test_sma_crossover_trades_every_signaled_bar(data):
+    # Every bar with a signal closes the open trade and opens a new one, so every signaled bar adds an open row
+    # and (eventually) its close row
+    results = run_backtest(SmaCrossover, data, short_window=10, long_window=20)
+    close = data['Close'].to_numpy()
+    signal = np.sign(rolling_mean(close, 10) - rolling_mean(close, 20))[20:]
+    assert len(results['trade_log']) == 2 * np.count_nonzero(signal)
+    assert results['trade_log'][-1]['status'] == 'closed'
@@ -0,0 +1,69 @@
+# tests/test_visualization.py
+# Author: Krittin Hirunchupong
+
+'''
+test_visualization.py
+    Level of detail (LTTB, candle aggregation), trade markers and saved charts.
+'''
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester import run_backtest
+from backtester.benchmarks.synthetic import gbm_ohlcv
+from backtester.strategies.sma_crossover import SmaCrossover
+from backtester.utils.visualization import downsample_ohlc, lttb, trade_markers
+
+plt = pytest.importorskip('matplotlib.pyplot')
+
+
+def test_lttb_keeps_the_endpoints_and_the_size():
+    y = np.sin(np.linspace(0, 20, 10_000)) + np.linspace(0, 1, 10_000)
+    keep = lttb(np.arange(len(y)), y, 500)
+    assert len(keep) == 500
+    assert keep[0] == 0 and keep[-1] == len(y) - 1
+    assert (np.diff(keep) > 0).all()
+    assert y[keep].max() == pytest.approx(y.max(), abs=0.01)  # Peaks are kept
+
+    assert (lttb(np.arange(10), np.arange(10.0), 50) == np.arange(10)).all()
+
+
+def test_downsample_ohlc():
+    df = gbm_ohlcv(1000, seed=1)
+    candles, step = downsample_ohlc(df, 100)
+    assert (len(candles), step) == (100, 10)
+    assert candles['Open'].iloc[0] == df['Open'].iloc[0]
+    assert candles['High'].iloc[0] == df['High'].iloc[:10].max()
+    assert candles['Close'].iloc[-1] == df['Close'].iloc[-1]
+    assert candles['Volume'].sum() == pytest.approx(df['Volume'].sum())
+
+
+def test_trade_markers():
+    index = pd.date_range('2024-01-01', periods=10, freq='D')
+    trades = [
+        {'trade_id': 1, 'side': 'buy', 'qty': 1, 'price': 10.0, 'timestamp': index[2], 'status': 'open'},
+        {'trade_id': 1, 'entry_price': 10.0, 'exit_price': 11.0, 'qty': 1, 'entry_side': 'buy', 'exit_side': 'sell',
+         'timestamp': index[5], 'pnl': 1.0, 'status': 'closed'},
+        {'trade_id': 2, 'side': 'sell', 'qty': 1, 'price': 11.0, 'timestamp': index[6], 'status': 'open'},
+        {'trade_id': 3, 'side': 'buy', 'qty': 1, 'price': 11.0, 'timestamp': pd.Timestamp('2030-01-01'),
+         'status': 'open'},
+    ]
+    buys, sells = trade_markers(index, trades)
+    assert list(buys) == [2]
+    assert list(sells) == [5, 6]
+
+
+def test_saved_charts_leave_no_figure_open(tmp_path):
+    from backtester.utils.visualization import plot_candles_with_trades, plot_equity_curve
+
+    data = gbm_ohlcv(2000, seed=2)
+    results = run_backtest(SmaCrossover, data)
+    figures = plt.get_fignums()
+    candles = plot_candles_with_trades(data, results['trade_log'], results['timestamps'],
+                                       save_path=str(tmp_path / 'candles.png'))
+    equity = plot_equity_curve(results['timestamps'], results['equity_curve'], save_path=str(tmp_path / 'eq.svg'))
+    assert plt.get_fignums() == figures
+    assert (tmp_path / 'candles.png').stat().st_size > 0
+    assert (tmp_path / 'eq.svg').stat().st_size > 0
+    assert (candles, equity) == (str(tmp_path / 'candles.png'), str(tmp_path / 'eq.svg'))
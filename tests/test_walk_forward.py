@@ -0,0 +1,34 @@
+# tests/test_walk_forward.py
+# Author: Krittin Hirunchupong
+
+'''
+test_walk_forward.py
+    walk_forward() on worker processes (signals in shared memory) must match the in-process run.
+'''
+
+import pandas as pd
+import pytest
+
+from backtester.benchmarks.synthetic import gbm_ohlcv
+from backtester.strategies.mean_reversion import MeanReversion
+from backtester.strategies.sma_crossover import SmaCrossover
+from backtester.walk_forward import make_folds, walk_forward
+
+
+@pytest.mark.parametrize('strategy_class, grid', [
+    (SmaCrossover, {'short_window': [5, 10], 'long_window': [30, 60]}),
+    (MeanReversion, {'window': [10, 20], 'threshold': [0.01, 0.02]}),
+])
+def test_workers_match_one_process(strategy_class, grid):
+    data = gbm_ohlcv(2000, seed=8)
+    serial = walk_forward(strategy_class, data, grid, train_size=600, test_size=200, n_jobs=1)
+    parallel = walk_forward(strategy_class, data, grid, train_size=600, test_size=200, n_jobs=2)
+    assert len(serial['folds']) == 7
+    pd.testing.assert_series_equal(parallel['equity_curve'], serial['equity_curve'])
+    pd.testing.assert_frame_equal(parallel['folds'], serial['folds'])
+    assert parallel['final_equity'] == serial['final_equity']
+
+
+def test_make_folds():
+    assert make_folds(10, 4, 3) == [((0, 4), (4, 7)), ((3, 7), (7, 10))]
+    assert make_folds(10, 4, 3, anchored=True)[1] == ((0, 7), (7, 10))